@@ -10,7 +10,14 @@ from mt5_protocol import *
 from mt5_utils import *
 from mt5_connect import *
 from mt5_retcode import *
+from mt5_columnar import *
+from mt5_cache import *
+from mt5_metrics import *
+from collections import deque
 import json
+import socket
+import threading
+import time
 
 
 # web api version
@@ -27,19 +34,51 @@ class MTWebAPI:
     m_agent = 'XWCRM'
     m_is_crypt = False
     m_connect = None
+    # MTSymbolCache updated by this api
+    m_symbol_cache = None
+    # MTUserCache, None if cache is disabled
+    m_user_cache = None
+    # round trip time of the last PingTime, seconds
+    LastRtt = None
+    # MTRetCode of the last request, MTConnectionPool replaces session after network error
+    LastRetCode = MTRetCode.MT_RET_OK
+    # MTMetrics, None if metrics are disabled
+    m_metrics = None
+    # MTLoggerType of connections of this api, None for level of logger
+    m_log_level = None
+    # (ip, port, timeout, login, password) of the last Connect
+    m_server = None
+    # tries of connect after network failure, 0 if reconnect is disabled
+    m_reconnect_attempts = 0
+    m_reconnect_backoff = 0.5
+    m_reconnect_backoff_max = 10
+    # max count of reconnects in period
+    m_reconnect_budget = 10
+    m_reconnect_period = 60
+    # commands without side effects, they are sent again after reconnect
+    REPLAY_SAFE_SUFFIXES = ('_GET', '_TOTAL', '_NEXT', '_GET_PAGE', '_GET_GROUP')
+    REPLAY_SAFE_PREFIXES = ('TICK_',)
+    REPLAY_SAFE_COMMANDS = frozenset([
+        MTProtocolConsts.WEB_CMD_TIME_SERVER,
+        MTProtocolConsts.WEB_CMD_USER_USER_LOGINS,
+        MTProtocolConsts.WEB_CMD_PING,
+    ])
 
     def __init__(self, agent='XWCRM', is_crypt=False):
         """
         Initiate a connection to MetaTrader5 server
 
         @param agent set a name of your agnet
-        @param is_crypt not support yet
+        @param is_crypt need crypt connection, AES256 OFB
 
         @return MTWebAPI object
         """
 
         self.m_agent = agent
         self.m_is_crypt = is_crypt
+        self._reconnect_lock = threading.Lock()
+        # times of reconnects in budget period
+        self._reconnects = deque()
 
     def Connect(self, ip, port, timeout, login, password):
         """
@@ -52,24 +91,119 @@ class MTWebAPI:
         @return MTRetCode
         """
 
+        # remember server and credentials for reconnect
+        self.m_server = (ip, port, timeout, login, password)
+        error_code, connect = self._Open(ip, port, timeout, login, password)
+        if error_code == MTRetCode.MT_RET_OK:
+            self.m_connect = connect
+        return error_code
+
+    def _Open(self, ip, port, timeout, login, password):
+        """
+        Create authorized connection
+
+        @return MTRetCode, MTConnect|None
+        """
+
         # create connection class
-        self.m_connect = MTConnect(ip, port, timeout, self.m_is_crypt)
+        connect = MTConnect(ip, port, timeout, self.m_is_crypt)
+        connect.m_metrics = self.m_metrics
+        connect.m_log_level = self.m_log_level
         # create connection
-        error_code = self.m_connect.Connect()
+        error_code = connect.Connect()
         if error_code != MTRetCode.MT_RET_OK:
-            return error_code
+            return error_code, None
         # authorization to MetaTrader 5 server
-        auth = MTAuthProtocol(self.m_connect, self.m_agent)
+        auth = MTAuthProtocol(connect, self.m_agent)
         # -crypt_rand = ''
+        metrics = self.m_metrics
+        start = time.perf_counter() if metrics is not None else 0
         error_code, crypt_rand = auth.Auth(login, password, self.m_is_crypt)
+        if metrics is not None:
+            metrics.ObserveAuth(time.perf_counter() - start, error_code)
         if error_code != MTRetCode.MT_RET_OK:
             # disconnect
-            self.Disconnect()
-            return error_code
+            try:
+                connect.Send(MTProtocolConsts.WEB_CMD_QUIT, '')
+            finally:
+                connect.Disconnect()
+            return error_code, None
         # if need crypt
         if(self.m_is_crypt):
-            self.m_connect.SetCryptRand(crypt_rand, password)
-        return MTRetCode.MT_RET_OK
+            connect.SetCryptRand(crypt_rand, password)
+        return MTRetCode.MT_RET_OK, connect
+
+    def EnableReconnect(self, attempts=5, backoff=0.5, backoff_max=10, budget=10, period=60):
+        """
+        Restore broken connection with the same credentials.
+        Commands without side effects are sent again, other commands
+        return MT_RET_ERR_OUTCOME_UNKNOWN if connection was lost after sending.
+        Socket timeout of answer does not reconnect, it returns MT_RET_ERR_TIMEOUT.
+        @param attempts    - tries of connect for one failure
+        @param backoff     - first delay between tries, seconds
+        @param backoff_max - max delay between tries, seconds
+        @param budget      - max count of reconnects in period, protects server from storm of logins
+        @param period      - seconds of budget
+        """
+
+        self.m_reconnect_attempts = attempts
+        self.m_reconnect_backoff = backoff
+        self.m_reconnect_backoff_max = backoff_max
+        self.m_reconnect_budget = budget
+        self.m_reconnect_period = period
+
+    def EnableMetrics(self, metrics=None):
+        """
+        Collect latency of commands and counters of traffic
+        @param MTMetrics metrics - metrics to fill, can be shared by many apis, by default new one
+
+        @return MTMetrics
+        """
+
+        if metrics is None:
+            metrics = MTMetrics()
+        self.m_metrics = metrics
+        if self.m_connect is not None:
+            self.m_connect.m_metrics = metrics
+        return metrics
+
+    def DisableMetrics(self):
+        """
+        Stop collecting metrics
+        """
+
+        self.m_metrics = None
+        if self.m_connect is not None:
+            self.m_connect.m_metrics = None
+
+    def SetLogLevel(self, level=None):
+        """
+        Write log of this api from level, for example DEBUG for one session while logger is on INFO
+        @param int level - MTLoggerType, None for level of logger
+        """
+
+        self.m_log_level = level
+        if self.m_connect is not None:
+            self.m_connect.m_log_level = level
+
+    def DisableReconnect(self):
+        """
+        Do not restore broken connection
+        """
+
+        self.m_reconnect_attempts = 0
+
+    @staticmethod
+    def IsReplaySafe(command):
+        """
+        Check that command has no side effects and can be sent again
+
+        @param string command
+        @return bool
+        """
+
+        return command in MTWebAPI.REPLAY_SAFE_COMMANDS or command.endswith(MTWebAPI.REPLAY_SAFE_SUFFIXES) or \
+            command.startswith(MTWebAPI.REPLAY_SAFE_PREFIXES)
 
     def IsConnected(self):
         """
@@ -86,8 +220,11 @@ class MTWebAPI:
         """
 
         if self.m_connect is not None:
-            self.m_connect.Send(MTProtocolConsts.WEB_CMD_QUIT, '')
-            self.m_connect.Disconnect()
+            try:
+                self.m_connect.Send(MTProtocolConsts.WEB_CMD_QUIT, '')
+            finally:
+                self.m_connect.Disconnect()
+                self.m_connect = None
 
     def UserAdd(self, login, password, group, name='', pass_investor=''):
         """
@@ -104,16 +241,34 @@ class MTWebAPI:
         # check connection
         if self.m_connect is None:
             return MTRetCode.MT_RET_ERR_CONNECTION
+        # prepare the command and data
+        command = MTProtocolConsts.WEB_CMD_USER_ADD
+        error_code, data = self._UserAddData(login, password, group, name, pass_investor)
+        if error_code != MTRetCode.MT_RET_OK:
+            return error_code
+        # talk to to MT server
+        ret_code, param = self._Request(command, data)
+        # cached user is old now, failed or timed out request may have changed it too
+        if self.m_user_cache is not None:
+            self.m_user_cache.Evict(login)
+        return ret_code
+
+    @staticmethod
+    def _UserAddData(login, password, group, name='', pass_investor=''):
+        """
+        Check parameters of USER_ADD and create data of the command
+
+        @return MTRetCode, dict
+        """
+
         # check parameters
         if login == '' or login is None or password == '' or password is None or group == '' or group is None:
-            return MTRetCode.MT_RET_ERR_PARAMS
+            return MTRetCode.MT_RET_ERR_PARAMS, None
         # setup defult name and pass_investor
         if name == '':
             name = login
         if pass_investor == '':
             pass_investor = password
-        # prepare the command and data
-        command = MTProtocolConsts.WEB_CMD_USER_ADD
         data = {
             MTProtocolConsts.WEB_PARAM_PASS_MAIN: password,
             MTProtocolConsts.WEB_PARAM_LOGIN: login,
@@ -121,14 +276,296 @@ class MTWebAPI:
             MTProtocolConsts.WEB_PARAM_GROUP: group,
             MTProtocolConsts.WEB_PARAM_NAME: name
         }
-        # talk to to MT server
-        if self.m_connect.Send(command, data, False):
-            rc = self.m_connect.Read(True, False, True)
-        command, error_code = self.m_connect.ParseAnswer(rc)
-        if command == MTProtocolConsts.WEB_CMD_USER_ADD:
-            return MTConnect.GetRetCode(error_code[MTProtocolConsts.WEB_PARAM_RETCODE])
-        else:
-            return MTRetCode.MT_RET_ERROR
+        return MTRetCode.MT_RET_OK, data
+
+    def UserAddBatch(self, rows, max_in_flight=64):
+        """
+        Add many MT users, requests are pipelined on the connection.
+        Failed rows do not stop the batch.
+
+        @param rows - iterable of dicts with keys login, password, group, name, pass_investor
+                      or of tuples with the same order as UserAdd parameters
+        @param max_in_flight - max count of requests waiting for answer
+
+        @return generator of (row, MTRetCode) in order of rows
+        """
+
+        command = MTProtocolConsts.WEB_CMD_USER_ADD
+        # (row, number of packet, error code if request was not sent)
+        pending = deque()
+        network_error = self.m_connect is None
+        try:
+            for row in rows:
+                try:
+                    if isinstance(row, dict):
+                        error_code, data = self._UserAddData(**row)
+                    else:
+                        error_code, data = self._UserAddData(*row)
+                except (TypeError, ValueError, AttributeError):
+                    # row with unknown keys or wrong count of values fails alone
+                    error_code, data = MTRetCode.MT_RET_ERR_PARAMS, None
+                if network_error and error_code == MTRetCode.MT_RET_OK:
+                    error_code = MTRetCode.MT_RET_ERR_CONNECTION
+                if error_code != MTRetCode.MT_RET_OK:
+                    pending.append((row, 0, error_code))
+                else:
+                    try:
+                        pending.append((row, self.m_connect.SendPacket(command, data), MTRetCode.MT_RET_OK))
+                    except (UnicodeError, TypeError):
+                        # values which are not text, the packet is not sent
+                        pending.append((row, 0, MTRetCode.MT_RET_ERR_PARAMS))
+                    except (OSError, ValueError):
+                        # connection is broken, all the next rows fail,
+                        # a part of packet may have reached the server
+                        network_error = True
+                        self.LastRetCode = MTRetCode.MT_RET_ERR_NETWORK
+                        self._EvictRow(row)
+                        pending.append((row, 0, MTRetCode.MT_RET_ERR_CONNECTION))
+                # read answers when window is full
+                while len(pending) >= max_in_flight or (pending and pending[0][1] == 0):
+                    yield self._UserAddBatchResult(pending.popleft())
+            while pending:
+                yield self._UserAddBatchResult(pending.popleft())
+        finally:
+            # generator is closed before the end
+            for row, number, error_code in pending:
+                if number:
+                    self.m_connect.ReleasePacketNumber(number)
+
+    def _UserAddBatchResult(self, item):
+        """
+        Read answer of one request of UserAddBatch
+
+        @param tuple item - row, number of packet, error code
+        @return row, MTRetCode
+        """
+
+        row, number, error_code = item
+        if number == 0:
+            return row, error_code
+        # sent request may have changed user whatever the answer is
+        self._EvictRow(row)
+        try:
+            rc = self.m_connect.Read(True, False, True, number)
+        except (OSError, ValueError):
+            rc = ''
+        if rc == '':
+            self.LastRetCode = MTRetCode.MT_RET_ERR_NETWORK
+            return row, MTRetCode.MT_RET_ERR_NETWORK
+        command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(rc)
+        if command != MTProtocolConsts.WEB_CMD_USER_ADD:
+            return row, MTRetCode.MT_RET_ERROR
+        return row, ret_code
+
+    def _EvictRow(self, row):
+        """
+        Evict cached user of UserAddBatch row
+
+        @param dict|tuple row
+        """
+
+        if self.m_user_cache is not None:
+            self.m_user_cache.Evict(row['login'] if isinstance(row, dict) else row[0])
+
+    def UserGet(self, login):
+        """
+        Get a MT user, with user cache the answer can be from cache
+        @param login
+
+        @return MTRetCode, dict user
+        """
+
+        if login == '' or login is None:
+            return MTRetCode.MT_RET_ERR_PARAMS, None
+        if self.m_user_cache is not None:
+            return self.m_user_cache.GetUser(login)
+        return self._GetJson(MTProtocolConsts.WEB_CMD_USER_GET, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        })
+
+    def UserAccountGet(self, login):
+        """
+        Get a MT user's trade account state, with user cache the answer can be from cache
+        @param login
+
+        @return MTRetCode, dict account
+        """
+
+        if login == '' or login is None:
+            return MTRetCode.MT_RET_ERR_PARAMS, None
+        if self.m_user_cache is not None:
+            return self.m_user_cache.GetAccount(login)
+        return self._GetJson(MTProtocolConsts.WEB_CMD_USER_ACCOUNT_GET, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        })
+
+    def UserAccountGetBatch(self, logins, max_in_flight=64):
+        """
+        Get trade accounts of many MT users, requests are pipelined on the connection.
+        Failed logins do not stop the batch, user cache is not used.
+
+        @param logins - iterable of logins
+        @param max_in_flight - max count of requests waiting for answer
+
+        @return generator of (login, MTRetCode, dict account) in order of logins
+        """
+
+        return self._JsonBatch(MTProtocolConsts.WEB_CMD_USER_ACCOUNT_GET, logins, lambda login: {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        }, max_in_flight)
+
+    def PositionGetBatch(self, logins, max_in_flight=64, page_size=100):
+        """
+        Get open positions of many MT users. The first pages of all logins are pipelined
+        on the connection, the next pages of login with many positions are read after its first page.
+        Failed logins do not stop the batch.
+
+        @param logins - iterable of logins
+        @param max_in_flight - max count of requests waiting for answer
+        @param page_size - count of positions in one request
+
+        @return generator of (login, MTRetCode, list of positions) in order of logins
+        """
+
+        command = MTProtocolConsts.WEB_CMD_POSITION_GET_PAGE
+        page_size = max(int(page_size), 1)
+        batch = self._JsonBatch(command, logins, lambda login: self._PositionPageData(login, 0, page_size),
+                                max_in_flight, True)
+        try:
+            for login, ret_code, positions in batch:
+                page = positions
+                while ret_code == MTRetCode.MT_RET_OK and len(page) == page_size:
+                    ret_code, page = self._GetJson(command, self._PositionPageData(login, len(positions), page_size),
+                                                   True)
+                    if ret_code == MTRetCode.MT_RET_OK:
+                        positions.extend(page)
+                yield login, ret_code, (positions if ret_code == MTRetCode.MT_RET_OK else None)
+        finally:
+            batch.close()
+
+    @staticmethod
+    def _PositionPageData(login, offset, page_size):
+        """
+        @return dict data of POSITION_GET_PAGE
+        """
+
+        return {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login),
+            MTProtocolConsts.WEB_PARAM_OFFSET: str(offset),
+            MTProtocolConsts.WEB_PARAM_TOTAL: str(page_size)
+        }
+
+    def _JsonBatch(self, command, keys, data_of, max_in_flight, is_array=False):
+        """
+        Send one request with json answer per key, requests are pipelined on the connection
+
+        @param string command
+        @param keys - iterable of keys
+        @param data_of - function of key returning data of request
+        @param max_in_flight - max count of requests waiting for answer
+        @param bool is_array - body is json array
+
+        @return generator of (key, MTRetCode, list|dict|None) in order of keys
+        """
+
+        # (key, number of packet, error code if request was not sent)
+        pending = deque()
+        network_error = self.m_connect is None
+        try:
+            for key in keys:
+                if network_error:
+                    pending.append((key, 0, MTRetCode.MT_RET_ERR_CONNECTION))
+                else:
+                    try:
+                        pending.append((key, self.m_connect.SendPacket(command, data_of(key)), MTRetCode.MT_RET_OK))
+                    except (OSError, ValueError):
+                        # connection is broken, all the next keys fail
+                        network_error = True
+                        self.LastRetCode = MTRetCode.MT_RET_ERR_NETWORK
+                        pending.append((key, 0, MTRetCode.MT_RET_ERR_CONNECTION))
+                # read answers when window is full
+                while len(pending) >= max_in_flight or (pending and pending[0][1] == 0):
+                    yield self._JsonBatchResult(command, pending.popleft(), is_array)
+            while pending:
+                yield self._JsonBatchResult(command, pending.popleft(), is_array)
+        finally:
+            # generator is closed before the end
+            for key, number, error_code in pending:
+                if number:
+                    self.m_connect.ReleasePacketNumber(number)
+
+    def _JsonBatchResult(self, command, item, is_array):
+        """
+        Read answer of one request of _JsonBatch
+
+        @param string command
+        @param tuple item - key, number of packet, error code
+        @param bool is_array - body is json array
+        @return key, MTRetCode, list|dict|None
+        """
+
+        key, number, error_code = item
+        if number == 0:
+            return key, error_code, None
+        try:
+            ret_code, result = self._ReadJsonAnswer(command, number, is_array)
+        except (OSError, ValueError):
+            ret_code, result = MTRetCode.MT_RET_ERR_NETWORK, None
+        if ret_code == MTRetCode.MT_RET_ERR_NETWORK:
+            self.LastRetCode = ret_code
+        return key, ret_code, result
+
+    def UserLogins(self, group):
+        """
+        Get logins of MT users in group
+        @param group - group or group mask, for example real\\*
+
+        @return MTRetCode, list of int logins
+        """
+
+        ret_code, logins = self._GetJson(MTProtocolConsts.WEB_CMD_USER_USER_LOGINS, {
+            MTProtocolConsts.WEB_PARAM_GROUP: group
+        }, True)
+        if ret_code != MTRetCode.MT_RET_OK:
+            return ret_code, []
+        return ret_code, [int(login) for login in logins or ()]
+
+    def UserDelete(self, login):
+        """
+        Delete a MT user
+        @param login
+
+        @return MTRetCode
+        """
+
+        if login == '' or login is None:
+            return MTRetCode.MT_RET_ERR_PARAMS
+        ret_code, result = self._GetJson(MTProtocolConsts.WEB_CMD_USER_DELETE, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        })
+        if self.m_user_cache is not None:
+            self.m_user_cache.Evict(login)
+        return ret_code
+
+    def EnableUserCache(self, size=10000, max_age=30):
+        """
+        Serve UserGet and UserAccountGet from local cache,
+        changes of users by this api evict them from cache
+        @param size    - max count of cached users
+        @param max_age - seconds cached user is valid
+
+        @return MTUserCache
+        """
+
+        self.m_user_cache = MTUserCache(self, size, max_age)
+        return self.m_user_cache
+
+    def DisableUserCache(self):
+        """
+        Stop caching users
+        """
+
+        self.m_user_cache = None
 
     def SetUserGroup(self, login, group, leverage=''):
         """
@@ -153,13 +590,11 @@ class MTWebAPI:
             MTProtocolConsts.WEB_PARAM_LEVERAGE: leverage
         }
         # talk to to MT server
-        if self.m_connect.Send(command, data, False):
-            rc = self.m_connect.Read(True, False, True)
-        command, error_code = self.m_connect.ParseAnswer(rc)
-        if command == MTProtocolConsts.WEB_CMD_USER_UPDATE:
-            return MTConnect.GetRetCode(error_code[MTProtocolConsts.WEB_PARAM_RETCODE])
-        else:
-            return MTRetCode.MT_RET_ERROR
+        ret_code, param = self._Request(command, data)
+        # cached user is old now, failed or timed out request may have changed it too
+        if self.m_user_cache is not None:
+            self.m_user_cache.Evict(login)
+        return ret_code
 
     def SetUserBalance(self, login, balance_type, balance, comment):
         """
@@ -194,13 +629,11 @@ class MTWebAPI:
             MTProtocolConsts.WEB_PARAM_CHECK_MARGIN: '1'
         }
         # talk to to MT server
-        if self.m_connect.Send(command, data, False):
-            rc = self.m_connect.Read(True, False, True)
-        command, error_code = self.m_connect.ParseAnswer(rc)
-        if command == MTProtocolConsts.WEB_CMD_TRADE_BALANCE:
-            return MTConnect.GetRetCode(error_code[MTProtocolConsts.WEB_PARAM_RETCODE])
-        else:
-            return MTRetCode.MT_RET_ERROR
+        ret_code, param = self._Request(command, data)
+        # cached user is old now, failed or timed out request may have changed it too
+        if self.m_user_cache is not None:
+            self.m_user_cache.Evict(login)
+        return ret_code
 
     def SetUserPassword(self, login, password, pass_type='MAIN'):
         """
@@ -226,13 +659,11 @@ class MTWebAPI:
             MTProtocolConsts.WEB_PARAM_PASSWORD: password
         }
         # talk to to MT server
-        if self.m_connect.Send(command, data, False):
-            rc = self.m_connect.Read(True, False, True)
-        command, error_code = self.m_connect.ParseAnswer(rc)
-        if command == MTProtocolConsts.WEB_CMD_USER_PASS_CHANGE:
-            return MTConnect.GetRetCode(error_code[MTProtocolConsts.WEB_PARAM_RETCODE])
-        else:
-            return MTRetCode.MT_RET_ERROR
+        ret_code, param = self._Request(command, data)
+        # cached user is old now, failed or timed out request may have changed it too
+        if self.m_user_cache is not None:
+            self.m_user_cache.Evict(login)
+        return ret_code
 
     def SetSymbolSwap(self, symbol_name, swap_long, swap_short):
         """
@@ -263,13 +694,786 @@ class MTWebAPI:
             MTProtocolConsts.WEB_PARAM_BODYTEXT: json_string
         }
         # talk to to MT server
-        if self.m_connect.Send(command, data, False):
-            rc = self.m_connect.Read(True, False, True)
-        command, error_code = self.m_connect.ParseAnswer(rc)
-        if command == MTProtocolConsts.WEB_CMD_SYMBOL_ADD:
-            return MTConnect.GetRetCode(error_code[MTProtocolConsts.WEB_PARAM_RETCODE])
-        else:
-            return MTRetCode.MT_RET_ERROR
+        ret_code, param = self._Request(command, data)
+        # cached symbol is old now
+        if ret_code == MTRetCode.MT_RET_OK and self.m_symbol_cache is not None:
+            self.m_symbol_cache.Invalidate(symbol_name)
+        return ret_code
+
+    def MailSend(self, to, subject, body):
+        """
+        Send mail to clients
+        @param to      - login, group or list of them, masks are allowed
+        @param subject - subject of mail
+        @param body    - text of mail, str, UTF-8 bytes or file, big body is streamed by frames
+
+        @return MTRetCode
+        """
+
+        if not to or subject is None or body is None:
+            return MTRetCode.MT_RET_ERR_PARAMS
+        ret_code, param = self._Request(MTProtocolConsts.WEB_CMD_MAIL_SEND, {
+            MTProtocolConsts.WEB_PARAM_TO: to if isinstance(to, str) else ','.join(str(item) for item in to),
+            MTProtocolConsts.WEB_PARAM_SUBJECT: subject,
+            MTProtocolConsts.WEB_PARAM_BODYTEXT: body
+        })
+        return ret_code
+
+    def NewsSend(self, subject, body, category='', language=0, priority=0):
+        """
+        Send news
+        @param subject  - subject of news
+        @param body     - text of news, str, UTF-8 bytes or file, big body is streamed by frames
+        @param category - category of news
+        @param language - LANGID of news, 0 for all
+        @param priority - 1 for priority news
+
+        @return MTRetCode
+        """
+
+        if subject is None or body is None:
+            return MTRetCode.MT_RET_ERR_PARAMS
+        ret_code, param = self._Request(MTProtocolConsts.WEB_CMD_NEWS_SEND, {
+            MTProtocolConsts.WEB_PARAM_SUBJECT: subject,
+            MTProtocolConsts.WEB_PARAM_CATEGORY: category,
+            MTProtocolConsts.WEB_PARAM_LANGUAGE: str(language),
+            MTProtocolConsts.WEB_PARAM_PRIORITY: str(priority),
+            MTProtocolConsts.WEB_PARAM_BODYTEXT: body
+        })
+        return ret_code
+
+    def _Request(self, command, data):
+        """
+        Send command and get parameters of answer
+
+        @param string command
+        @param dict data
+
+        @return MTRetCode, dict parameters of answer
+        """
+
+        ret_code, items, param = self._Talk(command, data)
+        return ret_code, param
+
+    def _Talk(self, command, data, is_json=False, is_binary=False):
+        """
+        Send command and read answer, see _Exchange. MTRetCode is kept in LastRetCode
+
+        @return MTRetCode, list|memoryview|None json items or binary body, dict parameters of answer
+        """
+
+        result = self._Exchange(command, data, is_json, is_binary)
+        self.LastRetCode = result[0]
+        return result
+
+    def _Exchange(self, command, data, is_json=False, is_binary=False):
+        """
+        Send command and read answer. If reconnect is enabled, broken connection is restored
+        and command without side effects is sent again on the new connection.
+        Timeout of answer on alive connection returns MT_RET_ERR_TIMEOUT without reconnect,
+        lost connection returns MT_RET_ERR_NETWORK if reconnect is disabled.
+
+        @param string command
+        @param dict data
+        @param bool is_json   - answer has json body
+        @param bool is_binary - answer has binary body, it is returned as memoryview instead of items
+
+        @return MTRetCode, list|memoryview|None json items or binary body, dict parameters of answer
+        """
+
+        replay = MTWebAPI.IsReplaySafe(command)
+        # body read from file can not be sent again
+        if replay and isinstance(data, dict) and hasattr(data.get(MTProtocolConsts.WEB_PARAM_BODYTEXT), 'read'):
+            replay = False
+        tries = 0
+        while True:
+            connect = self.m_connect
+            if connect is None:
+                return MTRetCode.MT_RET_ERR_CONNECTION, None, {}
+            sent = False
+            items = None
+            # time is taken only for metrics
+            metrics = self.m_metrics
+            start = time.perf_counter() if metrics is not None else 0
+            try:
+                number = connect.SendPacket(command, data)
+                sent = True
+                if is_json:
+                    ret_code, items, param = self._ReadJsonItems(command, number, connect)
+                    lost = ret_code == MTRetCode.MT_RET_ERR_NETWORK or \
+                        (ret_code == MTRetCode.MT_RET_ERR_DATA and not connect.IsAlive())
+                elif is_binary:
+                    answer = connect.Read(True, True, False, number)
+                    answer_command, param, ret_code, body_offset = \
+                        MTConnect.ParseAnswerLine(MTConnect.GetBinaryLine(answer))
+                    lost = len(answer) == 0
+                    if answer_command != command:
+                        ret_code = MTRetCode.MT_RET_ERROR
+                    elif ret_code == MTRetCode.MT_RET_OK:
+                        items = connect.GetBinary(answer)
+                else:
+                    rc = connect.Read(True, False, True, number)
+                    answer_command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(rc)
+                    lost = rc == ''
+                    if answer_command != command:
+                        ret_code = MTRetCode.MT_RET_ERROR
+            except UnicodeError:
+                # text of request can not be encoded, connection is dropped if a part was sent
+                if not connect.IsAlive():
+                    self._Reconnect(connect)
+                return MTRetCode.MT_RET_ERR_PARAMS, None, {}
+            except socket.timeout:
+                # answer is late but connection is alive, the answer is dropped when it comes,
+                # other requests in flight on the connection are kept
+                if not sent or not connect.IsAlive():
+                    lost = True
+                else:
+                    lost = False
+                    ret_code, items, param = MTRetCode.MT_RET_ERR_TIMEOUT, None, {}
+            except (OSError, ValueError):
+                lost = True
+            if not lost:
+                if metrics is not None:
+                    metrics.ObserveCommand(command, time.perf_counter() - start, ret_code)
+                return ret_code, items, param
+            # without reconnect lost connection is network error as before
+            if self.m_reconnect_attempts == 0:
+                return MTRetCode.MT_RET_ERR_NETWORK, None, {}
+            # connection is lost, the server may have done command or not
+            if sent and not replay:
+                self._Reconnect(connect)
+                return MTRetCode.MT_RET_ERR_OUTCOME_UNKNOWN, None, {}
+            if tries >= self.m_reconnect_attempts:
+                return MTRetCode.MT_RET_ERR_NETWORK, None, {}
+            tries += 1
+            ret_code = self._Reconnect(connect)
+            if ret_code != MTRetCode.MT_RET_OK:
+                return ret_code, None, {}
+
+    def _Reconnect(self, broken):
+        """
+        Replace broken connection by new one with the same credentials
+
+        @param MTConnect broken - connection failed in request
+        @return MTRetCode
+        """
+
+        if self.m_reconnect_attempts == 0 or self.m_server is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION
+        with self._reconnect_lock:
+            # another thread has already reconnected
+            if self.m_connect is not broken:
+                return MTRetCode.MT_RET_OK if self.m_connect is not None else MTRetCode.MT_RET_ERR_CONNECTION
+            now = time.time()
+            while self._reconnects and now - self._reconnects[0] > self.m_reconnect_period:
+                self._reconnects.popleft()
+            if len(self._reconnects) >= self.m_reconnect_budget:
+                return MTRetCode.MT_RET_ERR_CONNECTION
+            self._reconnects.append(now)
+            # threads waiting for answers on the broken connection get lost answers
+            broken.Drop()
+            try:
+                broken.Disconnect()
+            except OSError:
+                pass
+            error_code = MTRetCode.MT_RET_ERR_CONNECTION
+            for attempt in range(self.m_reconnect_attempts):
+                if attempt > 0:
+                    time.sleep(MTUtils.BackoffDelay(attempt - 1, self.m_reconnect_backoff,
+                                                    self.m_reconnect_backoff_max))
+                try:
+                    error_code, connect = self._Open(*self.m_server)
+                except (OSError, ValueError):
+                    error_code = MTRetCode.MT_RET_ERR_CONNECTION
+                    continue
+                if error_code == MTRetCode.MT_RET_OK:
+                    self.m_connect = connect
+                    if self.m_metrics is not None:
+                        self.m_metrics.AddReconnect()
+                    return error_code
+                # wrong credentials are not fixed by next try
+                if error_code not in (MTRetCode.MT_RET_ERR_NETWORK, MTRetCode.MT_RET_ERR_CONNECTION,
+                                      MTRetCode.MT_RET_ERR_TIMEOUT, MTRetCode.MT_RET_AUTH_SERVER_BUSY):
+                    break
+            return error_code
+
+    def _GetJson(self, command, data, is_array=False):
+        """
+        Send command and get json body of answer
+
+        @param string command
+        @param dict data
+        @param bool is_array - body is json array
+
+        @return MTRetCode, list|dict|None
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION, None
+        ret_code, items, param = self._Talk(command, data, True)
+        if is_array or items is None:
+            return ret_code, items
+        return ret_code, (items[0] if items else None)
+
+    def _GetBinary(self, command, data):
+        """
+        Send command and get binary body of answer, body is a view over received data
+
+        @param string command
+        @param dict data
+
+        @return MTRetCode, memoryview|None
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION, None
+        ret_code, body, param = self._Talk(command, data, False, True)
+        return ret_code, body
+
+    def _ReadJsonAnswer(self, command, number, is_array=False):
+        """
+        Read answer with json body
+
+        @param string command - command of request
+        @param int number     - number of packet
+        @param bool is_array  - body is json array
+
+        @return MTRetCode, list|dict|None
+        """
+
+        ret_code, items, param = self._ReadJsonItems(command, number)
+        if is_array or items is None:
+            return ret_code, items
+        return ret_code, (items[0] if items else None)
+
+    def _ReadJsonItems(self, command, number, connect=None):
+        """
+        Read answer with json body and parameters of answer
+
+        @param string command     - command of request
+        @param int number         - number of packet
+        @param MTConnect connect  - connection of packet, by default the current one
+
+        @return MTRetCode, list|None items, dict parameters of answer
+        """
+
+        if connect is None:
+            connect = self.m_connect
+        answer, records = connect.ReadJson(number)
+        try:
+            answer_command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(answer)
+            if answer_command != command:
+                return (MTRetCode.MT_RET_ERR_NETWORK if answer == '' else MTRetCode.MT_RET_ERROR), None, param
+            if ret_code != MTRetCode.MT_RET_OK:
+                return ret_code, None, param
+            try:
+                items = list(records)
+            except ValueError:
+                return MTRetCode.MT_RET_ERR_DATA, None, param
+        finally:
+            records.close()
+        return ret_code, items, param
+
+    def TickLast(self, symbol, group='', trans_id=0):
+        """
+        Get last ticks of symbols
+        @param symbol   - symbol or list of symbols, masks are allowed
+        @param group    - group for prices with spread of group, empty for prices of server
+        @param trans_id - id from previous call, 0 for all ticks
+
+        @return MTRetCode, list of ticks, int trans_id for next call
+        """
+
+        command = MTProtocolConsts.WEB_CMD_TICK_LAST
+        data = {MTProtocolConsts.WEB_PARAM_SYMBOL: symbol if isinstance(symbol, str) else ','.join(symbol),
+                MTProtocolConsts.WEB_PARAM_TRANS_ID: str(trans_id)}
+        if group:
+            command = MTProtocolConsts.WEB_CMD_TICK_LAST_GROUP
+            data[MTProtocolConsts.WEB_PARAM_GROUP] = group
+        return self._GetTicks(command, data, trans_id)
+
+    def TickLastGroup(self, group, symbol='*', trans_id=0):
+        """
+        Get last ticks of all symbols of group by one request
+        @param group    - group name
+        @param symbol   - symbol or list of symbols, masks are allowed
+        @param trans_id - id from previous call, 0 for all ticks
+
+        @return MTRetCode, list of ticks, int trans_id for next call
+        """
+
+        if not group:
+            return MTRetCode.MT_RET_ERR_PARAMS, None, trans_id
+        return self.TickLast(symbol, group, trans_id)
+
+    def _GetTicks(self, command, data, trans_id):
+        """
+        Send tick request
+
+        @return MTRetCode, list of ticks, int trans_id
+        """
+
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION, None, trans_id
+        ret_code, ticks, param = self._Talk(command, data, True)
+        if ret_code != MTRetCode.MT_RET_OK:
+            return ret_code, None, trans_id
+        try:
+            trans_id = int(param.get(MTProtocolConsts.WEB_PARAM_TRANS_ID, trans_id))
+        except ValueError:
+            return MTRetCode.MT_RET_ERR_DATA, None, trans_id
+        return ret_code, ticks, trans_id
+
+    def SymbolTotal(self):
+        """
+        Get count of symbols
+
+        @return MTRetCode, int total
+        """
+
+        return self._GetTotal(MTProtocolConsts.WEB_CMD_SYMBOL_TOTAL, {})
+
+    def SymbolNext(self, index):
+        """
+        Get symbol by index
+        @param index from 0 to SymbolTotal() - 1
+
+        @return MTRetCode, dict symbol
+        """
+
+        return self._GetJson(MTProtocolConsts.WEB_CMD_SYMBOL_NEXT, {
+            MTProtocolConsts.WEB_PARAM_INDEX: str(index)
+        })
+
+    def SymbolGet(self, symbol_name):
+        """
+        Get symbol by name
+        @param symbol_name
+
+        @return MTRetCode, dict symbol
+        """
+
+        if symbol_name == '' or symbol_name is None:
+            return MTRetCode.MT_RET_ERR_PARAMS, None
+        return self._GetJson(MTProtocolConsts.WEB_CMD_SYMBOL_GET, {
+            MTProtocolConsts.WEB_PARAM_SYMBOL: symbol_name
+        })
+
+    def SymbolGetGroup(self, symbol_name, group):
+        """
+        Get symbol with settings of group
+        @param symbol_name
+        @param group
+
+        @return MTRetCode, dict symbol
+        """
+
+        if symbol_name == '' or symbol_name is None or group == '' or group is None:
+            return MTRetCode.MT_RET_ERR_PARAMS, None
+        return self._GetJson(MTProtocolConsts.WEB_CMD_SYMBOL_GET_GROUP, {
+            MTProtocolConsts.WEB_PARAM_SYMBOL: symbol_name,
+            MTProtocolConsts.WEB_PARAM_GROUP: group
+        })
+
+    def SymbolAdd(self, symbol):
+        """
+        Add or update symbol
+        @param dict symbol - symbol config, Symbol field is required
+
+        @return MTRetCode, dict symbol from server
+        """
+
+        if not symbol or not symbol.get('Symbol'):
+            return MTRetCode.MT_RET_ERR_PARAMS, None
+        ret_code, result = self._GetJson(MTProtocolConsts.WEB_CMD_SYMBOL_ADD, {
+            MTProtocolConsts.WEB_PARAM_BODYTEXT: json.dumps(symbol)
+        })
+        if ret_code == MTRetCode.MT_RET_OK and self.m_symbol_cache is not None:
+            if result:
+                self.m_symbol_cache.Update(result)
+            else:
+                self.m_symbol_cache.Invalidate(symbol['Symbol'])
+        return ret_code, result
+
+    def SymbolDelete(self, symbol_name):
+        """
+        Delete symbol
+        @param symbol_name
+
+        @return MTRetCode
+        """
+
+        if symbol_name == '' or symbol_name is None:
+            return MTRetCode.MT_RET_ERR_PARAMS
+        ret_code, result = self._GetJson(MTProtocolConsts.WEB_CMD_SYMBOL_DELETE, {
+            MTProtocolConsts.WEB_PARAM_SYMBOL: symbol_name
+        })
+        if ret_code == MTRetCode.MT_RET_OK and self.m_symbol_cache is not None:
+            self.m_symbol_cache.Remove(symbol_name)
+        return ret_code
+
+    def SymbolGetAll(self, max_in_flight=32):
+        """
+        Get all symbols, SYMBOL_NEXT requests are pipelined
+
+        @param max_in_flight - max count of requests waiting for answer
+
+        @return MTRetCode, list of symbols
+        """
+
+        ret_code, total = self.SymbolTotal()
+        if ret_code != MTRetCode.MT_RET_OK:
+            return ret_code, []
+        command = MTProtocolConsts.WEB_CMD_SYMBOL_NEXT
+        symbols = []
+        pending = deque()
+        index = 0
+        try:
+            while index < total or pending:
+                # keep window of requests full
+                while index < total and len(pending) < max_in_flight:
+                    pending.append(self.m_connect.SendPacket(command, {
+                        MTProtocolConsts.WEB_PARAM_INDEX: str(index)
+                    }))
+                    index += 1
+                ret_code, symbol = self._ReadJsonAnswer(command, pending.popleft())
+                if ret_code != MTRetCode.MT_RET_OK:
+                    return ret_code, symbols
+                if symbol is not None:
+                    symbols.append(symbol)
+        finally:
+            for number in pending:
+                self.m_connect.ReleasePacketNumber(number)
+        return MTRetCode.MT_RET_OK, symbols
+
+    def _GetTotal(self, command, data):
+        """
+        Get count of records by *_GET_TOTAL command
+
+        @param string command
+        @param dict data
+
+        @return MTRetCode, int total
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION, 0
+        # talk to to MT server
+        error_code, param = self._Request(command, data)
+        if error_code != MTRetCode.MT_RET_OK:
+            return error_code, 0
+        return error_code, int(param.get(MTProtocolConsts.WEB_PARAM_TOTAL, 0))
+
+    def DealGetTotal(self, login, from_time, to_time):
+        """
+        Get count of user's deals in period
+        @param login
+        @param from_time unix time
+        @param to_time   unix time
+
+        @return MTRetCode, int total
+        """
+
+        return self._GetTotal(MTProtocolConsts.WEB_CMD_DEAL_GET_TOTAL, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login),
+            MTProtocolConsts.WEB_PARAM_FROM: str(from_time),
+            MTProtocolConsts.WEB_PARAM_TO: str(to_time)
+        })
+
+    def PositionGetTotal(self, login):
+        """
+        Get count of user's open positions
+        @param login
+
+        @return MTRetCode, int total
+        """
+
+        return self._GetTotal(MTProtocolConsts.WEB_CMD_POSITION_GET_TOTAL, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        })
+
+    def OrderGetTotal(self, login):
+        """
+        Get count of user's open orders
+        @param login
+
+        @return MTRetCode, int total
+        """
+
+        return self._GetTotal(MTProtocolConsts.WEB_CMD_ORDER_GET_TOTAL, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        })
+
+    def HistoryGetTotal(self, login, from_time, to_time):
+        """
+        Get count of user's history orders in period
+        @param login
+        @param from_time unix time
+        @param to_time   unix time
+
+        @return MTRetCode, int total
+        """
+
+        return self._GetTotal(MTProtocolConsts.WEB_CMD_HISTORY_GET_TOTAL, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login),
+            MTProtocolConsts.WEB_PARAM_FROM: str(from_time),
+            MTProtocolConsts.WEB_PARAM_TO: str(to_time)
+        })
+
+    def IterDeals(self, login, from_time, to_time, page_size=100):
+        """
+        Iterate user's deals in period page by page
+        @param login
+        @param from_time unix time
+        @param to_time   unix time
+        @param page_size count of deals in one request
+
+        @return MTPageReader of deal dicts
+        """
+
+        return MTPageReader(self, MTProtocolConsts.WEB_CMD_DEAL_GET_TOTAL, MTProtocolConsts.WEB_CMD_DEAL_GET_PAGE, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login),
+            MTProtocolConsts.WEB_PARAM_FROM: str(from_time),
+            MTProtocolConsts.WEB_PARAM_TO: str(to_time)
+        }, page_size)
+
+    def IterPositions(self, login, page_size=100):
+        """
+        Iterate user's open positions page by page
+        @param login
+        @param page_size count of positions in one request
+
+        @return MTPageReader of position dicts
+        """
+
+        return MTPageReader(self, MTProtocolConsts.WEB_CMD_POSITION_GET_TOTAL,
+                            MTProtocolConsts.WEB_CMD_POSITION_GET_PAGE, {
+                                MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+                            }, page_size)
+
+    def IterOrders(self, login, page_size=100):
+        """
+        Iterate user's open orders page by page
+        @param login
+        @param page_size count of orders in one request
+
+        @return MTPageReader of order dicts
+        """
+
+        return MTPageReader(self, MTProtocolConsts.WEB_CMD_ORDER_GET_TOTAL, MTProtocolConsts.WEB_CMD_ORDER_GET_PAGE, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        }, page_size)
+
+    def IterHistory(self, login, from_time, to_time, page_size=100):
+        """
+        Iterate user's history orders in period page by page
+        @param login
+        @param from_time unix time
+        @param to_time   unix time
+        @param page_size count of orders in one request
+
+        @return MTPageReader of order dicts
+        """
+
+        return MTPageReader(self, MTProtocolConsts.WEB_CMD_HISTORY_GET_TOTAL,
+                            MTProtocolConsts.WEB_CMD_HISTORY_GET_PAGE, {
+                                MTProtocolConsts.WEB_PARAM_LOGIN: str(login),
+                                MTProtocolConsts.WEB_PARAM_FROM: str(from_time),
+                                MTProtocolConsts.WEB_PARAM_TO: str(to_time)
+                            }, page_size)
 
     def Ping(self):
-        pass
+        """
+        Send PING to keep connection, answer is not waited
+
+        @return MTRetCode
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION
+        self.m_connect.SendPing()
+        return MTRetCode.MT_RET_OK
+
+    def PingTime(self):
+        """
+        Measure round trip time by TIME_SERVER request
+
+        @return MTRetCode, float seconds
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION, 0.0
+        start = time.perf_counter()
+        ret_code, param = self._Request(MTProtocolConsts.WEB_CMD_TIME_SERVER, {})
+        rtt = time.perf_counter() - start
+        if ret_code == MTRetCode.MT_RET_OK:
+            self.LastRtt = rtt
+        return ret_code, rtt
+
+
+class MTPageReader:
+    """
+    Iterator of records from *_GET_PAGE commands.
+    The next page is requested while the current one is processed,
+    only two pages are in memory at once.
+    """
+
+    # MTWebAPI
+    m_api = None
+    # commands
+    m_total_command = ''
+    m_page_command = ''
+    # parameters of commands
+    m_data = None
+    # count of records in one page
+    m_page_size = 100
+    # result of iteration, check it after the end of loop
+    RetCode = MTRetCode.MT_RET_OK
+    # count of records on server
+    Total = 0
+
+    def __init__(self, api, total_command, page_command, data, page_size):
+        """
+        @param MTWebAPI api
+        @param string total_command - command to get count of records
+        @param string page_command  - command to get page of records
+        @param dict data            - parameters of both commands
+        @param int page_size        - count of records in one page
+
+        @return MTPageReader
+        """
+
+        self.m_api = api
+        self.m_total_command = total_command
+        self.m_page_command = page_command
+        self.m_data = data
+        self.m_page_size = max(int(page_size), 1)
+        self.RetCode = MTRetCode.MT_RET_OK
+        self.Total = 0
+
+    def __iter__(self):
+        """
+        @return generator of records
+        """
+
+        pages = self._Pages()
+        try:
+            for number in pages:
+                records = self._ReadPage(number)
+                if records is None:
+                    return
+                count = 0
+                try:
+                    for record in records:
+                        count += 1
+                        yield record
+                except ValueError:
+                    self.RetCode = MTRetCode.MT_RET_ERR_DATA
+                    return
+                finally:
+                    records.close()
+                # server has less records than expected
+                if count < self.m_page_size:
+                    return
+        finally:
+            # iteration is stopped, answer of prefetched page is not needed
+            pages.close()
+
+    def Columns(self, schema=None):
+        """
+        Read all records into typed numpy arrays, a page goes to columns at once
+
+        @param list schema - list of (field, type), by default schema of page command
+        @return MTRetCode, MTColumns
+        """
+
+        if schema is None:
+            schema = MTColumnSchema.ForCommand(self.m_page_command)
+        builder = MTColumnBuilder(schema)
+        pages = self._Pages()
+        try:
+            for number in pages:
+                records = self._ReadPage(number)
+                if records is None:
+                    break
+                try:
+                    page = list(records)
+                    builder.Append(page)
+                except ValueError:
+                    self.RetCode = MTRetCode.MT_RET_ERR_DATA
+                    break
+                finally:
+                    records.close()
+                # server has less records than expected
+                if len(page) < self.m_page_size:
+                    break
+        finally:
+            pages.close()
+        return self.RetCode, builder.Result()
+
+    def _Pages(self):
+        """
+        Send requests of pages, the next page is requested before the current one is processed.
+        Answer of yielded number is read by caller, prefetched page is released when generator is closed.
+
+        @return generator of int numbers of packets
+        """
+
+        self.RetCode, self.Total = self.m_api._GetTotal(self.m_total_command, self.m_data)
+        if self.RetCode != MTRetCode.MT_RET_OK or self.Total == 0:
+            return
+        offset = 0
+        number = self._SendPage(offset)
+        try:
+            while number != 0:
+                # ask the next page before processing of the current
+                next_number = 0
+                if offset + self.m_page_size < self.Total:
+                    next_number = self._SendPage(offset + self.m_page_size)
+                current, number = number, next_number
+                yield current
+                offset += self.m_page_size
+        finally:
+            if number != 0:
+                self.m_api.m_connect.ReleasePacketNumber(number)
+
+    def _SendPage(self, offset):
+        """
+        Send request of page
+
+        @param int offset - index of the first record
+        @return int number of packet
+        """
+
+        data = dict(self.m_data)
+        data[MTProtocolConsts.WEB_PARAM_OFFSET] = str(offset)
+        data[MTProtocolConsts.WEB_PARAM_TOTAL] = str(self.m_page_size)
+        return self.m_api.m_connect.SendPacket(self.m_page_command, data)
+
+    def _ReadPage(self, number):
+        """
+        Read answer with page, records are decoded while page is received
+
+        @param int number - number of packet
+        @return generator|None records, None on error
+        """
+
+        connect = self.m_api.m_connect
+        answer, records = connect.ReadJson(number)
+        command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(answer)
+        if command != self.m_page_command:
+            records.close()
+            self.RetCode = MTRetCode.MT_RET_ERR_NETWORK if answer == '' else MTRetCode.MT_RET_ERROR
+            if answer == '':
+                self.m_api.LastRetCode = self.RetCode
+            return None
+        self.RetCode = ret_code
+        if self.RetCode != MTRetCode.MT_RET_OK:
+            records.close()
+            return None
+        return records
@@ -0,0 +1,1384 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import asyncio
+import time
+from collections import deque
+from mt5_auth import *
+from mt5_protocol import *
+from mt5_utils import *
+from mt5_connect import *
+from mt5_retcode import *
+from mt5_api import *
+import json
+
+
+class AsyncMTConnect(MTConnect):
+    """
+    Connect to MetaTrader 5 server over asyncio streams,
+    many packets can wait for answer at the same time
+    """
+
+    # asyncio streams
+    _reader = None
+    _writer = None
+    # task reading frames from server
+    _reader_task = None
+    # queues of answers parts by number of packet
+    _queues = None
+
+    def __init__(self, ip_mt5, port_mt5, timeout, is_crypt):
+        """
+        @param  string ip_mt5              host or ip for MetaTrader 5 server
+        @param  int    port_mt5            port to MetaTrader 5 server
+        @param  int    timeout             time out of connection and of waiting answer
+        @param bool    is_crypt            - need crypt connection
+
+        @return AsyncMTConnect
+        """
+
+        self._ip_mt5 = ip_mt5
+        self._port_mt5 = port_mt5
+        self._timeout_connection = timeout
+        self.is_crypt = is_crypt
+        self._client_command = 0
+        self._decoder = MTFrameDecoder()
+        self._queues = {}
+        self._in_flight = set()
+        self._broken = False
+
+    async def Connect(self):
+        """
+        Open connection to MetaTrader 5 server
+        @return MTRetCode
+        """
+
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self._ip_mt5, self._port_mt5), self._timeout_connection)
+        self._reader_task = asyncio.ensure_future(self._ReadLoop())
+        return MTRetCode.MT_RET_OK
+
+    async def Disconnect(self):
+        """
+        Close connection
+        """
+
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            self._reader_task = None
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except (OSError, asyncio.CancelledError):
+                pass
+            self._writer = None
+        # readers waiting for answers get lost answers
+        self._broken = True
+        for queue in self._queues.values():
+            queue.put_nowait((None, 0))
+
+    def NextPacketNumber(self):
+        """
+        Get number for the next client packet, numbers of packets in flight are skipped
+
+        @return int|None None if all numbers are busy
+        """
+
+        if len(self._in_flight) >= self.MAX_CLIENT_COMMAND:
+            return None
+        number = self._client_command
+        while True:
+            number += 1
+            # packet max, than first
+            if number > self.MAX_CLIENT_COMMAND:
+                number = 1
+            if number not in self._in_flight:
+                break
+        self._in_flight.add(number)
+        self._queues[number] = asyncio.Queue()
+        self._client_command = number
+        return number
+
+    def ReleasePacketNumber(self, number):
+        """
+        Free number of packet, answer of the packet will be dropped
+
+        @param int number - number of packet
+        """
+
+        self._in_flight.discard(number)
+        self._queues.pop(number, None)
+
+    async def Send(self, command, data, first_request=False):
+        """
+        Send data to MetaTrader 5 server
+
+        @param string  command       - command, for example AUTH_START, AUTH_ANSWER and etc.
+        @param dict data
+        @param bool    first_request bool is ot first
+
+        @return bool
+        """
+
+        return await self.SendPacket(command, data, first_request) != 0
+
+    async def SendPacket(self, command, data, first_request=False):
+        """
+        Send data to MetaTrader 5 server without waiting of answer
+
+        @param string  command       - command, for example AUTH_START, AUTH_ANSWER and etc.
+        @param dict data
+        @param bool    first_request bool is ot first
+
+        @return int number of packet, 0 if sending failed
+        """
+
+        if self._writer is None or self._broken:
+            return 0
+        number = self.NextPacketNumber()
+        if number is None:
+            return 0
+        # crypt and write without await between, so packets keep order of crypting
+        # and frames of one packet are not mixed with frames of others
+        started = False
+        try:
+            for parts, flag in MTQueryEncoder.EncodeFrames(command, data):
+                started = True
+                header, parts = self.PrepareFrame(command, parts, number, first_request, flag)
+                self._writer.writelines([header] + parts)
+                first_request = False
+        except BaseException:
+            self.ReleasePacketNumber(number)
+            # a part of packet is written, the stream can not be continued
+            if started:
+                self._broken = True
+                self._writer.transport.abort()
+            raise
+        try:
+            await self._writer.drain()
+        except OSError:
+            self.ReleasePacketNumber(number)
+            return 0
+        return number
+
+    async def Read(self, auth_packet=False, is_binary=False, response_only=False, number=None):
+        """
+        Get answer for packet from MetaTrader 5 server
+
+        @param bool auth_packet wait the auth packet
+        @param bool is_binary answer is not decoded, see MTConnect.GetBinaryLine and GetBinary
+        @param bool response_only return the first line of answer only
+        @param int number number of packet, by default the last packet sent
+        @return None|string|memoryview None if packet is not in flight, empty if connection is broken,
+                raises asyncio.TimeoutError if answer is late
+        """
+
+        if number is None:
+            number = self._client_command
+        if number not in self._queues:
+            return None
+        chunks = [data async for data in self.ReadChunks(number)]
+        if is_binary:
+            return MTConnect.JoinBinary(chunks, response_only)
+        result = b''.join(chunks)
+        # get the response line only
+        if response_only:
+            result = result[:MTConnect.FindLineEnd(result)]
+        return result.decode('utf-16le')
+
+    async def ReadJson(self, number):
+        """
+        Get answer with json body, items are decoded by MTJsonStream while parts are received
+
+        @param int number number of packet
+        @return string|None the first line of answer, None if packet is not in flight
+        @return list|None json items, None if json is incorrect
+        """
+
+        if number not in self._queues:
+            return None, None
+        stream = MTJsonStream()
+        items = []
+        chunks = self.ReadChunks(number)
+        try:
+            async for data in chunks:
+                stream.Feed(data)
+                items.extend(stream.Records())
+            items.extend(stream.Records(True))
+        except ValueError:
+            # the rest of answer is dropped with the packet number
+            items = None
+        finally:
+            await chunks.aclose()
+        return stream.Answer or '', items
+
+    async def ReadChunks(self, number):
+        """
+        Get parts of answer for packet as they are received,
+        number of packet is released at the end
+
+        @param int number number of packet
+        @return async generator of bytes, raises asyncio.TimeoutError if a part is late
+        """
+
+        queue = self._queues.get(number)
+        if queue is None:
+            return
+        try:
+            while True:
+                data, flag = await asyncio.wait_for(queue.get(), self._timeout_connection)
+                # connection is broken
+                if data is None:
+                    return
+                yield data
+                # read to end
+                if flag == 0:
+                    return
+        finally:
+            self.ReleasePacketNumber(number)
+
+    async def _ReadLoop(self):
+        """
+        Read frames from server and put them to queues of packets
+        """
+
+        try:
+            while True:
+                header, data = self._decoder.NextFrame()
+                if header is None:
+                    chunk = await self._reader.read(self.RECV_BUFFER_SIZE)
+                    if not chunk:
+                        break
+                    self._decoder.Feed(chunk)
+                    continue
+                # if need decrypt packet do it, auth packets come before crypt rand is set
+                if self.is_crypt and self._crypt_in is not None:
+                    data = self.DeCryptPacket(data, header.SizeBody)
+                queue = self._queues.get(header.NumberPacket)
+                if queue is not None:
+                    queue.put_nowait((data, header.Flag))
+        except (OSError, ValueError):
+            pass
+        finally:
+            # wake up all readers, connection is broken
+            self._broken = True
+            for queue in self._queues.values():
+                queue.put_nowait((None, 0))
+
+
+class AsyncMTAuthProtocol(MTAuthProtocol):
+    """
+    Class authorization on MetaTrader 5 Server over AsyncMTConnect
+    """
+
+    async def Auth(self, login, password, is_crypt):
+        """
+        Authorization on MetaTrader 5 server
+        @param string login - manager login
+        @param string password - manager password
+        @param bool is_crypt - need crypt connection
+        @return MTRetCode, crypt_rand
+        """
+
+        crypt_rand = ''
+        # send request to mt server
+        error_code, auth_start_answer = await self.SendAuthStart(login, is_crypt)
+        if error_code != MTRetCode.MT_RET_OK:
+            return error_code, crypt_rand
+        # random string for MT server
+        random_cli_code = MTUtils.GetRandomHex(16)
+        # get hash password with random code
+        answer_hash = MTUtils.GetHashFromPassword(password, auth_start_answer.SrvRand)
+        # send answer to server
+        error_code, auth_answer = await self.SendAuthAnswer(answer_hash, random_cli_code)
+        if error_code != MTRetCode.MT_RET_OK:
+            return error_code, crypt_rand
+        # check password with another random code from MT server
+        hash_password = MTUtils.GetHashFromPassword(password, random_cli_code)
+        if hash_password != auth_answer.CliRand:
+            return MTRetCode.MT_RET_AUTH_SERVER_BAD, crypt_rand
+        return MTRetCode.MT_RET_OK, auth_answer.CryptRand
+
+    async def SendAuthStart(self, login, is_crypt):
+        """
+        Send auth_start request
+        @param string login  - user login
+        @param bool is_crypt - need crypt protocol
+        @return MTRetCode, MTAuthStartAnswer
+        """
+
+        auth_answer = MTAuthStartAnswer()
+        crypt_method = MTProtocolConsts.WEB_VAL_CRYPT_AES256OFB if is_crypt else MTProtocolConsts.WEB_VAL_CRYPT_NONE
+        data = {
+            MTProtocolConsts.WEB_PARAM_VERSION: MTProtocolConsts.WEB_API_VERSION,
+            MTProtocolConsts.WEB_PARAM_AGENT: self.m_agent,
+            MTProtocolConsts.WEB_PARAM_LOGIN: login,
+            MTProtocolConsts.WEB_PARAM_TYPE: 'MANAGER',
+            MTProtocolConsts.WEB_PARAM_CRYPT_METHOD: crypt_method
+        }
+        # send request
+        number = await self.m_connect.SendPacket(MTProtocolConsts.WEB_CMD_AUTH_START, data, True)
+        if number == 0:
+            return MTRetCode.MT_RET_ERR_NETWORK, auth_answer
+        # get answer
+        try:
+            answer = await self.m_connect.Read(True, number=number)
+        except asyncio.TimeoutError:
+            return MTRetCode.MT_RET_ERR_TIMEOUT, auth_answer
+        if not answer:
+            return MTRetCode.MT_RET_ERR_NETWORK, auth_answer
+        # parse answer
+        error_code, auth_answer, error = self.ParseAuthStart(answer)
+        return error_code, auth_answer
+
+    async def SendAuthAnswer(self, hash, random_cli_code):
+        """
+        Send AUTH_ANSWER to MT server
+        @param string hash - password hash
+        @param string random_cli_code client random string
+        @return MTRetCode, MTAuthAnswer
+        """
+
+        auth_answer = MTAuthAnswer()
+        data = {
+            MTProtocolConsts.WEB_PARAM_SRV_RAND_ANSWER: hash,
+            MTProtocolConsts.WEB_PARAM_CLI_RAND: random_cli_code
+        }
+        # send request
+        number = await self.m_connect.SendPacket(MTProtocolConsts.WEB_CMD_AUTH_ANSWER, data)
+        if number == 0:
+            return MTRetCode.MT_RET_ERR_NETWORK, auth_answer
+        # get answer
+        try:
+            answer = await self.m_connect.Read(True, number=number)
+        except asyncio.TimeoutError:
+            return MTRetCode.MT_RET_ERR_TIMEOUT, auth_answer
+        if not answer:
+            return MTRetCode.MT_RET_ERR_NETWORK, auth_answer
+        # parse answer
+        error_code, auth_answer, error = self.ParseAuthAnswer(answer)
+        return error_code, auth_answer
+
+
+class AsyncMTWebAPI:
+    """
+    web api class over asyncio, every method is a coroutine
+    with the same parameters and result as MTWebAPI.
+    Requests of many tasks are pipelined on one connection.
+    Reconnect, metrics and caches of MTWebAPI are not supported.
+    @var AsyncMTConnect
+    """
+
+    m_agent = 'XWCRM'
+    m_is_crypt = False
+    m_connect = None
+    # round trip time of the last PingTime
+    LastRtt = None
+
+    def __init__(self, agent='XWCRM', is_crypt=False):
+        """
+        @param agent set a name of your agnet
+        @param is_crypt need crypt connection
+
+        @return AsyncMTWebAPI object
+        """
+
+        self.m_agent = agent
+        self.m_is_crypt = is_crypt
+        self.LastRtt = None
+
+    async def Connect(self, ip, port, timeout, login, password):
+        """
+        @param ip       - ip address server
+        @param port     - port server
+        @param timeout  - timeout for request
+        @param login    - user login
+        @param password - user password
+
+        @return MTRetCode
+        """
+
+        self.m_connect = AsyncMTConnect(ip, port, timeout, self.m_is_crypt)
+        try:
+            error_code = await self.m_connect.Connect()
+        except asyncio.TimeoutError:
+            self.m_connect = None
+            return MTRetCode.MT_RET_ERR_TIMEOUT
+        except OSError:
+            self.m_connect = None
+            return MTRetCode.MT_RET_ERR_CONNECTION
+        if error_code != MTRetCode.MT_RET_OK:
+            return error_code
+        # authorization to MetaTrader 5 server
+        auth = AsyncMTAuthProtocol(self.m_connect, self.m_agent)
+        try:
+            error_code, crypt_rand = await auth.Auth(login, password, self.m_is_crypt)
+        except (OSError, ValueError):
+            error_code = MTRetCode.MT_RET_ERR_NETWORK
+        if error_code != MTRetCode.MT_RET_OK:
+            await self.Disconnect()
+            return error_code
+        # if need crypt
+        if self.m_is_crypt:
+            self.m_connect.SetCryptRand(crypt_rand, password)
+        return MTRetCode.MT_RET_OK
+
+    def IsConnected(self):
+        """
+        Check connection
+        @return boll
+        """
+
+        return (self.m_connect is not None)
+
+    async def Disconnect(self):
+        """
+        Disconnect from MetaTrader 5 server
+        """
+
+        if self.m_connect is not None:
+            connect, self.m_connect = self.m_connect, None
+            try:
+                number = await connect.SendPacket(MTProtocolConsts.WEB_CMD_QUIT, '')
+                connect.ReleasePacketNumber(number)
+            finally:
+                await connect.Disconnect()
+
+    async def _Query(self, command, data):
+        """
+        Send command and get retcode from answer
+        @param string command
+        @param dict data
+
+        @return MTRetCode
+        """
+
+        ret_code, param = await self._Request(command, data)
+        return ret_code
+
+    async def _Request(self, command, data):
+        """
+        Send command and get parameters of answer
+
+        @param string command
+        @param dict data
+
+        @return MTRetCode, dict parameters of answer
+        """
+
+        ret_code, items, param = await self._Talk(command, data)
+        return ret_code, param
+
+    async def _Talk(self, command, data, is_json=False, is_binary=False):
+        """
+        Send command and read answer, see MTWebAPI._Talk.
+        Late answer returns MT_RET_ERR_TIMEOUT, lost connection returns MT_RET_ERR_NETWORK.
+
+        @param string command
+        @param dict data
+        @param bool is_json   - answer has json body
+        @param bool is_binary - answer has binary body, it is returned as memoryview instead of items
+
+        @return MTRetCode, list|memoryview|None json items or binary body, dict parameters of answer
+        """
+
+        connect = self.m_connect
+        if connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION, None, {}
+        try:
+            number = await connect.SendPacket(command, data)
+            if number == 0:
+                return MTRetCode.MT_RET_ERR_NETWORK, None, {}
+            if is_json:
+                return await self._ReadJsonItems(command, number)
+            if is_binary:
+                answer = await connect.Read(True, True, False, number)
+                if answer is None or len(answer) == 0:
+                    return MTRetCode.MT_RET_ERR_NETWORK, None, {}
+                answer_command, param, ret_code, body_offset = \
+                    MTConnect.ParseAnswerLine(MTConnect.GetBinaryLine(answer))
+                if answer_command != command:
+                    return MTRetCode.MT_RET_ERROR, None, param
+                if ret_code != MTRetCode.MT_RET_OK:
+                    return ret_code, None, param
+                return ret_code, connect.GetBinary(answer), param
+            rc = await connect.Read(True, False, True, number)
+        except asyncio.TimeoutError:
+            # the answer is dropped when it comes, other requests in flight are kept
+            return MTRetCode.MT_RET_ERR_TIMEOUT, None, {}
+        except UnicodeError:
+            return MTRetCode.MT_RET_ERR_PARAMS, None, {}
+        except (OSError, ValueError):
+            return MTRetCode.MT_RET_ERR_NETWORK, None, {}
+        if not rc:
+            return MTRetCode.MT_RET_ERR_NETWORK, None, {}
+        answer_command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(rc)
+        if answer_command != command:
+            return MTRetCode.MT_RET_ERROR, None, param
+        return ret_code, None, param
+
+    async def _GetJson(self, command, data, is_array=False):
+        """
+        Send command and get json body of answer
+
+        @param string command
+        @param dict data
+        @param bool is_array - body is json array
+
+        @return MTRetCode, list|dict|None
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION, None
+        ret_code, items, param = await self._Talk(command, data, True)
+        if is_array or items is None:
+            return ret_code, items
+        return ret_code, (items[0] if items else None)
+
+    async def _ReadJsonAnswer(self, command, number, is_array=False):
+        """
+        Read answer with json body
+
+        @param string command - command of request
+        @param int number     - number of packet
+        @param bool is_array  - body is json array
+
+        @return MTRetCode, list|dict|None
+        """
+
+        try:
+            ret_code, items, param = await self._ReadJsonItems(command, number)
+        except asyncio.TimeoutError:
+            return MTRetCode.MT_RET_ERR_TIMEOUT, None
+        except (OSError, ValueError):
+            return MTRetCode.MT_RET_ERR_NETWORK, None
+        if is_array or items is None:
+            return ret_code, items
+        return ret_code, (items[0] if items else None)
+
+    async def _ReadJsonItems(self, command, number):
+        """
+        Read answer with json body and parameters of answer
+
+        @param string command - command of request
+        @param int number     - number of packet
+
+        @return MTRetCode, list|None items, dict parameters of answer
+        """
+
+        answer, items = await self.m_connect.ReadJson(number)
+        if not answer:
+            return MTRetCode.MT_RET_ERR_NETWORK, None, {}
+        answer_command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(answer)
+        if answer_command != command:
+            return MTRetCode.MT_RET_ERROR, None, param
+        if ret_code != MTRetCode.MT_RET_OK:
+            return ret_code, None, param
+        if items is None:
+            return MTRetCode.MT_RET_ERR_DATA, None, param
+        return ret_code, items, param
+
+    async def UserAdd(self, login, password, group, name='', pass_investor=''):
+        """
+        Add a MT user with the default setup, see MTWebAPI.UserAdd
+
+        @return MTRetCode
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION
+        error_code, data = MTWebAPI._UserAddData(login, password, group, name, pass_investor)
+        if error_code != MTRetCode.MT_RET_OK:
+            return error_code
+        return await self._Query(MTProtocolConsts.WEB_CMD_USER_ADD, data)
+
+    async def UserAddBatch(self, rows, max_in_flight=64):
+        """
+        Add many MT users, requests are pipelined on the connection, see MTWebAPI.UserAddBatch
+
+        @param rows - iterable of dicts or tuples with parameters of UserAdd
+        @param max_in_flight - max count of requests waiting for answer
+
+        @return async generator of (row, MTRetCode) in order of rows
+        """
+
+        command = MTProtocolConsts.WEB_CMD_USER_ADD
+        # (row, number of packet, error code if request was not sent)
+        pending = deque()
+        network_error = self.m_connect is None
+        try:
+            for row in rows:
+                try:
+                    if isinstance(row, dict):
+                        error_code, data = MTWebAPI._UserAddData(**row)
+                    else:
+                        error_code, data = MTWebAPI._UserAddData(*row)
+                except (TypeError, ValueError, AttributeError):
+                    # row with unknown keys or wrong count of values fails alone
+                    error_code, data = MTRetCode.MT_RET_ERR_PARAMS, None
+                if network_error and error_code == MTRetCode.MT_RET_OK:
+                    error_code = MTRetCode.MT_RET_ERR_CONNECTION
+                if error_code != MTRetCode.MT_RET_OK:
+                    pending.append((row, 0, error_code))
+                else:
+                    try:
+                        number = await self.m_connect.SendPacket(command, data)
+                    except (UnicodeError, TypeError):
+                        # values which are not text, the packet is not sent
+                        number, error_code = 0, MTRetCode.MT_RET_ERR_PARAMS
+                    except (OSError, ValueError):
+                        number = 0
+                    if number == 0 and error_code == MTRetCode.MT_RET_OK:
+                        # connection is broken, all the next rows fail
+                        network_error = True
+                        error_code = MTRetCode.MT_RET_ERR_CONNECTION
+                    pending.append((row, number, error_code))
+                # read answers when window is full
+                while len(pending) >= max_in_flight or (pending and pending[0][1] == 0):
+                    yield await self._UserAddBatchResult(pending.popleft())
+            while pending:
+                yield await self._UserAddBatchResult(pending.popleft())
+        finally:
+            # generator is closed before the end
+            for row, number, error_code in pending:
+                if number:
+                    self.m_connect.ReleasePacketNumber(number)
+
+    async def _UserAddBatchResult(self, item):
+        """
+        Read answer of one request of UserAddBatch
+
+        @param tuple item - row, number of packet, error code
+        @return row, MTRetCode
+        """
+
+        row, number, error_code = item
+        if number == 0:
+            return row, error_code
+        try:
+            rc = await self.m_connect.Read(True, False, True, number)
+        except asyncio.TimeoutError:
+            return row, MTRetCode.MT_RET_ERR_TIMEOUT
+        except (OSError, ValueError):
+            return row, MTRetCode.MT_RET_ERR_NETWORK
+        if not rc:
+            return row, MTRetCode.MT_RET_ERR_NETWORK
+        command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(rc)
+        if command != MTProtocolConsts.WEB_CMD_USER_ADD:
+            return row, MTRetCode.MT_RET_ERROR
+        return row, ret_code
+
+    async def UserGet(self, login):
+        """
+        Get a MT user
+
+        @return MTRetCode, dict user
+        """
+
+        if login == '' or login is None:
+            return MTRetCode.MT_RET_ERR_PARAMS, None
+        return await self._GetJson(MTProtocolConsts.WEB_CMD_USER_GET, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        })
+
+    async def UserAccountGet(self, login):
+        """
+        Get a MT user's trade account state
+
+        @return MTRetCode, dict account
+        """
+
+        if login == '' or login is None:
+            return MTRetCode.MT_RET_ERR_PARAMS, None
+        return await self._GetJson(MTProtocolConsts.WEB_CMD_USER_ACCOUNT_GET, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        })
+
+    def UserAccountGetBatch(self, logins, max_in_flight=64):
+        """
+        Get trade accounts of many MT users, requests are pipelined on the connection,
+        see MTWebAPI.UserAccountGetBatch
+
+        @param logins - iterable of logins
+        @param max_in_flight - max count of requests waiting for answer
+
+        @return async generator of (login, MTRetCode, dict account) in order of logins
+        """
+
+        return self._JsonBatch(MTProtocolConsts.WEB_CMD_USER_ACCOUNT_GET, logins, lambda login: {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        }, max_in_flight)
+
+    async def PositionGetBatch(self, logins, max_in_flight=64, page_size=100):
+        """
+        Get open positions of many MT users, the first pages are pipelined, see MTWebAPI.PositionGetBatch
+
+        @param logins - iterable of logins
+        @param max_in_flight - max count of requests waiting for answer
+        @param page_size - count of positions in one request
+
+        @return async generator of (login, MTRetCode, list of positions) in order of logins
+        """
+
+        command = MTProtocolConsts.WEB_CMD_POSITION_GET_PAGE
+        page_size = max(int(page_size), 1)
+        batch = self._JsonBatch(command, logins, lambda login: MTWebAPI._PositionPageData(login, 0, page_size),
+                                max_in_flight, True)
+        try:
+            async for login, ret_code, positions in batch:
+                page = positions
+                while ret_code == MTRetCode.MT_RET_OK and len(page) == page_size:
+                    ret_code, page = await self._GetJson(
+                        command, MTWebAPI._PositionPageData(login, len(positions), page_size), True)
+                    if ret_code == MTRetCode.MT_RET_OK:
+                        positions.extend(page)
+                yield login, ret_code, (positions if ret_code == MTRetCode.MT_RET_OK else None)
+        finally:
+            await batch.aclose()
+
+    async def _JsonBatch(self, command, keys, data_of, max_in_flight, is_array=False):
+        """
+        Send one request with json answer per key, requests are pipelined on the connection
+
+        @param string command
+        @param keys - iterable of keys
+        @param data_of - function of key returning data of request
+        @param max_in_flight - max count of requests waiting for answer
+        @param bool is_array - body is json array
+
+        @return async generator of (key, MTRetCode, list|dict|None) in order of keys
+        """
+
+        # (key, number of packet)
+        pending = deque()
+        network_error = self.m_connect is None
+        try:
+            for key in keys:
+                number = 0
+                if not network_error:
+                    try:
+                        number = await self.m_connect.SendPacket(command, data_of(key))
+                    except (OSError, ValueError):
+                        number = 0
+                    # connection is broken, all the next keys fail
+                    network_error = number == 0
+                pending.append((key, number))
+                # read answers when window is full
+                while len(pending) >= max_in_flight or (pending and pending[0][1] == 0):
+                    yield await self._JsonBatchResult(command, pending.popleft(), is_array)
+            while pending:
+                yield await self._JsonBatchResult(command, pending.popleft(), is_array)
+        finally:
+            # generator is closed before the end
+            for key, number in pending:
+                if number:
+                    self.m_connect.ReleasePacketNumber(number)
+
+    async def _JsonBatchResult(self, command, item, is_array):
+        """
+        Read answer of one request of _JsonBatch
+
+        @param string command
+        @param tuple item - key, number of packet
+        @param bool is_array - body is json array
+        @return key, MTRetCode, list|dict|None
+        """
+
+        key, number = item
+        if number == 0:
+            return key, MTRetCode.MT_RET_ERR_CONNECTION, None
+        ret_code, result = await self._ReadJsonAnswer(command, number, is_array)
+        return key, ret_code, result
+
+    async def UserLogins(self, group):
+        """
+        Get logins of MT users in group
+
+        @return MTRetCode, list of int logins
+        """
+
+        ret_code, logins = await self._GetJson(MTProtocolConsts.WEB_CMD_USER_USER_LOGINS, {
+            MTProtocolConsts.WEB_PARAM_GROUP: group
+        }, True)
+        if ret_code != MTRetCode.MT_RET_OK:
+            return ret_code, []
+        return ret_code, [int(login) for login in logins or ()]
+
+    async def UserDelete(self, login):
+        """
+        Delete a MT user
+
+        @return MTRetCode
+        """
+
+        if login == '' or login is None:
+            return MTRetCode.MT_RET_ERR_PARAMS
+        ret_code, result = await self._GetJson(MTProtocolConsts.WEB_CMD_USER_DELETE, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        })
+        return ret_code
+
+    async def SetUserGroup(self, login, group, leverage=''):
+        """
+        Set a MT user's group, see MTWebAPI.SetUserGroup
+
+        @return MTRetCode
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION
+        # check parameters
+        if login == '' or login is None or group == '' or group is None:
+            return MTRetCode.MT_RET_ERR_PARAMS
+        data = {
+            MTProtocolConsts.WEB_PARAM_LOGIN: login,
+            MTProtocolConsts.WEB_PARAM_GROUP: group,
+            MTProtocolConsts.WEB_PARAM_LEVERAGE: leverage
+        }
+        return await self._Query(MTProtocolConsts.WEB_CMD_USER_UPDATE, data)
+
+    async def SetUserBalance(self, login, balance_type, balance, comment):
+        """
+        Set a MT user's balance, see MTWebAPI.SetUserBalance
+
+        @return MTRetCode
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION
+        # check parameters
+        if login == '' or login is None or balance_type == '' or balance_type is None or \
+                balance == '' or balance is None:
+            return MTRetCode.MT_RET_ERR_PARAMS
+        data = {
+            MTProtocolConsts.WEB_PARAM_LOGIN: login,
+            MTProtocolConsts.WEB_PARAM_TYPE: balance_type,
+            MTProtocolConsts.WEB_PARAM_BALANCE: balance,
+            MTProtocolConsts.WEB_PARAM_COMMENT: comment,
+            MTProtocolConsts.WEB_PARAM_CHECK_MARGIN: '1'
+        }
+        return await self._Query(MTProtocolConsts.WEB_CMD_TRADE_BALANCE, data)
+
+    async def SetUserPassword(self, login, password, pass_type='MAIN'):
+        """
+        Set a MT user's password, see MTWebAPI.SetUserPassword
+
+        @return MTRetCode
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION
+        # check parameters
+        if login == '' or login is None or password == '' or password is None:
+            return MTRetCode.MT_RET_ERR_PARAMS
+        data = {
+            MTProtocolConsts.WEB_PARAM_LOGIN: login,
+            MTProtocolConsts.WEB_PARAM_TYPE: pass_type,
+            MTProtocolConsts.WEB_PARAM_PASSWORD: password
+        }
+        return await self._Query(MTProtocolConsts.WEB_CMD_USER_PASS_CHANGE, data)
+
+    async def SetSymbolSwap(self, symbol_name, swap_long, swap_short):
+        """
+        Set a Symbol's swap, see MTWebAPI.SetSymbolSwap
+
+        @return MTRetCode
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION
+        # check parameters
+        if symbol_name == '' or symbol_name is None or swap_long == '' or swap_long is None or \
+                swap_short == '' or swap_short is None:
+            return MTRetCode.MT_RET_ERR_PARAMS
+        symbol = {}
+        symbol["Symbol"] = symbol_name
+        symbol["SwapLong"] = swap_long
+        symbol["SwapShort"] = swap_short
+        # symbol detail is a json
+        data = {
+            MTProtocolConsts.WEB_PARAM_BODYTEXT: json.dumps(symbol)
+        }
+        return await self._Query(MTProtocolConsts.WEB_CMD_SYMBOL_ADD, data)
+
+    async def MailSend(self, to, subject, body):
+        """
+        Send mail to clients, see MTWebAPI.MailSend
+
+        @return MTRetCode
+        """
+
+        if not to or subject is None or body is None:
+            return MTRetCode.MT_RET_ERR_PARAMS
+        return await self._Query(MTProtocolConsts.WEB_CMD_MAIL_SEND, {
+            MTProtocolConsts.WEB_PARAM_TO: to if isinstance(to, str) else ','.join(str(item) for item in to),
+            MTProtocolConsts.WEB_PARAM_SUBJECT: subject,
+            MTProtocolConsts.WEB_PARAM_BODYTEXT: body
+        })
+
+    async def NewsSend(self, subject, body, category='', language=0, priority=0):
+        """
+        Send news, see MTWebAPI.NewsSend
+
+        @return MTRetCode
+        """
+
+        if subject is None or body is None:
+            return MTRetCode.MT_RET_ERR_PARAMS
+        return await self._Query(MTProtocolConsts.WEB_CMD_NEWS_SEND, {
+            MTProtocolConsts.WEB_PARAM_SUBJECT: subject,
+            MTProtocolConsts.WEB_PARAM_CATEGORY: category,
+            MTProtocolConsts.WEB_PARAM_LANGUAGE: str(language),
+            MTProtocolConsts.WEB_PARAM_PRIORITY: str(priority),
+            MTProtocolConsts.WEB_PARAM_BODYTEXT: body
+        })
+
+    async def TickLast(self, symbol, group='', trans_id=0):
+        """
+        Get last ticks of symbols, see MTWebAPI.TickLast
+
+        @return MTRetCode, list of ticks, int trans_id for next call
+        """
+
+        command = MTProtocolConsts.WEB_CMD_TICK_LAST
+        data = {MTProtocolConsts.WEB_PARAM_SYMBOL: symbol if isinstance(symbol, str) else ','.join(symbol),
+                MTProtocolConsts.WEB_PARAM_TRANS_ID: str(trans_id)}
+        if group:
+            command = MTProtocolConsts.WEB_CMD_TICK_LAST_GROUP
+            data[MTProtocolConsts.WEB_PARAM_GROUP] = group
+        return await self._GetTicks(command, data, trans_id)
+
+    async def TickLastGroup(self, group, symbol='*', trans_id=0):
+        """
+        Get last ticks of all symbols of group by one request, see MTWebAPI.TickLastGroup
+
+        @return MTRetCode, list of ticks, int trans_id for next call
+        """
+
+        if not group:
+            return MTRetCode.MT_RET_ERR_PARAMS, None, trans_id
+        return await self.TickLast(symbol, group, trans_id)
+
+    async def _GetTicks(self, command, data, trans_id):
+        """
+        Send tick request
+
+        @return MTRetCode, list of ticks, int trans_id
+        """
+
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION, None, trans_id
+        ret_code, ticks, param = await self._Talk(command, data, True)
+        if ret_code != MTRetCode.MT_RET_OK:
+            return ret_code, None, trans_id
+        try:
+            trans_id = int(param.get(MTProtocolConsts.WEB_PARAM_TRANS_ID, trans_id))
+        except ValueError:
+            return MTRetCode.MT_RET_ERR_DATA, None, trans_id
+        return ret_code, ticks, trans_id
+
+    async def SymbolTotal(self):
+        """
+        Get count of symbols
+
+        @return MTRetCode, int total
+        """
+
+        return await self._GetTotal(MTProtocolConsts.WEB_CMD_SYMBOL_TOTAL, {})
+
+    async def SymbolNext(self, index):
+        """
+        Get symbol by index
+
+        @return MTRetCode, dict symbol
+        """
+
+        return await self._GetJson(MTProtocolConsts.WEB_CMD_SYMBOL_NEXT, {
+            MTProtocolConsts.WEB_PARAM_INDEX: str(index)
+        })
+
+    async def SymbolGet(self, symbol_name):
+        """
+        Get symbol by name
+
+        @return MTRetCode, dict symbol
+        """
+
+        if symbol_name == '' or symbol_name is None:
+            return MTRetCode.MT_RET_ERR_PARAMS, None
+        return await self._GetJson(MTProtocolConsts.WEB_CMD_SYMBOL_GET, {
+            MTProtocolConsts.WEB_PARAM_SYMBOL: symbol_name
+        })
+
+    async def SymbolGetGroup(self, symbol_name, group):
+        """
+        Get symbol with settings of group
+
+        @return MTRetCode, dict symbol
+        """
+
+        if symbol_name == '' or symbol_name is None or group == '' or group is None:
+            return MTRetCode.MT_RET_ERR_PARAMS, None
+        return await self._GetJson(MTProtocolConsts.WEB_CMD_SYMBOL_GET_GROUP, {
+            MTProtocolConsts.WEB_PARAM_SYMBOL: symbol_name,
+            MTProtocolConsts.WEB_PARAM_GROUP: group
+        })
+
+    async def SymbolAdd(self, symbol):
+        """
+        Add or update symbol
+
+        @return MTRetCode, dict symbol from server
+        """
+
+        if not symbol or not symbol.get('Symbol'):
+            return MTRetCode.MT_RET_ERR_PARAMS, None
+        return await self._GetJson(MTProtocolConsts.WEB_CMD_SYMBOL_ADD, {
+            MTProtocolConsts.WEB_PARAM_BODYTEXT: json.dumps(symbol)
+        })
+
+    async def SymbolDelete(self, symbol_name):
+        """
+        Delete symbol
+
+        @return MTRetCode
+        """
+
+        if symbol_name == '' or symbol_name is None:
+            return MTRetCode.MT_RET_ERR_PARAMS
+        ret_code, result = await self._GetJson(MTProtocolConsts.WEB_CMD_SYMBOL_DELETE, {
+            MTProtocolConsts.WEB_PARAM_SYMBOL: symbol_name
+        })
+        return ret_code
+
+    async def SymbolGetAll(self, max_in_flight=32):
+        """
+        Get all symbols, SYMBOL_NEXT requests are pipelined
+
+        @param max_in_flight - max count of requests waiting for answer
+
+        @return MTRetCode, list of symbols
+        """
+
+        ret_code, total = await self.SymbolTotal()
+        if ret_code != MTRetCode.MT_RET_OK:
+            return ret_code, []
+        command = MTProtocolConsts.WEB_CMD_SYMBOL_NEXT
+        symbols = []
+        pending = deque()
+        index = 0
+        try:
+            while index < total or pending:
+                # keep window of requests full
+                while index < total and len(pending) < max_in_flight:
+                    number = await self.m_connect.SendPacket(command, {
+                        MTProtocolConsts.WEB_PARAM_INDEX: str(index)
+                    })
+                    if number == 0:
+                        return MTRetCode.MT_RET_ERR_NETWORK, symbols
+                    pending.append(number)
+                    index += 1
+                ret_code, symbol = await self._ReadJsonAnswer(command, pending.popleft())
+                if ret_code != MTRetCode.MT_RET_OK:
+                    return ret_code, symbols
+                if symbol is not None:
+                    symbols.append(symbol)
+        finally:
+            for number in pending:
+                self.m_connect.ReleasePacketNumber(number)
+        return MTRetCode.MT_RET_OK, symbols
+
+    async def _GetTotal(self, command, data):
+        """
+        Get count of records by *_GET_TOTAL command
+
+        @return MTRetCode, int total
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION, 0
+        error_code, param = await self._Request(command, data)
+        if error_code != MTRetCode.MT_RET_OK:
+            return error_code, 0
+        return error_code, int(param.get(MTProtocolConsts.WEB_PARAM_TOTAL, 0))
+
+    async def DealGetTotal(self, login, from_time, to_time):
+        """
+        Get count of user's deals in period
+
+        @return MTRetCode, int total
+        """
+
+        return await self._GetTotal(MTProtocolConsts.WEB_CMD_DEAL_GET_TOTAL, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login),
+            MTProtocolConsts.WEB_PARAM_FROM: str(from_time),
+            MTProtocolConsts.WEB_PARAM_TO: str(to_time)
+        })
+
+    async def PositionGetTotal(self, login):
+        """
+        Get count of user's open positions
+
+        @return MTRetCode, int total
+        """
+
+        return await self._GetTotal(MTProtocolConsts.WEB_CMD_POSITION_GET_TOTAL, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        })
+
+    async def OrderGetTotal(self, login):
+        """
+        Get count of user's open orders
+
+        @return MTRetCode, int total
+        """
+
+        return await self._GetTotal(MTProtocolConsts.WEB_CMD_ORDER_GET_TOTAL, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+        })
+
+    async def HistoryGetTotal(self, login, from_time, to_time):
+        """
+        Get count of user's history orders in period
+
+        @return MTRetCode, int total
+        """
+
+        return await self._GetTotal(MTProtocolConsts.WEB_CMD_HISTORY_GET_TOTAL, {
+            MTProtocolConsts.WEB_PARAM_LOGIN: str(login),
+            MTProtocolConsts.WEB_PARAM_FROM: str(from_time),
+            MTProtocolConsts.WEB_PARAM_TO: str(to_time)
+        })
+
+    def IterDeals(self, login, from_time, to_time, page_size=100):
+        """
+        Iterate user's deals in period page by page
+
+        @return AsyncMTPageReader of deal dicts
+        """
+
+        return AsyncMTPageReader(self, MTProtocolConsts.WEB_CMD_DEAL_GET_TOTAL,
+                                 MTProtocolConsts.WEB_CMD_DEAL_GET_PAGE, {
+                                     MTProtocolConsts.WEB_PARAM_LOGIN: str(login),
+                                     MTProtocolConsts.WEB_PARAM_FROM: str(from_time),
+                                     MTProtocolConsts.WEB_PARAM_TO: str(to_time)
+                                 }, page_size)
+
+    def IterPositions(self, login, page_size=100):
+        """
+        Iterate user's open positions page by page
+
+        @return AsyncMTPageReader of position dicts
+        """
+
+        return AsyncMTPageReader(self, MTProtocolConsts.WEB_CMD_POSITION_GET_TOTAL,
+                                 MTProtocolConsts.WEB_CMD_POSITION_GET_PAGE, {
+                                     MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+                                 }, page_size)
+
+    def IterOrders(self, login, page_size=100):
+        """
+        Iterate user's open orders page by page
+
+        @return AsyncMTPageReader of order dicts
+        """
+
+        return AsyncMTPageReader(self, MTProtocolConsts.WEB_CMD_ORDER_GET_TOTAL,
+                                 MTProtocolConsts.WEB_CMD_ORDER_GET_PAGE, {
+                                     MTProtocolConsts.WEB_PARAM_LOGIN: str(login)
+                                 }, page_size)
+
+    def IterHistory(self, login, from_time, to_time, page_size=100):
+        """
+        Iterate user's history orders in period page by page
+
+        @return AsyncMTPageReader of order dicts
+        """
+
+        return AsyncMTPageReader(self, MTProtocolConsts.WEB_CMD_HISTORY_GET_TOTAL,
+                                 MTProtocolConsts.WEB_CMD_HISTORY_GET_PAGE, {
+                                     MTProtocolConsts.WEB_PARAM_LOGIN: str(login),
+                                     MTProtocolConsts.WEB_PARAM_FROM: str(from_time),
+                                     MTProtocolConsts.WEB_PARAM_TO: str(to_time)
+                                 }, page_size)
+
+    async def Ping(self):
+        """
+        Send PING to keep connection, answer is not waited
+
+        @return MTRetCode
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION
+        number = await self.m_connect.SendPacket(MTProtocolConsts.WEB_CMD_PING, {})
+        if number == 0:
+            return MTRetCode.MT_RET_ERR_NETWORK
+        self.m_connect.ReleasePacketNumber(number)
+        return MTRetCode.MT_RET_OK
+
+    async def PingTime(self):
+        """
+        Measure round trip time by TIME_SERVER request
+
+        @return MTRetCode, float seconds
+        """
+
+        # check connection
+        if self.m_connect is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION, 0.0
+        start = time.perf_counter()
+        ret_code = await self._Query(MTProtocolConsts.WEB_CMD_TIME_SERVER, {})
+        rtt = time.perf_counter() - start
+        if ret_code == MTRetCode.MT_RET_OK:
+            self.LastRtt = rtt
+        return ret_code, rtt
+
+
+class AsyncMTPageReader:
+    """
+    Async iterator of records from *_GET_PAGE commands, see MTPageReader.
+    The next page is requested while the current one is processed.
+    """
+
+    # AsyncMTWebAPI
+    m_api = None
+    # commands
+    m_total_command = ''
+    m_page_command = ''
+    # parameters of commands
+    m_data = None
+    # count of records in one page
+    m_page_size = 100
+    # result of iteration, check it after the end of loop
+    RetCode = MTRetCode.MT_RET_OK
+    # count of records on server
+    Total = 0
+
+    def __init__(self, api, total_command, page_command, data, page_size):
+        """
+        @param AsyncMTWebAPI api
+        @param string total_command - command to get count of records
+        @param string page_command  - command to get page of records
+        @param dict data            - parameters of both commands
+        @param int page_size        - count of records in one page
+
+        @return AsyncMTPageReader
+        """
+
+        self.m_api = api
+        self.m_total_command = total_command
+        self.m_page_command = page_command
+        self.m_data = data
+        self.m_page_size = max(int(page_size), 1)
+        self.RetCode = MTRetCode.MT_RET_OK
+        self.Total = 0
+
+    async def __aiter__(self):
+        """
+        @return async generator of records
+        """
+
+        pages = self._Pages()
+        try:
+            async for records in pages:
+                for record in records:
+                    yield record
+        finally:
+            # iteration is stopped, answer of prefetched page is not needed
+            await pages.aclose()
+
+    async def Columns(self, schema=None):
+        """
+        Read all records into typed numpy arrays, a page goes to columns at once
+
+        @param list schema - list of (field, type), by default schema of page command
+        @return MTRetCode, MTColumns
+        """
+
+        if schema is None:
+            schema = MTColumnSchema.ForCommand(self.m_page_command)
+        builder = MTColumnBuilder(schema)
+        pages = self._Pages()
+        try:
+            async for records in pages:
+                try:
+                    builder.Append(records)
+                except ValueError:
+                    self.RetCode = MTRetCode.MT_RET_ERR_DATA
+                    break
+        finally:
+            await pages.aclose()
+        return self.RetCode, builder.Result()
+
+    async def _Pages(self):
+        """
+        Read pages, the next page is requested before the current one is processed.
+        Prefetched page is released when generator is closed.
+
+        @return async generator of lists of records
+        """
+
+        self.RetCode, self.Total = await self.m_api._GetTotal(self.m_total_command, self.m_data)
+        if self.RetCode != MTRetCode.MT_RET_OK or self.Total == 0:
+            return
+        offset = 0
+        number = await self._SendPage(offset)
+        if number == 0:
+            self.RetCode = MTRetCode.MT_RET_ERR_NETWORK
+            return
+        try:
+            while number != 0:
+                # ask the next page before processing of the current
+                next_number = 0
+                more = offset + self.m_page_size < self.Total
+                if more:
+                    next_number = await self._SendPage(offset + self.m_page_size)
+                current, number = number, next_number
+                ret_code, records = await self.m_api._ReadJsonAnswer(self.m_page_command, current, True)
+                self.RetCode = ret_code
+                if ret_code != MTRetCode.MT_RET_OK:
+                    return
+                yield records
+                # server has less records than expected
+                if len(records) < self.m_page_size:
+                    return
+                if more and number == 0:
+                    self.RetCode = MTRetCode.MT_RET_ERR_NETWORK
+                    return
+                offset += self.m_page_size
+        finally:
+            if number != 0 and self.m_api.m_connect is not None:
+                self.m_api.m_connect.ReleasePacketNumber(number)
+
+    async def _SendPage(self, offset):
+        """
+        Send request of page
+
+        @param int offset - index of the first record
+        @return int number of packet, 0 if sending failed
+        """
+
+        connect = self.m_api.m_connect
+        if connect is None:
+            return 0
+        data = dict(self.m_data)
+        data[MTProtocolConsts.WEB_PARAM_OFFSET] = str(offset)
+        data[MTProtocolConsts.WEB_PARAM_TOTAL] = str(self.m_page_size)
+        try:
+            return await connect.SendPacket(self.m_page_command, data)
+        except (OSError, ValueError):
+            return 0
@@ -8,6 +8,7 @@
 from mt5_retcode import *
 from mt5_protocol import *
 from mt5_connect import *
+from mt5_logger import *
 
 
 class MTAuthProtocol:
@@ -42,8 +43,9 @@ class MTAuthProtocol:
         # send request to mt server
         error_code, auth_start_answer = self.SendAuthStart(login, is_crypt)
         if error_code != MTRetCode.MT_RET_OK:
-            # if MTLogger.getIsWriteLog():
-            #     MTLogger.write(MTLoggerType.ERROR, 'auth start failed: [' + error_code + ']' + MTRetCode.GetError(error_code))
+            if MTLogger.IsWriteLog(MTLoggerType.ERROR, self.m_connect):
+                MTLogger.Write(MTLoggerType.ERROR, 'auth start failed: [%s] %s', error_code,
+                               MTRetCode.GetError(error_code), connect=self.m_connect)
             return error_code, crypt_rand
         # get code from hex string
         # -rand_code = MTUtils.GetFromHex(auth_start_answer.SrvRand)
@@ -54,15 +56,17 @@ class MTAuthProtocol:
         # send answer to server
         error_code, auth_answer = self.SendAuthAnswer(answer_hash, random_cli_code)
         if error_code != MTRetCode.MT_RET_OK:
-            # if MTLogger.getIsWriteLog():
-            #     MTLogger.write(MTLoggerType.ERROR, 'auth answer failed: [' + error_code + ']' + MTRetCode.GetError(error_code))
+            if MTLogger.IsWriteLog(MTLoggerType.ERROR, self.m_connect):
+                MTLogger.Write(MTLoggerType.ERROR, 'auth answer failed: [%s] %s', error_code,
+                               MTRetCode.GetError(error_code), connect=self.m_connect)
             return error_code, crypt_rand
         # check password with another random code from MT server
         hash_password = MTUtils.GetHashFromPassword(password, random_cli_code)
         # check hash of password
         if hash_password != auth_answer.CliRand:
-            # if MTLogger.getIsWriteLog():
-            #     MTLogger.write(MTLoggerType.ERROR, 'server sent incorrect password hash: is:' + auth_answer.CliRand + ', my: ' + hash_password)
+            # hashes are not written, they are derived from password
+            if MTLogger.IsWriteLog(MTLoggerType.ERROR, self.m_connect):
+                MTLogger.Write(MTLoggerType.ERROR, 'server sent incorrect password hash', connect=self.m_connect)
             return MTRetCode.MT_RET_AUTH_SERVER_BAD, crypt_rand
         # get crypt rand from MT server
         # -crypt_rand = auth_answer.CryptRand
@@ -87,20 +91,20 @@ class MTAuthProtocol:
         }
         # send request
         if not self.m_connect.Send(MTProtocolConsts.WEB_CMD_AUTH_ANSWER, data):
-            # if MTLogger.getIsWriteLog():
-            #     MTLogger.write(MTLoggerType.ERROR, 'send auth answer failed')
+            if MTLogger.IsWriteLog(MTLoggerType.ERROR, self.m_connect):
+                MTLogger.Write(MTLoggerType.ERROR, 'send auth answer failed', connect=self.m_connect)
             return MTRetCode.MT_RET_ERR_NETWORK, auth_answer
         # get answer
         answer = self.m_connect.Read(True, False)
         if answer is None:
-            # if MTLogger.getIsWriteLog():
-            #     MTLogger.write(MTLoggerType.ERROR, 'answer auth answer is empty')
+            if MTLogger.IsWriteLog(MTLoggerType.ERROR, self.m_connect):
+                MTLogger.Write(MTLoggerType.ERROR, 'answer auth answer is empty', connect=self.m_connect)
             return MTRetCode.MT_RET_ERR_NETWORK, auth_answer
         # parse answer
         error_code, auth_answer, error = self.ParseAuthAnswer(answer)
         if error_code != MTRetCode.MT_RET_OK:
-            # if MTLogger.getIsWriteLog():
-            #     MTLogger.write(MTLoggerType.ERROR, 'parse auth answer failed: ' + error)
+            if MTLogger.IsWriteLog(MTLoggerType.ERROR, self.m_connect):
+                MTLogger.Write(MTLoggerType.ERROR, 'parse auth answer failed: %s', error, connect=self.m_connect)
             return error_code, auth_answer
         # ok
         return MTRetCode.MT_RET_OK, auth_answer
@@ -159,14 +163,15 @@ class MTAuthProtocol:
         # get answer
         answer = self.m_connect.Read(True)
         if answer is None:
-            # if MTLogger.getIsWriteLog():
-            #     MTLogger.write(MTLoggerType.ERROR, 'answer auth start is empty')
+            if MTLogger.IsWriteLog(MTLoggerType.ERROR, self.m_connect):
+                MTLogger.Write(MTLoggerType.ERROR, 'answer auth start is empty', connect=self.m_connect)
             return MTRetCode.MT_RET_ERR_NETWORK, auth_answer
         # parse answer
         error_code, auth_answer, error = self.ParseAuthStart(answer)
-        if auth_answer != MTRetCode.MT_RET_OK:
-            # if MTLogger.getIsWriteLog():
-            #     MTLogger.write(MTLoggerType.ERROR, 'parse auth start failed: [' + $error_code + ']' + error)
+        if error_code != MTRetCode.MT_RET_OK:
+            if MTLogger.IsWriteLog(MTLoggerType.ERROR, self.m_connect):
+                MTLogger.Write(MTLoggerType.ERROR, 'parse auth start failed: [%s] %s', error_code, error,
+                               connect=self.m_connect)
             return error_code, auth_answer
         #
         return MTRetCode.MT_RET_OK, auth_answer
@@ -196,7 +201,7 @@ class MTAuthProtocol:
         # check ret code
         ret_code = MTConnect.GetRetCode(auth_answer.RetCode)
         if ret_code != MTRetCode.MT_RET_OK:
-            return ret_code
+            return ret_code, auth_answer, error
         # check CliRand
         if auth_answer.CliRand is None or auth_answer.CliRand == 'none':
             error = 'cli rand answer incorrect'
@@ -0,0 +1,451 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+"""
+Offline benchmarks of protocol codec, auth hashing and crypt.
+Captures of server answers are created in memory, no server is needed.
+
+    python mt5_bench.py --output result.json
+    python mt5_bench.py --baseline result.json --threshold 0.1
+    python mt5_bench.py --snapshot 20000 --latency 0.001
+"""
+
+
+import argparse
+import json
+import platform
+import queue
+import socket
+import sys
+import threading
+import time
+import tracemalloc
+from mt5_protocol import *
+from mt5_connect import *
+from mt5_crypt import *
+from mt5_utils import *
+from mt5_retcode import *
+from mt5_api import *
+from mt5_snapshot import *
+
+
+class MTBenchCapture:
+    """
+    Canned answers of server as they are on the wire
+    """
+
+    @staticmethod
+    def Frames(number, answer, frame_size=0xffff):
+        """
+        Split answer to frames with continuation flag
+
+        @param int number    - number of packet
+        @param string answer - text of answer
+        @param int frame_size - max size of frame body
+        @return bytes frames with headers
+        """
+
+        body = answer.encode('utf-16le')
+        parts = [body[i:i + frame_size] for i in range(0, len(body), frame_size)] or [b'']
+        return b''.join(MTQueryEncoder.EncodeHeader(len(part), number, False, 1 if i < len(parts) - 1 else 0) + part
+                        for i, part in enumerate(parts))
+
+    @staticmethod
+    def UserAddAnswer():
+        return 'USER_ADD|RETCODE=0 Done|LOGIN=100500|\r\n'
+
+    @staticmethod
+    def DealPageAnswer(count):
+        """
+        @param int count - count of deals in page
+        @return string answer of DEAL_GET_PAGE
+        """
+
+        deals = [{
+            'Deal': str(1000000 + i), 'Login': '100500', 'Order': str(2000000 + i), 'PositionID': str(3000000 + i),
+            'Action': '0', 'Entry': '0', 'Time': '1546300800', 'TimeMsc': '1546300800000', 'Symbol': 'EURUSD',
+            'Price': '1.14567', 'Volume': '10000', 'ContractSize': '100000', 'Profit': '12.50', 'Storage': '0.00',
+            'Commission': '-0.70', 'RateProfit': '1.0', 'Comment': ''} for i in range(count)]
+        return 'DEAL_GET_PAGE|RETCODE=0 Done|\r\n' + json.dumps(deals)
+
+
+class MTBenchServer:
+    """
+    Local server answering AUTH_START, AUTH_ANSWER and USER_ACCOUNT_GET without crypt.
+    Answers are sent after fixed latency and keep order of requests, as from real server
+    """
+
+    def __init__(self, password, latency=0.001):
+        """
+        @param string password - password of manager
+        @param float latency   - seconds from request to answer
+
+        @return MTBenchServer
+        """
+
+        self.m_password = password
+        self.m_latency = latency
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.bind(('127.0.0.1', 0))
+        self._server.listen(64)
+        self.Port = self._server.getsockname()[1]
+        thread = threading.Thread(target=self._Accept, name='MTBenchServer')
+        thread.daemon = True
+        thread.start()
+
+    def Close(self):
+        self._server.close()
+
+    def _Accept(self):
+        while True:
+            try:
+                client, address = self._server.accept()
+            except OSError:
+                return
+            answers = queue.Queue()
+            for target, args in ((self._Serve, (client, answers)), (self._Write, (client, answers))):
+                thread = threading.Thread(target=target, args=args, name='MTBenchServer')
+                thread.daemon = True
+                thread.start()
+
+    def _Serve(self, client, answers):
+        """
+        Read requests and queue answers with time of sending
+        """
+
+        decoder = MTFrameDecoder()
+        prefix = MTQueryEncoder.WEB_PREFIX
+        first = True
+        while True:
+            try:
+                data = client.recv(65536)
+            except OSError:
+                data = b''
+            if not data:
+                answers.put(None)
+                return
+            if first and data.startswith(prefix):
+                data = data[len(prefix):]
+            first = False
+            decoder.Feed(data)
+            while True:
+                header, body = decoder.NextFrame()
+                if header is None:
+                    break
+                answer = self._Answer(bytes(body).decode('utf-16le'))
+                if answer is not None:
+                    body = answer.encode('utf-16le')
+                    answers.put((time.time() + self.m_latency,
+                                 MTQueryEncoder.EncodeHeader(len(body), header.NumberPacket) + body))
+
+    def _Write(self, client, answers):
+        while True:
+            item = answers.get()
+            if item is None:
+                return
+            delay = item[0] - time.time()
+            if delay > 0:
+                time.sleep(delay)
+            try:
+                client.sendall(item[1])
+            except OSError:
+                return
+
+    def _Answer(self, request):
+        """
+        @param string request - text of request
+        @return string|None answer
+        """
+
+        command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(request)
+        if command == MTProtocolConsts.WEB_CMD_AUTH_START:
+            return command + '|RETCODE=0 Done|SRV_RAND=' + '11' * 16 + '|\r\n'
+        if command == MTProtocolConsts.WEB_CMD_AUTH_ANSWER:
+            answer = MTUtils.GetHashFromPassword(self.m_password, param[MTProtocolConsts.WEB_PARAM_CLI_RAND])
+            return command + '|RETCODE=0 Done|CLI_RAND_ANSWER=' + answer + '|CRYPT_RAND=' + 'ab' * 256 + '|\r\n'
+        if command == MTProtocolConsts.WEB_CMD_USER_ACCOUNT_GET:
+            return command + '|RETCODE=0 Done|\r\n' + json.dumps({
+                'Login': param[MTProtocolConsts.WEB_PARAM_LOGIN], 'Balance': '100.50', 'Credit': '0.00',
+                'Equity': '101.00', 'Margin': '1.00', 'MarginFree': '100.00', 'MarginLevel': '10100.00',
+                'MarginLeverage': '100', 'Profit': '0.50', 'Storage': '0.00', 'Floating': '0.50'})
+        if command == MTProtocolConsts.WEB_CMD_QUIT:
+            return None
+        return command + '|RETCODE=0 Done|\r\n'
+
+
+class MTBench:
+    """
+    Runner of benchmarks, each benchmark is a function without arguments
+    """
+
+    def __init__(self, min_time=0.2, prefix='', repeat=3):
+        """
+        @param float min_time - seconds to run each benchmark
+        @param string prefix  - run only benchmarks which name starts with prefix
+        @param int repeat     - count of measures, the fastest one is reported
+
+        @return MTBench
+        """
+
+        self.m_min_time = min_time
+        self.m_prefix = prefix
+        self.m_repeat = max(1, repeat)
+        self.Results = {}
+
+    def Run(self, name, func, size=0):
+        """
+        Measure operations per second and peak of allocated memory of one call
+
+        @param string name   - name of benchmark
+        @param callable func - operation
+        @param int size      - bytes processed by one operation, 0 if not applicable
+        @return dict|None result, None if benchmark is filtered out
+        """
+
+        if not name.startswith(self.m_prefix):
+            return None
+        # warm up caches and find count of calls for min_time
+        count = 1
+        while True:
+            start = time.perf_counter()
+            for i in range(count):
+                func()
+            elapsed = time.perf_counter() - start
+            if elapsed >= self.m_min_time / 4:
+                break
+            count *= 4
+        # the fastest measure is the least disturbed by other processes
+        elapsed = None
+        for attempt in range(self.m_repeat):
+            start = time.perf_counter()
+            for i in range(count):
+                func()
+            measure = time.perf_counter() - start
+            if elapsed is None or measure < elapsed:
+                elapsed = measure
+        # memory is traced apart, tracing slows calls down
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+        before = tracemalloc.get_traced_memory()[0]
+        func()
+        peak = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+        result = {'ops': count / elapsed, 'peak_bytes': peak}
+        if size:
+            result['size'] = size
+            result['mb_per_s'] = size * count / elapsed / 1e6
+        self.Results[name] = result
+        return result
+
+    def Report(self, baseline=None, threshold=0.1):
+        """
+        Create text report, compared with baseline if any
+
+        @param dict baseline  - results of previous run
+        @param float threshold - relative slowdown reported as regression
+        @return string report, list of regressed benchmarks
+        """
+
+        lines = ['%-36s %14s %12s %12s' % ('benchmark', 'ops/s', 'MB/s', 'peak bytes')]
+        regressions = []
+        for name, result in self.Results.items():
+            line = '%-36s %14.0f %12s %12d' % (name, result['ops'],
+                                              '%.1f' % result['mb_per_s'] if 'mb_per_s' in result else '-',
+                                              result['peak_bytes'])
+            if baseline and name in baseline:
+                ratio = result['ops'] / baseline[name]['ops']
+                line += ' %+7.1f%%' % ((ratio - 1) * 100)
+                if ratio < 1 - threshold:
+                    regressions.append(name)
+                    line += ' REGRESSION'
+            lines.append(line)
+        return '\n'.join(lines), regressions
+
+
+def BenchAll(bench, sizes=(10, 100, 1000)):
+    """
+    Run all benchmarks
+
+    @param MTBench bench
+    @param list sizes - counts of deals in page answers
+    """
+
+    # encode
+    user_add = {
+        MTProtocolConsts.WEB_PARAM_LOGIN: '100500',
+        MTProtocolConsts.WEB_PARAM_PASS_MAIN: 'Password1',
+        MTProtocolConsts.WEB_PARAM_PASS_INVESTOR: 'Password2',
+        MTProtocolConsts.WEB_PARAM_GROUP: 'demo\\forex-usd',
+        MTProtocolConsts.WEB_PARAM_NAME: 'John Smith',
+    }
+    bench.Run('encode.user_add', lambda: MTQueryEncoder.EncodeParts(MTProtocolConsts.WEB_CMD_USER_ADD, user_add))
+    for size in sizes:
+        symbol = {MTProtocolConsts.WEB_PARAM_BODYTEXT: MTBenchCapture.DealPageAnswer(size).split('\r\n', 1)[1]}
+        bench.Run('encode.body_text.%d' % size,
+                  lambda: MTQueryEncoder.EncodeParts(MTProtocolConsts.WEB_CMD_SYMBOL_ADD, symbol),
+                  len(symbol[MTProtocolConsts.WEB_PARAM_BODYTEXT]) * 2)
+        bench.Run('encode.frames.%d' % size,
+                  lambda: sum(1 for frame in MTQueryEncoder.EncodeFrames(MTProtocolConsts.WEB_CMD_SYMBOL_ADD, symbol)),
+                  len(symbol[MTProtocolConsts.WEB_PARAM_BODYTEXT]) * 2)
+    bench.Run('header.encode', lambda: MTQueryEncoder.EncodeHeader(0x1234, 0x0abc))
+    # header parse
+    header = b'12340abc0'
+    bench.Run('header.parse', lambda: MTHeaderProtocol(header))
+    # answer line parse, legacy is ParseAnswer and GetRetCode before ParseAnswerLine
+    user_add_answer = MTBenchCapture.UserAddAnswer()
+    bench.Run('parse.user_add', lambda: MTConnect.ParseAnswerLine(user_add_answer))
+    bench.Run('parse.legacy.user_add', lambda: _ParseAnswerLegacy(user_add_answer))
+    deal_page_line = MTBenchCapture.DealPageAnswer(0).split('\r\n', 1)[0] + '\r\n'
+    bench.Run('parse.deal_page_line', lambda: MTConnect.ParseAnswerLine(deal_page_line))
+    bench.Run('parse.legacy.deal_page_line', lambda: _ParseAnswerLegacy(deal_page_line))
+    for size in sizes:
+        answer = MTBenchCapture.DealPageAnswer(size)
+        bench.Run('parse.deal_page.%d' % size, lambda: MTConnect.ParseAnswerLine(answer), len(answer) * 2)
+        bench.Run('parse.legacy.deal_page.%d' % size, lambda: _ParseAnswerLegacy(answer), len(answer) * 2)
+    # frame split, capture is fed by chunks as from socket
+    for size in sizes:
+        capture = MTBenchCapture.Frames(1, MTBenchCapture.DealPageAnswer(size))
+        bench.Run('frames.split.%d' % size, lambda: _SplitFrames(capture), len(capture))
+    # decode of json body
+    for size in sizes:
+        body = MTBenchCapture.DealPageAnswer(size).encode('utf-16le')
+        bench.Run('decode.json_stream.%d' % size, lambda: _DecodeStream(body), len(body))
+        bench.Run('decode.json_loads.%d' % size, lambda: json.loads(MTConnect.GetJson(None, body.decode('utf-16le'))),
+                  len(body))
+    # auth hashing
+    bench.Run('auth.hash', lambda: MTUtils.GetHashFromPassword('Password1', '0123456789abcdef0123456789abcdef'))
+    # crypt
+    key = bytes(range(32))
+    iv = bytes(range(16))
+    for size in (64, 4096, 65536):
+        data = bytes(size)
+        crypt = MTCryptOFB(key, iv)
+        bench.Run('crypt.ofb.%d' % size, lambda: crypt.Crypt(data), size)
+    aes = MTAES256(key)
+    bench.Run('crypt.aes_python.1024_blocks', lambda: aes.Keystream((0, 0, 0, 0), 1024), 16 * 1024)
+
+
+def _ParseAnswerLegacy(answer):
+    """
+    Answer parsing of MTConnect.ParseAnswer and GetRetCode before ParseAnswerLine,
+    kept to compare with it
+    """
+
+    answer_list = answer.split('|')
+    command = answer_list[0]
+    param = {}
+    for item in answer_list[1:]:
+        if item != '' and item.find('=') != -1:
+            key = item.split('=')[0].upper()
+            value = item.split('=')[1]
+            param[key] = value
+    return command, param, int(param[MTProtocolConsts.WEB_PARAM_RETCODE].split(' ')[0])
+
+
+def BenchSnapshot(count=20000, sessions=4, latency=0.001, sequential=2000):
+    """
+    Take account snapshot from local server with latency and compare it with sequential USER_ACCOUNT_GET
+
+    @param int count      - count of logins in snapshot
+    @param int sessions   - count of sessions of snapshot
+    @param float latency  - seconds from request to answer
+    @param int sequential - count of logins got one by one
+    @return string report
+    """
+
+    server = MTBenchServer('password', latency)
+    apis = []
+    try:
+        for i in range(sessions):
+            api = MTWebAPI()
+            ret_code = api.Connect('127.0.0.1', server.Port, 5, '1000', 'password')
+            if ret_code != MTRetCode.MT_RET_OK:
+                return 'connect failed: %d' % ret_code
+            apis.append(api)
+        start = time.perf_counter()
+        ret_code, snapshot = MTAccountSnapshotEngine(apis).Take(range(1, count + 1))
+        elapsed = time.perf_counter() - start
+        start = time.perf_counter()
+        for login in range(1, sequential + 1):
+            apis[0].UserAccountGet(login)
+        elapsed_sequential = time.perf_counter() - start
+    finally:
+        for api in apis:
+            api.Disconnect()
+        server.Close()
+    return '\n'.join([
+        'latency %.1f ms' % (latency * 1000),
+        'snapshot %d logins, %d sessions: %.2f s, %d failed' % (count, sessions, elapsed, len(snapshot.Failed)),
+        'sequential %d logins: %.2f s, %.2f s for %d logins' % (sequential, elapsed_sequential,
+                                                             elapsed_sequential * count / sequential, count)])
+
+
+def _SplitFrames(capture, chunk=65536):
+    """
+    Feed capture to frame decoder and take all frames
+    """
+
+    decoder = MTFrameDecoder()
+    view = memoryview(capture)
+    for offset in range(0, len(capture), chunk):
+        decoder.Feed(view[offset:offset + chunk])
+        while decoder.NextFrame()[0] is not None:
+            pass
+
+
+def _DecodeStream(body, chunk=65534):
+    """
+    Decode json records while body is received by chunks
+    """
+
+    stream = MTJsonStream()
+    count = 0
+    for offset in range(0, len(body), chunk):
+        stream.Feed(body[offset:offset + chunk])
+        for record in stream.Records():
+            count += 1
+    for record in stream.Records(True):
+        count += 1
+    return count
+
+
+def Main(argv=None):
+    """
+    Command line entry
+
+    @return int exit code, 1 if there are regressions
+    """
+
+    parser = argparse.ArgumentParser(description='Offline benchmarks of MetaTrader 5 Web API codec')
+    parser.add_argument('--output', help='save results to json file')
+    parser.add_argument('--baseline', help='compare with results from json file')
+    parser.add_argument('--threshold', type=float, default=0.1, help='relative slowdown reported as regression')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds to run each benchmark')
+    parser.add_argument('--repeat', type=int, default=3, help='count of measures, the fastest one is reported')
+    parser.add_argument('--filter', default='', help='run benchmarks which name starts with prefix')
+    parser.add_argument('--snapshot', type=int, default=0,
+                        help='take account snapshot of count logins from local server instead')
+    parser.add_argument('--latency', type=float, default=0.001, help='seconds of answer of local server')
+    args = parser.parse_args(argv)
+    if args.snapshot:
+        print(BenchSnapshot(args.snapshot, latency=args.latency))
+        return 0
+    bench = MTBench(args.min_time, args.filter, args.repeat)
+    BenchAll(bench)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)['results']
+    report, regressions = bench.Report(baseline, args.threshold)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump({'python': sys.version, 'platform': platform.platform(), 'time': time.time(),
+                       'results': bench.Results}, file, indent=2, sort_keys=True)
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(Main())
@@ -0,0 +1,358 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from mt5_protocol import *
+from mt5_retcode import *
+
+
+class MTSymbolCache:
+    """
+    Local copy of symbols catalogue of MetaTrader 5 server.
+    Symbols are indexed by name, path and group, changes made by
+    the same MTWebAPI update or invalidate the cache.
+    Callers get copies, as from MTUserCache.
+    """
+
+    # field of symbol name
+    FIELD_SYMBOL = 'Symbol'
+    # field of symbol path, for example Forex\Majors\EURUSD
+    FIELD_PATH = 'Path'
+
+    def __init__(self, api, ttl=300):
+        """
+        @param MTWebAPI api - connected api, the cache is attached to it
+        @param int ttl      - seconds symbol is valid, 0 for no limit
+
+        @return MTSymbolCache
+        """
+
+        self.m_api = api
+        self.m_ttl = ttl
+        # symbols by name, value is (time of loading, symbol)
+        self._symbols = {}
+        # symbols with group settings by (name, group)
+        self._groups = {}
+        # sorted list of (path, name)
+        self._paths = []
+        self._paths_dirty = True
+        # time of the last full loading
+        self._loaded = 0
+        self._lock = threading.RLock()
+        api.m_symbol_cache = self
+
+    def Load(self):
+        """
+        Load the whole catalogue by SYMBOL_TOTAL/SYMBOL_NEXT
+
+        @return MTRetCode
+        """
+
+        ret_code, symbols = self.m_api.SymbolGetAll()
+        if ret_code != MTRetCode.MT_RET_OK:
+            return ret_code
+        now = time.time()
+        with self._lock:
+            self._symbols = dict((symbol[self.FIELD_SYMBOL], (now, symbol)) for symbol in symbols)
+            self._groups = {}
+            self._paths_dirty = True
+            self._loaded = now
+        return MTRetCode.MT_RET_OK
+
+    def Get(self, symbol_name):
+        """
+        Get symbol by name, old symbol is requested again by SYMBOL_GET
+
+        @param string symbol_name
+        @return MTRetCode, dict symbol
+        """
+
+        with self._lock:
+            entry = self._symbols.get(symbol_name)
+            if entry is not None and not self._IsExpired(entry[0]):
+                return MTRetCode.MT_RET_OK, dict(entry[1])
+        ret_code, symbol = self.m_api.SymbolGet(symbol_name)
+        if ret_code == MTRetCode.MT_RET_OK and symbol is not None:
+            self.Update(symbol)
+        return ret_code, symbol
+
+    def GetGroup(self, symbol_name, group):
+        """
+        Get symbol with settings of group, requested by SYMBOL_GET_GROUP once per ttl
+
+        @param string symbol_name
+        @param string group
+        @return MTRetCode, dict symbol
+        """
+
+        key = (symbol_name, group)
+        with self._lock:
+            entry = self._groups.get(key)
+            if entry is not None and not self._IsExpired(entry[0]):
+                return MTRetCode.MT_RET_OK, dict(entry[1])
+        ret_code, symbol = self.m_api.SymbolGetGroup(symbol_name, group)
+        if ret_code == MTRetCode.MT_RET_OK and symbol is not None:
+            with self._lock:
+                self._groups[key] = (time.time(), dict(symbol))
+        return ret_code, symbol
+
+    def GetByPath(self, prefix):
+        """
+        Get symbols which path begins with prefix, catalogue is reloaded if it is old
+
+        @param string prefix - for example Forex\\Majors\\
+        @return MTRetCode, list of symbols
+        """
+
+        if self._loaded == 0 or self._IsExpired(self._loaded):
+            ret_code = self.Load()
+            if ret_code != MTRetCode.MT_RET_OK:
+                return ret_code, []
+        with self._lock:
+            if self._paths_dirty:
+                self._paths = sorted((entry[1].get(self.FIELD_PATH, name), name)
+                                     for name, entry in self._symbols.items())
+                self._paths_dirty = False
+            result = []
+            index = bisect.bisect_left(self._paths, (prefix, ''))
+            while index < len(self._paths) and self._paths[index][0].startswith(prefix):
+                entry = self._symbols.get(self._paths[index][1])
+                if entry is not None:
+                    result.append(dict(entry[1]))
+                index += 1
+        return MTRetCode.MT_RET_OK, result
+
+    def Names(self):
+        """
+        @return list of cached symbol names
+        """
+
+        with self._lock:
+            return list(self._symbols.keys())
+
+    def Update(self, symbol):
+        """
+        Put new version of symbol to cache
+
+        @param dict symbol
+        """
+
+        name = symbol.get(self.FIELD_SYMBOL)
+        if not name:
+            return
+        with self._lock:
+            old = self._symbols.get(name)
+            self._symbols[name] = (time.time(), dict(symbol))
+            if old is None or old[1].get(self.FIELD_PATH) != symbol.get(self.FIELD_PATH):
+                self._paths_dirty = True
+            self._DropGroups(name)
+
+    def Invalidate(self, symbol_name):
+        """
+        Mark symbol as old, it is requested again on the next Get
+
+        @param string symbol_name
+        """
+
+        with self._lock:
+            entry = self._symbols.get(symbol_name)
+            if entry is not None:
+                self._symbols[symbol_name] = (None, entry[1])
+            self._DropGroups(symbol_name)
+
+    def Remove(self, symbol_name):
+        """
+        Remove deleted symbol
+
+        @param string symbol_name
+        """
+
+        with self._lock:
+            if self._symbols.pop(symbol_name, None) is not None:
+                self._paths_dirty = True
+            self._DropGroups(symbol_name)
+
+    def Clear(self):
+        """
+        Drop all cached symbols
+        """
+
+        with self._lock:
+            self._symbols = {}
+            self._groups = {}
+            self._paths = []
+            self._paths_dirty = True
+            self._loaded = 0
+
+    def _DropGroups(self, symbol_name):
+        """
+        Drop group settings of symbol
+        """
+
+        for key in [key for key in self._groups if key[0] == symbol_name]:
+            del self._groups[key]
+
+    def _IsExpired(self, loaded):
+        """
+        @param float|None loaded - time of loading, None for invalidated
+        @return bool
+        """
+
+        if loaded is None:
+            return True
+        return self.m_ttl > 0 and time.time() - loaded > self.m_ttl
+
+
+class MTLRUCache:
+    """
+    Cache with size bound and max age, the least recently used item is evicted first
+    """
+
+    def __init__(self, size, max_age):
+        """
+        @param int size      - max count of items
+        @param float max_age - seconds item is valid, 0 for no limit
+
+        @return MTLRUCache
+        """
+
+        self.m_size = size
+        self.m_max_age = max_age
+        # values by key, value is (time of put, value)
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.Hits = 0
+        self.Misses = 0
+
+    def Get(self, key):
+        """
+        @return value|None None if there is no valid item
+        """
+
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None or (self.m_max_age > 0 and time.time() - entry[0] > self.m_max_age):
+                self.Misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.Hits += 1
+            return entry[1]
+
+    def Put(self, key, value):
+        """
+        Add or replace item
+        """
+
+        with self._lock:
+            self._items[key] = (time.time(), value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.m_size:
+                self._items.popitem(last=False)
+
+    def Evict(self, key):
+        """
+        Remove item
+        """
+
+        with self._lock:
+            self._items.pop(key, None)
+
+    def Clear(self):
+        """
+        Remove all items
+        """
+
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+
+class MTUserCache:
+    """
+    Read-through cache of USER_GET and USER_ACCOUNT_GET answers.
+    Changes of user made by the same MTWebAPI evict it, so cached
+    reads never contradict own writes. Callers get copies, so changing
+    a returned dict does not change the cache.
+    """
+
+    def __init__(self, api, size=10000, max_age=30):
+        """
+        @param MTWebAPI api  - connected api
+        @param int size      - max count of cached users
+        @param float max_age - seconds cached user is valid
+
+        @return MTUserCache
+        """
+
+        self.m_api = api
+        self.Users = MTLRUCache(size, max_age)
+        self.Accounts = MTLRUCache(size, max_age)
+        # count of evictions, reads started before eviction are not cached
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def GetUser(self, login):
+        """
+        @return MTRetCode, dict user
+        """
+
+        return self._Get(self.Users, MTProtocolConsts.WEB_CMD_USER_GET, login)
+
+    def GetAccount(self, login):
+        """
+        @return MTRetCode, dict account
+        """
+
+        return self._Get(self.Accounts, MTProtocolConsts.WEB_CMD_USER_ACCOUNT_GET, login)
+
+    def Evict(self, login):
+        """
+        Remove user and account of login, called after change of user
+
+        @param login
+        """
+
+        key = str(login)
+        with self._lock:
+            self._version += 1
+            self.Users.Evict(key)
+            self.Accounts.Evict(key)
+
+    def Clear(self):
+        """
+        Remove all users
+        """
+
+        with self._lock:
+            self._version += 1
+            self.Users.Clear()
+            self.Accounts.Clear()
+
+    def _Get(self, cache, command, login):
+        """
+        Get item from cache or from server
+
+        @return MTRetCode, dict
+        """
+
+        key = str(login)
+        value = cache.Get(key)
+        if value is not None:
+            return MTRetCode.MT_RET_OK, dict(value)
+        version = self._version
+        ret_code, value = self.m_api._GetJson(command, {MTProtocolConsts.WEB_PARAM_LOGIN: key})
+        if ret_code == MTRetCode.MT_RET_OK and value is not None:
+            with self._lock:
+                # user was changed while request was in flight
+                if version == self._version:
+                    cache.Put(key, dict(value))
+        return ret_code, value
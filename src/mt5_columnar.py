@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+from operator import itemgetter
+from mt5_protocol import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class MTColumnSchema:
+    """
+    Columns of records from *_GET_PAGE commands, field name and numpy type.
+    Type 'category' is stored as int32 codes with list of categories.
+    """
+
+    CATEGORY = 'category'
+
+    DEAL = [
+        ('Deal', 'u8'),
+        ('Login', 'u8'),
+        ('Order', 'u8'),
+        ('PositionID', 'u8'),
+        ('Action', 'u4'),
+        ('Entry', 'u4'),
+        ('Time', 'i8'),
+        ('TimeMsc', 'i8'),
+        ('Symbol', CATEGORY),
+        ('Price', 'f8'),
+        ('Volume', 'u8'),
+        ('ContractSize', 'f8'),
+        ('Profit', 'f8'),
+        ('Storage', 'f8'),
+        ('Commission', 'f8'),
+        ('RateProfit', 'f8'),
+    ]
+
+    POSITION = [
+        ('Position', 'u8'),
+        ('Login', 'u8'),
+        ('Action', 'u4'),
+        ('TimeCreate', 'i8'),
+        ('TimeUpdate', 'i8'),
+        ('Symbol', CATEGORY),
+        ('PriceOpen', 'f8'),
+        ('PriceCurrent', 'f8'),
+        ('Volume', 'u8'),
+        ('ContractSize', 'f8'),
+        ('Profit', 'f8'),
+        ('Storage', 'f8'),
+        ('RateProfit', 'f8'),
+        ('RateMargin', 'f8'),
+    ]
+
+    ORDER = [
+        ('Order', 'u8'),
+        ('Login', 'u8'),
+        ('Type', 'u4'),
+        ('State', 'u4'),
+        ('TimeSetup', 'i8'),
+        ('TimeDone', 'i8'),
+        ('Symbol', CATEGORY),
+        ('PriceOrder', 'f8'),
+        ('PriceCurrent', 'f8'),
+        ('VolumeInitial', 'u8'),
+        ('VolumeCurrent', 'u8'),
+        ('PositionID', 'u8'),
+    ]
+
+    ACCOUNT = [
+        ('Login', 'u8'),
+        ('Balance', 'f8'),
+        ('Credit', 'f8'),
+        ('Equity', 'f8'),
+        ('Margin', 'f8'),
+        ('MarginFree', 'f8'),
+        ('MarginLevel', 'f8'),
+        ('MarginLeverage', 'u4'),
+        ('Profit', 'f8'),
+        ('Storage', 'f8'),
+        ('Floating', 'f8'),
+    ]
+
+    @staticmethod
+    def ForCommand(page_command):
+        """
+        Get schema for page command
+
+        @param string page_command
+        @return list
+        """
+
+        schema = {
+            MTProtocolConsts.WEB_CMD_DEAL_GET_PAGE: MTColumnSchema.DEAL,
+            MTProtocolConsts.WEB_CMD_POSITION_GET_PAGE: MTColumnSchema.POSITION,
+            MTProtocolConsts.WEB_CMD_ORDER_GET_PAGE: MTColumnSchema.ORDER,
+            MTProtocolConsts.WEB_CMD_HISTORY_GET_PAGE: MTColumnSchema.ORDER,
+        }.get(page_command)
+        if schema is None:
+            raise ValueError('no column schema for command %s, pass schema' % page_command)
+        return schema
+
+
+class MTColumns:
+    """
+    Records as typed numpy arrays, one array per field
+    """
+
+    # numpy arrays by field name
+    Columns = None
+    # categories of category fields by field name
+    Categories = None
+
+    def __init__(self, columns, categories):
+        """
+        @param dict columns    - numpy arrays by field name
+        @param dict categories - list of categories by field name
+        @return MTColumns
+        """
+
+        self.Columns = columns
+        self.Categories = categories
+
+    def __getitem__(self, name):
+        return self.Columns[name]
+
+    def __contains__(self, name):
+        return name in self.Columns
+
+    def __len__(self):
+        for column in self.Columns.values():
+            return len(column)
+        return 0
+
+    def Decode(self, name):
+        """
+        Get values of category field
+
+        @param string name - field name
+        @return numpy array of strings
+        """
+
+        categories = numpy.array(self.Categories[name], dtype=object)
+        return categories[self.Columns[name]]
+
+
+class MTColumnBuilder:
+    """
+    Fill typed numpy arrays from json records batch by batch,
+    values of a field go to its preallocated array by numpy at once
+    """
+
+    def __init__(self, schema, capacity=0):
+        """
+        @param list schema  - list of (field, type)
+        @param int capacity - expected count of records
+
+        @return MTColumnBuilder
+        """
+
+        if numpy is None:
+            raise RuntimeError('numpy is required for columnar results')
+        if not schema:
+            raise ValueError('schema of columns is empty')
+        self.m_schema = schema
+        self.m_fields = [field for field, column_type in schema]
+        self.m_getters = dict((field, itemgetter(field)) for field in self.m_fields)
+        self.m_size = 0
+        self.m_columns = {}
+        self.m_categories = {}
+        self.m_codes = {}
+        for field, column_type in schema:
+            if column_type == MTColumnSchema.CATEGORY:
+                self.m_columns[field] = numpy.empty(capacity, dtype='i4')
+                self.m_categories[field] = []
+                self.m_codes[field] = {}
+            else:
+                self.m_columns[field] = numpy.empty(capacity, dtype=column_type)
+
+    def Append(self, records):
+        """
+        Add batch of decoded records, missing fields are 0
+
+        @param list records - json records
+        """
+
+        count = len(records)
+        if count == 0:
+            return
+        start = self.m_size
+        end = start + count
+        self._Reserve(end)
+        for field, column_type in self.m_schema:
+            try:
+                values = list(map(self.m_getters[field], records))
+            except KeyError:
+                default = '' if column_type == MTColumnSchema.CATEGORY else 0
+                values = [record.get(field, default) for record in records]
+            if column_type == MTColumnSchema.CATEGORY:
+                self.m_columns[field][start:end] = self._Encode(field, values)
+            else:
+                self.m_columns[field][start:end] = numpy.fromiter(values, column_type, count)
+        self.m_size = end
+
+    def Result(self):
+        """
+        @return MTColumns
+        """
+
+        columns = dict((field, column[:self.m_size]) for field, column in self.m_columns.items())
+        return MTColumns(columns, self.m_categories)
+
+    def _Encode(self, field, values):
+        """
+        Get codes of category values, new values are added to categories
+
+        @param string field
+        @param list values
+        @return numpy array of int32 codes
+        """
+
+        codes = self.m_codes[field]
+        categories = self.m_categories[field]
+        for value in dict.fromkeys(values):
+            if value not in codes:
+                codes[value] = len(categories)
+                categories.append(value)
+        return numpy.fromiter(map(codes.__getitem__, values), 'i4', len(values))
+
+    def _Reserve(self, size):
+        """
+        Grow arrays to size
+        """
+
+        for field in self.m_fields:
+            column = self.m_columns[field]
+            if len(column) < size:
+                grown = numpy.empty(max(size, len(column) * 2), dtype=column.dtype)
+                grown[:self.m_size] = column[:self.m_size]
+                self.m_columns[field] = grown
@@ -5,10 +5,19 @@
 # @contact:
 
 
+import binascii
+import hashlib
+import select
 import socket
+import sys
+import threading
+import time
+from collections import deque
 from mt5_protocol import *
 from mt5_utils import *
 from mt5_retcode import *
+from mt5_crypt import *
+from mt5_logger import *
 
 
 class MTConnect:
@@ -31,16 +40,46 @@ class MTConnect:
     _crypt_rand = ""
     # crypto array
     _crypt_iv = None
-    #
+    # initial vector of packets to server
     _aes_out = None
-    #
+    # initial vector of packets from server
     _aes_in = None
-    # class crypt aes 256
+    # class crypt aes 256 of packets to server
     _crypt_out = None
-    #
+    # class crypt aes 256 of packets from server
     _crypt_in = None
     # number of client packet
     _client_command = 0
+    # size of buffer for socket reading, one frame is up to 64 Kb
+    RECV_BUFFER_SIZE = 65536 + 16
+    # decoder of frames from socket
+    _decoder = None
+    # lock for writing to socket
+    _send_lock = None
+    # condition for numbers of packets and answers queues
+    _answers_cond = None
+    # queues of answers parts by number of packet
+    _answers = None
+    # numbers of packets waiting for answer
+    _in_flight = None
+    # some thread is reading socket now
+    _reading = False
+    # connection is broken
+    _broken = False
+    # last packet number for each thread
+    _local = None
+    # MTMetrics, None if metrics are disabled
+    m_metrics = None
+    # MTLoggerType of this connection, None for level of logger
+    m_log_level = None
+    # interned keys of answers by key as received
+    _answer_keys = {}
+    # codes by RETCODE text, for example '0 Done'
+    _answer_retcodes = {}
+    # header and body are written by one call without joining
+    SEND_MSG = hasattr(socket.socket, 'sendmsg')
+    # time of the last sent or received packet
+    LastActivity = 0
 
     def __init__(self, ip_mt5, port_mt5, timeout, is_crypt):
         """
@@ -60,17 +99,60 @@ class MTConnect:
         # if need  crypt lets begin
         self.is_crypt = is_crypt
         self._client_command = 0
+        # frames decoder, socket is read into its buffer
+        self._decoder = MTFrameDecoder()
+        # packets in flight
+        self._send_lock = threading.Lock()
+        self._answers_cond = threading.Condition()
+        self._answers = {}
+        self._in_flight = set()
+        self._reading = False
+        self._broken = False
+        self._local = threading.local()
+        self.LastActivity = time.time()
         # create socket
         self._connect = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self._connect.settimeout(self._timeout_connection)
 
     def Disconnect(self):
         """
-        Close connection
+        Close connection, the object stays valid: readers of all packets get no answer
+        and sending raises OSError
         """
 
+        self.Drop()
         self._connect.close()
-        del (self._connect)
+
+    def Drop(self):
+        """
+        Mark connection broken and shut socket down, readers of all packets get no answer
+        """
+
+        with self._answers_cond:
+            self._broken = True
+            self._answers_cond.notify_all()
+        try:
+            self._connect.shutdown(socket.SHUT_RDWR)
+        except (OSError, AttributeError):
+            pass
+
+    def IsAlive(self):
+        """
+        Check that connection is not closed or broken, does not send anything
+
+        @return bool
+        """
+
+        if self._broken or getattr(self, '_connect', None) is None:
+            return False
+        try:
+            readable, writable, failed = select.select([self._connect], [], [], 0)
+            if not readable:
+                return True
+            # readable socket without data is closed by server
+            return self._connect.recv(1, socket.MSG_PEEK) != b''
+        except (OSError, ValueError):
+            return False
 
     def Connect(self):
         """
@@ -82,6 +164,41 @@ class MTConnect:
         self._connect.connect((self._ip_mt5, self._port_mt5))
         return MTRetCode.MT_RET_OK
 
+    def NextPacketNumber(self):
+        """
+        Get number for the next client packet, numbers of packets in flight are skipped
+
+        @return int
+        """
+
+        with self._answers_cond:
+            # all numbers are busy, wait for free
+            while len(self._in_flight) >= self.MAX_CLIENT_COMMAND:
+                self._answers_cond.wait()
+            number = self._client_command
+            while True:
+                number += 1
+                # packet max, than first
+                if number > self.MAX_CLIENT_COMMAND:
+                    number = 1
+                if number not in self._in_flight:
+                    break
+            self._in_flight.add(number)
+            self._client_command = number
+        return number
+
+    def ReleasePacketNumber(self, number):
+        """
+        Free number of packet, answer of the packet will be dropped
+
+        @param int number - number of packet
+        """
+
+        with self._answers_cond:
+            self._in_flight.discard(number)
+            self._answers.pop(number, None)
+            self._answers_cond.notify_all()
+
     def Send(self, command, data, first_request=False):
         """
         Send data to MetaTrader 5 server
@@ -93,144 +210,397 @@ class MTConnect:
         @return bool
         """
 
+        return self.SendPacket(command, data, first_request) != 0
+
+    def SendPacket(self, command, data, first_request=False):
+        """
+        Send data to MetaTrader 5 server without waiting of answer,
+        answer can be got by Read with the returned number
+
+        @param string  command       - command, for example AUTH_START, AUTH_ANSWER and etc.
+        @param dict data
+        @param bool    first_request bool is ot first
+
+        @return int number of packet
+        """
+
+        # closed or broken stream can not be continued
+        if self._broken:
+            raise ConnectionError('connection to %s:%s is closed' % (self._ip_mt5, self._port_mt5))
         # number packet
-        self._client_command += 1
-        # packet max, than first
-        if self._client_command > self.MAX_CLIENT_COMMAND:
-            self._client_command = 1
-        # create query
-        body_request = ''
-        q = command
-        # create string for query
-        if len(data) != 0:
-            q += "|"
-            for param, value in data.items():
-                if param == MTProtocolConsts.WEB_PARAM_BODYTEXT:
-                    body_request = value
-                else:
-                    q += param + '=' + value + '|'
-            q += "\r\n"
-            # add body request
-            if body_request != '':
-                q += body_request
-        else:
-            q += "|\r\n"
-        #
-        query_body = q.encode('utf-16le')
+        number = self.NextPacketNumber()
+        # remember number for Read from the same thread
+        self._local.number = number
+        started = False
+        try:
+            # packets must go to socket in the same order as crypted,
+            # frames of big body text are encoded one by one while sending
+            with self._send_lock:
+                for index, (parts, flag) in enumerate(MTQueryEncoder.EncodeFrames(command, data)):
+                    # the first part of the first frame is query line, it is logged before crypt
+                    if index == 0 and MTLogger.IsWritePacket(self):
+                        MTLogger.Packet(self, '>', number, parts[0])
+                    started = True
+                    header, parts = self.PrepareFrame(command, parts, number, first_request, flag)
+                    # send data to MetaTrader 5 server
+                    self.SendFrame(header, parts)
+                    first_request = False
+                    if self.m_metrics is not None:
+                        self.m_metrics.AddSent(len(header) + sum(len(part) for part in parts))
+        except BaseException:
+            self.ReleasePacketNumber(number)
+            # server has got a part of packet or crypt has gone ahead, the stream can not be continued
+            if started:
+                self.Drop()
+            raise
+        self.LastActivity = time.time()
+        return number
+
+    def SendFrame(self, header, parts):
+        """
+        Write header and parts of body to socket without joining them
+
+        @param bytes header
+        @param list parts - list of bytes
+        """
+
+        buffers = [header] + parts
+        if not self.SEND_MSG:
+            self._connect.sendall(b''.join(buffers))
+            return
+        sent = self._connect.sendmsg(buffers)
+        # socket has taken a part only, send the rest
+        for buffer in buffers:
+            if sent >= len(buffer):
+                sent -= len(buffer)
+                continue
+            self._connect.sendall(memoryview(buffer)[sent:])
+            sent = 0
+
+    def SendPing(self):
+        """
+        Send PING without waiting of answer, the answer if any is dropped
+        """
+
+        number = self.SendPacket(MTProtocolConsts.WEB_CMD_PING, {})
+        self.ReleasePacketNumber(number)
+
+    def IsIdle(self, idle_time):
+        """
+        Check that there are no packets in flight and no traffic for idle_time
+
+        @param float idle_time - seconds
+        @return bool
+        """
+
+        with self._answers_cond:
+            if self._in_flight or self._reading:
+                return False
+        return time.time() - self.LastActivity >= idle_time
+
+    def PreparePacket(self, command, query_body, number, first_request=False):
+        """
+        Crypt body if need and add header to it
+
+        @param string command   - command of packet
+        @param bytes query_body - body of packet
+        @param int number       - number of packet
+        @param bool first_request bool is ot first
+
+        @return bytes whole packet
+        """
+
+        header, parts = self.PrepareFrame(command, [query_body], number, first_request)
+        return header + parts[0]
+
+    def PrepareFrame(self, command, parts, number, first_request=False, flag=0):
+        """
+        Crypt parts of body if need and create header for them
+
+        @param string command   - command of packet
+        @param list parts       - parts of body, list of bytes
+        @param int number       - number of packet
+        @param bool first_request bool is ot first
+        @param int flag         - 1 for not the last frame of packet
+
+        @return bytes header, list of bytes body parts
+        """
+
         # if need we crypt packet, crypt did not for auth_start and auth_start_answer
         if command != MTProtocolConsts.WEB_CMD_AUTH_START and command != MTProtocolConsts.WEB_CMD_AUTH_ANSWER and \
                 self.is_crypt:
-            query_body, query_hexlen = self.CryptPacket(query_body, len(query_body))
-        else:
-            query_hexlen = hex(len(query_body))[2:].rjust(4, '0')
+            # OFB keystream continues from part to part
+            parts = [self.CryptPacket(part, len(part)) for part in parts]
+        size = 0
+        for part in parts:
+            size += len(part)
+        return MTQueryEncoder.EncodeHeader(size, number, first_request, flag), parts
 
-        # send request
-        if first_request:
-            header = MTProtocolConsts.WEB_PREFIX_WEBAPI + query_hexlen + hex(self._client_command)[2:].rjust(4, '0')
-            query = header + '0' + query_body
-        else:
-            header = query_hexlen + hex(self._client_command)[2:].rjust(4, '0')
-            query = header + '0' + query_body
-        # send data to MetaTrader 5 server
-        self._connect.send(query)
-        return True
+    @staticmethod
+    def EncodeQuery(command, data):
+        """
+        Create body of packet for command
+
+        @param string  command       - command, for example AUTH_START, AUTH_ANSWER and etc.
+        @param dict data
+
+        @return bytes query in UTF-16LE
+        """
+
+        return MTQueryEncoder.Encode(command, data)
 
     def CryptPacket(self, packet_body, len_packet):
-        pass
+        """
+        Crypt body of packet to server
+
+        @param bytes packet_body - body of packet or its part
+        @param int len_packet    - length of body
+        @return bytes crypted body
+        """
+
+        return self._crypt_out.Crypt(packet_body)
 
     def DeCryptPacket(self, packet_body, len_packet):
-        pass
-
-    def GetPacket(self, buffer_size, response_only):
-        """
-        Get a whole packet from socket buffer
-        @param int buffer_size socket buffer size
-
-        @return string packet the whole packet in hex format
-        @return dict header of the packet
-        """
-
-        # get first sub packet
-        packet = self._connect.recv(buffer_size)
-        recv_size = buffer_size
-        # empty packet
-        if packet == '' or len(packet) < 9:
-            return None, None
-        # get header data
-        header_data = packet[:MTHeaderProtocol.HEADER_LENGTH]
-        # Process header data
-        header = MTHeaderProtocol(header_data)
-        # recieve more data from buffer
-        while recv_size < header.SizeBody:
-            sub_packet = self._connect.recv(buffer_size)
-            if len(sub_packet) >= 9:
-                # remove ping packet
-                if sub_packet.find('0000') != -1:
-                    sub_packet = sub_packet[:sub_packet.index('0000')]
-                    # continue
-            # connect sub packets
-            packet += sub_packet
-            recv_size += buffer_size
-        # get the response line only
-        if response_only:
-            packet = packet.splitlines(False)[0]
-        return packet, header
+        """
+        Decrypt body of packet from server
 
-    def Read(self, auth_packet=False, is_binary=False, response_only=False):
+        @param bytes packet_body - body of packet
+        @param int len_packet    - length of body
+        @return bytes
         """
-        Get data from MetaTrader 5 server
 
-        @param bool auth_packet wait the auth packet
-        @param bool is_binary
-        @return None|string
+        return self._crypt_in.Crypt(packet_body)
+
+    def GetPacket(self):
+        """
+        Get a whole packet from socket, PING packets are skipped by decoder
+
+        @return bytes body of the packet
+        @return MTHeaderProtocol header of the packet
         """
 
-        result = ''
+        pings = self._decoder.PingCount
         while True:
-            response, header = self.GetPacket(1024, response_only)
-            # get result body
-            data = response[9:]
-            if header is None:
-                # if(MTLogger.getIsWriteLog()) MTLogger.write(MTLoggerType.DEBUG, 'incorrect header data "' + $header_data + '"')
-                break
-            if data is None and header.SizeBody > 0:
-                # if(MTLogger.getIsWriteLog()) MTLogger.write(MTLoggerType.DEBUG, "read incorrect packet, length " + $header.SizeBody + ", but data is None")
-                break
-            # if need decrypt packet do it
-            if self.is_crypt and not auth_packet:
-                data = self.DeCryptPacket(data, header.SizeBody)
-            # check number of packet
-            if header.NumberPacket != self._client_command:
-                # check packet length
-                if header.SizeBody != 0:
-                    pass
-                    # if(MTLogger.getIsWriteLog()) MTLogger.write(MTLoggerType.DEBUG, "number of packet incorrect need: " + self._client_command + ", but get " + $header.NumberPacket)
-                else:
-                    # this is PING packet
-                    # if(MTLogger.getIsWriteLog()) MTLogger.write(MTLoggerType.DEBUG, "PING packet")
-                    pass
-                # read next packet
-                continue
-            # get result
-            result += data
-            # read to end
-            if header.Flag == 0:
-                break
+            try:
+                header, body = self._decoder.NextFrame()
+            except ValueError as error:
+                if MTLogger.IsWriteLog(MTLoggerType.DEBUG, self):
+                    MTLogger.Write(MTLoggerType.DEBUG, 'incorrect header data: %s', error, connect=self)
+                return None, None
+            if header is not None:
+                if self.m_metrics is not None:
+                    self.m_metrics.AddReceived(header.HEADER_LENGTH + header.SizeBody, self._decoder.PingCount - pings)
+                return body, header
+            # read as much as socket has straight into the decoder, frames are views of it
+            size = self._connect.recv_into(self._decoder.Buffer())
+            if size == 0:
+                # connection closed by server
+                return None, None
+            self._decoder.Commit(size)
+
+    def Read(self, auth_packet=False, is_binary=False, response_only=False, number=None):
+        """
+        Get data from MetaTrader 5 server
 
-        # decoding data
+        @param bool auth_packet wait the auth packet, packets are decrypted when crypt rand is set
+        @param bool is_binary answer is not decoded, see GetBinaryLine and GetBinary
+        @param bool response_only return the first line of answer only
+        @param int number number of packet, by default the last packet sent by this thread
+        @return None|string|memoryview memoryview of UTF-16LE answer line and binary body for is_binary
+        """
+
+        if number is None:
+            number = getattr(self._local, 'number', self._client_command)
         if is_binary:
-            """
-            pos        = strpos($result, "\n")
-            first_line = substr($result, 0, $pos)
-            result     = mb_convert_encoding($first_line, "utf-8", "utf-16le") + "\r\n" + substr($result, $pos)
-            """
-            pass
-        else:
-            result = result.decode('utf-16le')
-            # if(MTLogger.getIsWriteLog()) MTLogger.write(MTLoggerType.DEBUG, "result: " + $result)
+            result = MTConnect.JoinBinary(list(self.ReadChunks(number, auth_packet)), response_only)
+            # binary body is not logged, the answer line only
+            if MTLogger.IsWritePacket(self):
+                MTLogger.Packet(self, '<', number, result[:MTConnect.FindLineEnd(result)])
+            return result
+        result = b''.join(self.ReadChunks(number, auth_packet))
+        # get the response line only
+        if response_only:
+            result = result[:MTConnect.FindLineEnd(result)]
+        # decoding data
+        result = result.decode('utf-16le')
+        if MTLogger.IsWritePacket(self):
+            MTLogger.Packet(self, '<', number, result)
         # return result
         return result
 
+    @staticmethod
+    def JoinBinary(chunks, response_only=False):
+        """
+        Make one view of binary answer, answer of one frame is not copied
+
+        @param list chunks - bodies of frames of answer
+        @param bool response_only return the first line of answer only
+        @return memoryview
+        """
+
+        # records of binary body can cross frames, so frames are joined
+        data = chunks[0] if len(chunks) == 1 else b''.join(chunks)
+        if response_only:
+            return memoryview(data)[:MTConnect.FindLineEnd(data)]
+        return memoryview(data)
+
+    @staticmethod
+    def FindLineEnd(data):
+        """
+        Find end of the first line in UTF-16LE encoded data
+
+        @param bytes data - bytes or memoryview
+        @return int offset of "\r\n" or length of data
+        """
+
+        if isinstance(data, memoryview):
+            # answer line is short, it is searched in growing prefix of view
+            size = 1024
+            while True:
+                prefix = data[:size].tobytes()
+                pos = MTConnect.FindLineEnd(prefix)
+                if pos < len(prefix) or len(prefix) == len(data):
+                    return pos
+                size *= 4
+        pos = data.find(b'\r\x00\n\x00')
+        # skip matches inside of two chars
+        while pos != -1 and pos % 2 != 0:
+            pos = data.find(b'\r\x00\n\x00', pos + 1)
+        if pos == -1:
+            return len(data)
+        return pos
+
+    def ReadChunks(self, number, auth_packet=False):
+        """
+        Get parts of answer for packet as they are received,
+        number of packet is released at the end
+
+        @param int number number of packet
+        @param bool auth_packet wait the auth packet
+        @return generator of bytes
+        """
+
+        try:
+            while True:
+                data, flag = self.ReadChunk(number, auth_packet)
+                if data is None:
+                    return
+                yield data
+                # read to end
+                if flag == 0:
+                    return
+        finally:
+            self.ReleasePacketNumber(number)
+
+    def ReadJson(self, number=None):
+        """
+        Get answer with json body, items of json array are decoded
+        while the rest of answer is received.
+        The records generator must be iterated to the end or closed.
+
+        @param int number number of packet, by default the last packet sent by this thread
+        @return string the first line of answer
+        @return generator of json items
+        """
+
+        if number is None:
+            number = getattr(self._local, 'number', self._client_command)
+        stream = MTJsonStream()
+        chunks = self.ReadChunks(number)
+        for data in chunks:
+            stream.Feed(data)
+            if stream.Answer is not None:
+                break
+        if stream.Answer is None:
+            # answer without body
+            list(stream.Records(True))
+        # json body is not logged, the answer line only
+        if MTLogger.IsWritePacket(self):
+            MTLogger.Packet(self, '<', number, stream.Answer or '')
+        return stream.Answer, MTConnect._IterJson(stream, chunks)
+
+    @staticmethod
+    def _IterJson(stream, chunks):
+        """
+        Decode json items from the rest of answer
+
+        @param MTJsonStream stream - decoder with the first part of answer
+        @param generator chunks    - the rest parts of answer
+        @return generator of json items
+        """
+
+        try:
+            for item in stream.Records():
+                yield item
+            for data in chunks:
+                stream.Feed(data)
+                for item in stream.Records():
+                    yield item
+            for item in stream.Records(True):
+                yield item
+        finally:
+            chunks.close()
+
+    def ReadChunk(self, number, auth_packet=False):
+        """
+        Get next part of answer for packet, answers for other packets
+        are queued for their readers
+
+        @param int number number of packet
+        @param bool auth_packet wait the auth packet
+        @return bytes|None data, None if connection is broken
+        @return int flag of the part, 0 for the last part
+        """
+
+        with self._answers_cond:
+            while True:
+                queue = self._answers.get(number)
+                if queue:
+                    return queue.popleft()
+                if self._broken:
+                    return None, 0
+                # another thread reads socket now, wait it
+                if not self._reading:
+                    break
+                self._answers_cond.wait()
+            self._reading = True
+        try:
+            while True:
+                try:
+                    data, header = self.GetPacket()
+                except socket.timeout:
+                    # stream is intact, the next reader goes on with it
+                    raise
+                except OSError:
+                    # socket is dead, readers of other packets are woken in finally
+                    with self._answers_cond:
+                        self._broken = True
+                    raise
+                if header is None:
+                    with self._answers_cond:
+                        self._broken = True
+                    return None, 0
+                self.LastActivity = time.time()
+                # if need decrypt packet do it, auth packets come before crypt rand is set
+                if self.is_crypt and self._crypt_in is not None:
+                    data = self.DeCryptPacket(data, header.SizeBody)
+                if header.NumberPacket == number:
+                    return data, header.Flag
+                with self._answers_cond:
+                    # check number of packet
+                    if header.NumberPacket not in self._in_flight:
+                        if MTLogger.IsWriteLog(MTLoggerType.DEBUG, self):
+                            MTLogger.Write(MTLoggerType.DEBUG, 'number of packet incorrect need: %d, but get %d',
+                                           number, header.NumberPacket, connect=self)
+                        continue
+                    # answer for another packet, queue it for its reader
+                    self._answers.setdefault(header.NumberPacket, deque()).append((data, header.Flag))
+                    self._answers_cond.notify_all()
+        finally:
+            with self._answers_cond:
+                self._reading = False
+                self._answers_cond.notify_all()
+
     def ParseAnswer(self, answer):
         """
         Get command answer
@@ -240,44 +610,107 @@ class MTConnect:
         @return command param dict
         """
 
-        answer_list = answer.split('|')
-        command = answer_list[0]
-        param = {}
-        for item in answer_list[1:]:
-            if item != '' and item.find('=') != -1:
-                key = item.split('=')[0].upper()
-                value = item.split('=')[1]
-                param[key] = value
+        command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(answer)
         return command, param
 
+    @staticmethod
+    def ParseAnswerLine(answer):
+        """
+        Parse the first line of answer in one pass, body is not touched
+
+        @param string answer - answer, it can contain body after the first line
+        @return string command
+        @return dict parameters, keys are interned upper case names
+        @return int retcode, MT_RET_ERR_DATA if answer has no RETCODE, MT_RET_ERROR if it is not a number
+        @return int offset of body in answer
+        """
+
+        end = answer.find('\r\n')
+        if end == -1:
+            end = body_offset = len(answer)
+        else:
+            body_offset = end + 2
+        items = answer[:end].split('|')
+        keys = MTConnect._answer_keys
+        param = {}
+        for item in items[1:]:
+            key, sep, value = item.partition('=')
+            if sep:
+                interned = keys.get(key)
+                if interned is None:
+                    interned = sys.intern(key.upper())
+                    # server sends a few different keys only
+                    if len(keys) < 1024:
+                        keys[key] = interned
+                param[interned] = value
+        ret_code = param.get(MTProtocolConsts.WEB_PARAM_RETCODE)
+        if ret_code:
+            ret_code = MTConnect.GetRetCode(ret_code)
+        else:
+            ret_code = MTRetCode.MT_RET_ERR_DATA
+        return items[0], param, ret_code, body_offset
+
     def GetJson(self, answer):
         """
         Get json from answer
 
         @param string answer
 
-        @return None|string
+        @return None|string json text after the first line of answer
         """
 
-        return None
+        pos = answer.find('\r\n')
+        if pos == -1:
+            return None
+        return answer[pos + 2:]
+
+    @staticmethod
+    def GetBinaryLine(answer):
+        """
+        Get the first line of binary answer, only the line is decoded
+
+        @param memoryview answer - answer from Read with is_binary
+
+        @return string
+        """
+
+        return answer[:MTConnect.FindLineEnd(answer)].tobytes().decode('utf-16le')
 
     def GetBinary(self, answer):
         """
+        Get binary body from answer, body is not copied
+
+        @param memoryview answer - answer from Read with is_binary
+
+        @return None|memoryview body after the first line of answer
         """
 
-        return None
+        pos = MTConnect.FindLineEnd(answer)
+        if pos == len(answer):
+            return None
+        return answer[pos + 4:]
 
     @staticmethod
     def GetRetCode(ret_code_string):
         """
         Get code from string
         @param string $ret_code_string
-        @return int
+        @return int, MT_RET_ERROR if code is not a number
         """
 
         if ret_code_string == '':
             return ''
-        return int(ret_code_string.split(' ')[0])
+        ret_code = MTConnect._answer_retcodes.get(ret_code_string)
+        if ret_code is None:
+            try:
+                ret_code = int(ret_code_string.partition(' ')[0])
+            except ValueError:
+                # broken answer is an error of command, not of connection
+                ret_code = MTRetCode.MT_RET_ERROR
+            # server sends a few different texts only
+            if len(MTConnect._answer_retcodes) < 1024:
+                MTConnect._answer_retcodes[ret_code_string] = ret_code
+        return ret_code
 
     def SetCryptRand(self, crypt, password):
         """
@@ -289,7 +722,17 @@ class MTConnect:
 
         self._crypt_rand = crypt
         # out = md5(md5(mb_convert_encoding(password, 'utf-16le', 'utf-8'), true) + MTProtocolConsts.WEB_API_WORD)
+        out = hashlib.md5(hashlib.md5(password.encode('utf-16le')).digest() +
+                          MTProtocolConsts.WEB_API_WORD.encode('ascii')).digest()
+        self._crypt_iv = []
         for i in range(0, 16):
             # out = md5(MTUtils.GetFromHex(substr(self._crypt_rand, i * 32, 32)) + MTUtils.GetFromHex(out))
-            self._crypt_iv[i] = out
+            out = hashlib.md5(binascii.a2b_hex(self._crypt_rand[i * 32:i * 32 + 32]) + out).digest()
+            self._crypt_iv.append(out)
+        # key is 256 bits, each direction has own OFB vector
+        key = self._crypt_iv[0] + self._crypt_iv[1]
+        self._aes_out = self._crypt_iv[2]
+        self._aes_in = self._crypt_iv[3]
+        self._crypt_out = MTCryptOFB(key, self._aes_out)
+        self._crypt_in = MTCryptOFB(key, self._aes_in)
         return None
@@ -0,0 +1,201 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import struct
+
+try:
+    from cryptography.hazmat.primitives.ciphers import Cipher, algorithms
+    try:
+        from cryptography.hazmat.decrepit.ciphers.modes import OFB
+    except ImportError:
+        from cryptography.hazmat.primitives.ciphers.modes import OFB
+except ImportError:
+    Cipher = None
+
+
+def _Xtime(a):
+    """
+    Multiply by x in GF(2^8)
+    """
+
+    a <<= 1
+    return (a ^ 0x11b) if a & 0x100 else a
+
+
+def _Rotl8(x, shift):
+    return ((x << shift) | (x >> (8 - shift))) & 0xff
+
+
+def _MakeTables():
+    """
+    Create S-box and encryption T-tables of AES
+    """
+
+    sbox = [0] * 256
+    p = q = 1
+    while True:
+        # multiply p by 3
+        p = p ^ _Xtime(p)
+        # divide q by 3
+        q ^= q << 1
+        q ^= q << 2
+        q ^= q << 4
+        q &= 0xff
+        if q & 0x80:
+            q ^= 0x09
+        # affine transformation
+        sbox[p] = (q ^ _Rotl8(q, 1) ^ _Rotl8(q, 2) ^ _Rotl8(q, 3) ^ _Rotl8(q, 4) ^ 0x63) & 0xff
+        if p == 1:
+            break
+    sbox[0] = 0x63
+    te0 = []
+    for s in sbox:
+        s2 = _Xtime(s)
+        te0.append((s2 << 24) | (s << 16) | (s << 8) | (s2 ^ s))
+    te1 = [((t >> 8) | (t << 24)) & 0xffffffff for t in te0]
+    te2 = [((t >> 16) | (t << 16)) & 0xffffffff for t in te0]
+    te3 = [((t >> 24) | (t << 8)) & 0xffffffff for t in te0]
+    return sbox, te0, te1, te2, te3
+
+
+_SBOX, _TE0, _TE1, _TE2, _TE3 = _MakeTables()
+
+
+class MTAES256:
+    """
+    AES-256 block encryption, only encryption is needed for OFB mode
+    """
+
+    ROUNDS = 14
+
+    def __init__(self, key):
+        """
+        @param bytes key - 32 bytes key
+        @return MTAES256
+        """
+
+        if len(key) != 32:
+            raise ValueError('AES-256 key must be 32 bytes')
+        sbox = _SBOX
+        words = list(struct.unpack('>8I', key))
+        rcon = 1
+        for i in range(8, 4 * (self.ROUNDS + 1)):
+            t = words[i - 1]
+            if i % 8 == 0:
+                t = ((t << 8) & 0xffffffff) | (t >> 24)
+                t = (sbox[t >> 24] << 24) | (sbox[(t >> 16) & 0xff] << 16) | \
+                    (sbox[(t >> 8) & 0xff] << 8) | sbox[t & 0xff]
+                t ^= rcon << 24
+                rcon = _Xtime(rcon)
+            elif i % 8 == 4:
+                t = (sbox[t >> 24] << 24) | (sbox[(t >> 16) & 0xff] << 16) | \
+                    (sbox[(t >> 8) & 0xff] << 8) | sbox[t & 0xff]
+            words.append(words[i - 8] ^ t)
+        self._round_keys = words
+
+    def EncryptBlock(self, block):
+        """
+        Encrypt one 16 bytes block
+
+        @param bytes block
+        @return bytes
+        """
+
+        state, stream = self.Keystream(struct.unpack('>4I', block), 1)
+        return stream
+
+    def Keystream(self, state, count):
+        """
+        Generate OFB keystream, each block is encryption of the previous one
+
+        @param tuple state - 4 words of the last block
+        @param int count   - count of blocks
+        @return tuple new state, bytes keystream
+        """
+
+        te0, te1, te2, te3, sbox = _TE0, _TE1, _TE2, _TE3, _SBOX
+        rk = self._round_keys
+        rounds = self.ROUNDS
+        pack = struct.Struct('>4I').pack
+        out = []
+        s0, s1, s2, s3 = state
+        for n in range(count):
+            s0 ^= rk[0]
+            s1 ^= rk[1]
+            s2 ^= rk[2]
+            s3 ^= rk[3]
+            k = 4
+            for r in range(1, rounds):
+                t0 = te0[s0 >> 24] ^ te1[(s1 >> 16) & 0xff] ^ te2[(s2 >> 8) & 0xff] ^ te3[s3 & 0xff] ^ rk[k]
+                t1 = te0[s1 >> 24] ^ te1[(s2 >> 16) & 0xff] ^ te2[(s3 >> 8) & 0xff] ^ te3[s0 & 0xff] ^ rk[k + 1]
+                t2 = te0[s2 >> 24] ^ te1[(s3 >> 16) & 0xff] ^ te2[(s0 >> 8) & 0xff] ^ te3[s1 & 0xff] ^ rk[k + 2]
+                t3 = te0[s3 >> 24] ^ te1[(s0 >> 16) & 0xff] ^ te2[(s1 >> 8) & 0xff] ^ te3[s2 & 0xff] ^ rk[k + 3]
+                s0, s1, s2, s3 = t0, t1, t2, t3
+                k += 4
+            # last round without MixColumns
+            t0 = ((sbox[s0 >> 24] << 24) | (sbox[(s1 >> 16) & 0xff] << 16) |
+                  (sbox[(s2 >> 8) & 0xff] << 8) | sbox[s3 & 0xff]) ^ rk[k]
+            t1 = ((sbox[s1 >> 24] << 24) | (sbox[(s2 >> 16) & 0xff] << 16) |
+                  (sbox[(s3 >> 8) & 0xff] << 8) | sbox[s0 & 0xff]) ^ rk[k + 1]
+            t2 = ((sbox[s2 >> 24] << 24) | (sbox[(s3 >> 16) & 0xff] << 16) |
+                  (sbox[(s0 >> 8) & 0xff] << 8) | sbox[s1 & 0xff]) ^ rk[k + 2]
+            t3 = ((sbox[s3 >> 24] << 24) | (sbox[(s0 >> 16) & 0xff] << 16) |
+                  (sbox[(s1 >> 8) & 0xff] << 8) | sbox[s2 & 0xff]) ^ rk[k + 3]
+            s0, s1, s2, s3 = t0, t1, t2, t3
+            out.append(pack(s0, s1, s2, s3))
+        return (s0, s1, s2, s3), b''.join(out)
+
+
+class MTCryptOFB:
+    """
+    AES-256 in OFB mode for one direction of connection,
+    state continues from packet to packet
+    """
+
+    # blocks of keystream generated at once by pure python AES
+    KEYSTREAM_BLOCKS = 1024
+
+    def __init__(self, key, iv):
+        """
+        @param bytes key - 32 bytes key
+        @param bytes iv  - 16 bytes initial vector
+        @return MTCryptOFB
+        """
+
+        self._cipher = None
+        if Cipher is not None:
+            # C implementation, it crypts whole packets at once
+            self._cipher = Cipher(algorithms.AES(key), OFB(iv)).encryptor()
+            return
+        self._aes = MTAES256(key)
+        self._state = struct.unpack('>4I', iv)
+        self._stream = b''
+        self._pos = 0
+
+    def Crypt(self, data):
+        """
+        Crypt or decrypt data, both are the same in OFB mode
+
+        @param bytes data
+        @return bytes
+        """
+
+        if self._cipher is not None:
+            return self._cipher.update(data)
+        size = len(data)
+        if size == 0:
+            return b''
+        available = len(self._stream) - self._pos
+        if available < size:
+            blocks = max(self.KEYSTREAM_BLOCKS, (size - available + 15) // 16)
+            self._state, stream = self._aes.Keystream(self._state, blocks)
+            self._stream = self._stream[self._pos:] + stream
+            self._pos = 0
+        stream = self._stream[self._pos:self._pos + size]
+        self._pos += size
+        # xor the whole packet as two big numbers
+        return (int.from_bytes(data, 'little') ^ int.from_bytes(stream, 'little')).to_bytes(size, 'little')
@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import threading
+from mt5_api import *
+from mt5_retcode import *
+
+
+class MTHeartbeat:
+    """
+    Keep idle MTWebAPI sessions alive, busy sessions get no extra packets.
+    Session is pinged only if it has no packets in flight and no traffic for idle time.
+    """
+
+    def __init__(self, idle=60, interval=5, measure_rtt=True):
+        """
+        @param float idle        - seconds without traffic before ping
+        @param float interval    - seconds between checks of sessions
+        @param bool measure_rtt  - ping by TIME_SERVER and measure round trip time, else by PING
+
+        @return MTHeartbeat
+        """
+
+        self.m_idle = idle
+        self.m_interval = interval
+        self.m_measure_rtt = measure_rtt
+        self._apis = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        # callback(api, MTRetCode) for failed ping
+        self.OnError = None
+
+    def Register(self, api):
+        """
+        Add session
+
+        @param MTWebAPI api
+        """
+
+        with self._lock:
+            if api not in self._apis:
+                self._apis.append(api)
+
+    def Unregister(self, api):
+        """
+        Remove session
+
+        @param MTWebAPI api
+        """
+
+        with self._lock:
+            if api in self._apis:
+                self._apis.remove(api)
+
+    def Start(self):
+        """
+        Start checks in background thread
+        """
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._Loop, name='MTHeartbeat')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def Stop(self):
+        """
+        Stop checks and wait for background thread
+        """
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def Beat(self):
+        """
+        Ping idle sessions once
+
+        @return int count of pinged sessions
+        """
+
+        with self._lock:
+            apis = list(self._apis)
+        count = 0
+        for api in apis:
+            connect = api.m_connect
+            if connect is None or not connect.IsIdle(self.m_idle):
+                continue
+            ret_code = MTHeartbeat.PingSession(api, self.m_measure_rtt)
+            count += 1
+            if ret_code != MTRetCode.MT_RET_OK and self.OnError is not None:
+                self.OnError(api, ret_code)
+        return count
+
+    @staticmethod
+    def PingSession(api, measure_rtt=True):
+        """
+        Ping session, network errors are returned as retcode
+
+        @param MTWebAPI api
+        @param bool measure_rtt - ping by TIME_SERVER and measure round trip time, else by PING
+        @return MTRetCode
+        """
+
+        try:
+            if measure_rtt:
+                ret_code, rtt = api.PingTime()
+                return ret_code
+            return api.Ping()
+        except (OSError, ValueError):
+            return MTRetCode.MT_RET_ERR_NETWORK
+
+    def _Loop(self):
+        """
+        Check sessions until stop
+        """
+
+        while not self._stop.wait(self.m_interval):
+            self.Beat()
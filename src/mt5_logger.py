@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import itertools
+import logging
+import logging.handlers
+import queue
+import re
+from mt5_protocol import *
+
+
+class MTLoggerType:
+    """
+    Levels of log records
+    """
+
+    ERROR = logging.ERROR
+    WARNING = logging.WARNING
+    INFO = logging.INFO
+    DEBUG = logging.DEBUG
+
+
+class MTLogger:
+    """
+    Log of library over standard logging, logger name is 'mt5webapi'.
+    Messages are formatted only if record is written, call sites check
+    IsWriteLog first so disabled levels cost one method call.
+    Connection with own level writes to child logger 'mt5webapi.connect.<ip>_<port>'
+    with that level, records pass the usual level checks of logger and handlers,
+    so handlers of DEBUG records of connection must have DEBUG level too.
+    """
+
+    # logger of library
+    Logger = logging.getLogger('mt5webapi')
+    # every N-th packet is written at DEBUG level, connections with own DEBUG level write all
+    PACKET_SAMPLE = 100
+    # parameters which values are never written: all password parameters of protocol and auth secrets
+    SECRET_PARAMS = tuple(sorted(value for name, value in vars(MTProtocolConsts).items()
+                                 if name.startswith('WEB_PARAM_PASS'))) + (
+        MTProtocolConsts.WEB_PARAM_SRV_RAND_ANSWER,
+        MTProtocolConsts.WEB_PARAM_CLI_RAND_ANSWER,
+        MTProtocolConsts.WEB_PARAM_CRYPT_RAND,
+    )
+    _secrets = re.compile('(%s)=[^|\\r\\n]*' % '|'.join(SECRET_PARAMS), re.IGNORECASE)
+    _packets = itertools.count()
+    _listener = None
+
+    @staticmethod
+    def GetLogger(connect=None):
+        """
+        Get logger of connection
+
+        @param MTConnect connect - connection with own level, if any
+        @return logging.Logger
+        """
+
+        if connect is None or connect.m_log_level is None:
+            return MTLogger.Logger
+        name = 'connect.%s_%s' % (str(connect._ip_mt5).replace('.', '_'), connect._port_mt5)
+        logger = MTLogger.Logger.getChild(name)
+        if logger.level != connect.m_log_level:
+            logger.setLevel(connect.m_log_level)
+        return logger
+
+    @staticmethod
+    def IsWriteLog(level, connect=None):
+        """
+        Check that record of level is written
+
+        @param int level         - MTLoggerType
+        @param MTConnect connect - connection with own level, if any
+        @return bool
+        """
+
+        return MTLogger.GetLogger(connect).isEnabledFor(level)
+
+    @staticmethod
+    def Write(level, message, *args, **kwargs):
+        """
+        Write record, message is formatted with args by logging when it is written
+
+        @param int level      - MTLoggerType
+        @param string message - message with % placeholders
+        @param connect        - keyword, MTConnect of record
+        @param exc_info       - keyword, add traceback of current exception
+        """
+
+        connect = kwargs.get('connect')
+        if connect is not None:
+            message = '[%s] ' + message
+            args = (MTLogger._ConnectName(connect),) + args
+        MTLogger.GetLogger(connect).log(level, message, *args, exc_info=kwargs.get('exc_info'))
+
+    @staticmethod
+    def IsWritePacket(connect):
+        """
+        Check that packet is written at DEBUG level, packets are sampled
+        unless connection has own DEBUG level. Packet is decoded only if it is written
+
+        @param MTConnect connect
+        @return bool
+        """
+
+        if not MTLogger.IsWriteLog(MTLoggerType.DEBUG, connect):
+            return False
+        if connect.m_log_level is None or connect.m_log_level > MTLoggerType.DEBUG:
+            return next(MTLogger._packets) % MTLogger.PACKET_SAMPLE == 0
+        return True
+
+    @staticmethod
+    def Packet(connect, direction, number, data):
+        """
+        Write packet at DEBUG level, call IsWritePacket first
+
+        @param MTConnect connect
+        @param string direction - '>' for sent, '<' for received
+        @param int number       - number of packet
+        @param data             - text of packet or its UTF-16LE bytes, secrets are removed
+        """
+
+        MTLogger.Write(MTLoggerType.DEBUG, '%s %d %s', direction, number, _Redacted(data), connect=connect)
+
+    @staticmethod
+    def Redact(text):
+        """
+        Replace values of secret parameters by ***
+
+        @param string text
+        @return string
+        """
+
+        return MTLogger._secrets.sub('\\1=***', text)
+
+    @staticmethod
+    def StartQueue(*handlers):
+        """
+        Write records in background thread, request path only puts them to queue
+
+        @param handlers - logging handlers, by default handlers of logger
+        @return QueueListener
+        """
+
+        MTLogger.StopQueue()
+        logger = MTLogger.Logger
+        if not handlers:
+            handlers = tuple(logger.handlers)
+        for handler in list(logger.handlers):
+            logger.removeHandler(handler)
+        records = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(records))
+        MTLogger._listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        MTLogger._listener.start()
+        return MTLogger._listener
+
+    @staticmethod
+    def StopQueue():
+        """
+        Write queued records and stop background thread
+        """
+
+        if MTLogger._listener is None:
+            return
+        MTLogger._listener.stop()
+        logger = MTLogger.Logger
+        for handler in list(logger.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                logger.removeHandler(handler)
+        for handler in MTLogger._listener.handlers:
+            logger.addHandler(handler)
+        MTLogger._listener = None
+
+    @staticmethod
+    def _ConnectName(connect):
+        return '%s:%s' % (connect._ip_mt5, connect._port_mt5)
+
+
+class _Redacted:
+    """
+    Text with secrets removed when it is formatted
+    """
+
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        text = self.text
+        if not isinstance(text, str):
+            # packets are logged before crypt, bytes can be cut inside of char
+            text = bytes(text).decode('utf-16le', 'replace')
+        return MTLogger.Redact(text).rstrip()
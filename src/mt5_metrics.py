@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import bisect
+import threading
+
+
+class MTHistogram:
+    """
+    Histogram with fixed buckets, quantiles are estimated inside buckets
+    """
+
+    # upper bounds of buckets in seconds, the last bucket is unbounded
+    BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+    def __init__(self):
+        """
+        Create empty histogram
+
+        @return MTHistogram
+        """
+
+        self.Counts = [0] * (len(self.BUCKETS) + 1)
+        self.Count = 0
+        self.Sum = 0.0
+        self.Max = 0.0
+
+    def Observe(self, value):
+        """
+        @param float value
+        """
+
+        self.Counts[bisect.bisect_left(self.BUCKETS, value)] += 1
+        self.Count += 1
+        self.Sum += value
+        if value > self.Max:
+            self.Max = value
+
+    def Quantile(self, q):
+        """
+        @param float q - from 0 to 1
+        @return float estimated value
+        """
+
+        if self.Count == 0:
+            return 0.0
+        rank = q * self.Count
+        seen = 0
+        for index, count in enumerate(self.Counts):
+            if count and seen + count >= rank:
+                lower = self.BUCKETS[index - 1] if index > 0 else 0.0
+                upper = self.BUCKETS[index] if index < len(self.BUCKETS) else self.Max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.Max)
+            seen += count
+        return self.Max
+
+    def Snapshot(self):
+        """
+        @return dict count, sum, max, p50, p90, p99
+        """
+
+        return {'count': self.Count, 'sum': self.Sum, 'max': self.Max,
+                'p50': self.Quantile(0.5), 'p90': self.Quantile(0.9), 'p99': self.Quantile(0.99)}
+
+
+class MTMetrics:
+    """
+    Counters and latency histograms of MetaTrader 5 connections.
+    One object can be shared by many connections, it is attached
+    by MTWebAPI.EnableMetrics; without it no metrics are collected.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.Reset()
+
+    def Reset(self):
+        """
+        Drop all collected values
+        """
+
+        with self._lock:
+            # histograms by command
+            self.Commands = {}
+            # counts by (command, retcode)
+            self.RetCodes = {}
+            self.Auth = MTHistogram()
+            self.BytesSent = 0
+            self.BytesReceived = 0
+            self.FramesSent = 0
+            self.FramesReceived = 0
+            self.Pings = 0
+            self.Reconnects = 0
+
+    def ObserveCommand(self, command, seconds, ret_code):
+        """
+        Record answered command
+
+        @param string command
+        @param float seconds - time from sending to answer
+        @param int ret_code  - MTRetCode
+        """
+
+        with self._lock:
+            histogram = self.Commands.get(command)
+            if histogram is None:
+                histogram = self.Commands[command] = MTHistogram()
+            histogram.Observe(seconds)
+            key = (command, ret_code)
+            self.RetCodes[key] = self.RetCodes.get(key, 0) + 1
+
+    def ObserveAuth(self, seconds, ret_code):
+        """
+        Record authorization
+
+        @param float seconds
+        @param int ret_code - MTRetCode
+        """
+
+        with self._lock:
+            self.Auth.Observe(seconds)
+            key = ('AUTH', ret_code)
+            self.RetCodes[key] = self.RetCodes.get(key, 0) + 1
+
+    def AddSent(self, size):
+        """
+        @param int size - bytes of frame with header
+        """
+
+        with self._lock:
+            self.BytesSent += size
+            self.FramesSent += 1
+
+    def AddReceived(self, size, pings=0):
+        """
+        @param int size  - bytes of frame with header
+        @param int pings - PING frames received before the frame
+        """
+
+        with self._lock:
+            self.BytesReceived += size
+            self.FramesReceived += 1
+            self.Pings += pings
+
+    def AddReconnect(self):
+        with self._lock:
+            self.Reconnects += 1
+
+    def Snapshot(self):
+        """
+        Get copy of values
+
+        @return dict
+        """
+
+        with self._lock:
+            return {
+                'commands': dict((command, histogram.Snapshot()) for command, histogram in self.Commands.items()),
+                'retcodes': dict(('%s:%s' % key, count) for key, count in self.RetCodes.items()),
+                'auth': self.Auth.Snapshot(),
+                'bytes_sent': self.BytesSent,
+                'bytes_received': self.BytesReceived,
+                'frames_sent': self.FramesSent,
+                'frames_received': self.FramesReceived,
+                'pings': self.Pings,
+                'reconnects': self.Reconnects,
+            }
+
+    def Prometheus(self, prefix='mt5'):
+        """
+        Export values in Prometheus text format
+
+        @param string prefix - prefix of metric names
+        @return string
+        """
+
+        lines = []
+        with self._lock:
+            name = prefix + '_command_duration_seconds'
+            lines.append('# HELP %s Time from sending of command to its answer.' % name)
+            lines.append('# TYPE %s histogram' % name)
+            for command, histogram in sorted(self.Commands.items()):
+                MTMetrics._Histogram(lines, name, 'command="%s",' % command, histogram)
+            name = prefix + '_auth_duration_seconds'
+            lines.append('# HELP %s Time of authorization on server.' % name)
+            lines.append('# TYPE %s histogram' % name)
+            MTMetrics._Histogram(lines, name, '', self.Auth)
+            name = prefix + '_retcodes_total'
+            lines.append('# HELP %s Answers by command and retcode.' % name)
+            lines.append('# TYPE %s counter' % name)
+            # retcodes can be ints or texts, they are sorted as texts
+            retcodes = sorted(self.RetCodes.items(), key=lambda item: (item[0][0], str(item[0][1])))
+            for (command, ret_code), count in retcodes:
+                lines.append('%s{command="%s",retcode="%s"} %d' % (name, command, ret_code, count))
+            for suffix, value, text in (('bytes_sent_total', self.BytesSent, 'Bytes sent to server.'),
+                                        ('bytes_received_total', self.BytesReceived, 'Bytes received from server.'),
+                                        ('frames_sent_total', self.FramesSent, 'Frames sent to server.'),
+                                        ('frames_received_total', self.FramesReceived, 'Frames received from server.'),
+                                        ('pings_received_total', self.Pings, 'PING frames received from server.'),
+                                        ('reconnects_total', self.Reconnects, 'Reconnects after network failures.')):
+                name = prefix + '_' + suffix
+                lines.append('# HELP %s %s' % (name, text))
+                lines.append('# TYPE %s counter' % name)
+                lines.append('%s %d' % (name, value))
+        return '\n'.join(lines) + '\n'
+
+    @staticmethod
+    def _Histogram(lines, name, labels, histogram):
+        """
+        Add lines of one histogram, buckets are cumulative
+        """
+
+        total = 0
+        for bound, count in zip(MTHistogram.BUCKETS + ('+Inf',), histogram.Counts):
+            total += count
+            lines.append('%s_bucket{%sle="%s"} %d' % (name, labels, bound, total))
+        labels = labels.rstrip(',')
+        labels = '{%s}' % labels if labels else ''
+        lines.append('%s_sum%s %r' % (name, labels, histogram.Sum))
+        lines.append('%s_count%s %d' % (name, labels, histogram.Count))
@@ -0,0 +1,341 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import random
+import threading
+import time
+from contextlib import contextmanager
+from mt5_api import *
+from mt5_heartbeat import *
+from mt5_retcode import *
+
+
+class MTPoolSession:
+    """
+    Authenticated session of pool
+    """
+
+    # MTWebAPI connected to server
+    Api = None
+    # time of creating
+    Created = 0
+    # time of last checkin or successful heartbeat
+    LastUsed = 0
+
+    def __init__(self, api):
+        """
+        @param MTWebAPI api - connected api
+        @return MTPoolSession
+        """
+
+        self.Api = api
+        self.Created = time.time()
+        self.LastUsed = self.Created
+
+
+class MTConnectionPool:
+    """
+    Pool of authenticated MTWebAPI sessions to one MetaTrader 5 server.
+    Dead, idle and old sessions are replaced in background.
+    """
+
+    def __init__(self, ip, port, timeout, login, password, size=4, agent='XWCRM', is_crypt=False,
+                 max_idle=600, max_age=3600, check_interval=5, backoff=0.5, backoff_max=30, warmup_jitter=1.0,
+                 heartbeat=0):
+        """
+        @param ip             - ip address server
+        @param port           - port server
+        @param timeout        - timeout for request
+        @param login          - manager login
+        @param password       - manager password
+        @param size           - count of sessions in pool
+        @param agent          - name of agent
+        @param is_crypt       - need crypt connection
+        @param max_idle       - seconds session can wait in pool, 0 for no limit,
+                                successful heartbeat keeps session from idle expiry
+        @param max_age        - seconds session can live, 0 for no limit
+        @param check_interval - seconds between checks of sessions
+        @param backoff        - first delay between failed connects, seconds
+        @param backoff_max    - max delay between failed connects, seconds
+        @param warmup_jitter  - max random delay before connect, spreads logins in time
+        @param heartbeat      - seconds without traffic before session in pool is pinged, 0 to disable
+
+        @return MTConnectionPool
+        """
+
+        self.m_ip = ip
+        self.m_port = port
+        self.m_timeout = timeout
+        self.m_login = login
+        self.m_password = password
+        self.m_size = size
+        self.m_agent = agent
+        self.m_is_crypt = is_crypt
+        self.m_max_idle = max_idle
+        self.m_max_age = max_age
+        self.m_check_interval = check_interval
+        self.m_backoff = backoff
+        self.m_backoff_max = backoff_max
+        self.m_warmup_jitter = warmup_jitter
+        self.m_heartbeat = heartbeat
+        # sessions waiting in pool
+        self._idle = []
+        # checked out sessions by api
+        self._busy = {}
+        # count of sessions being connected
+        self._connecting = 0
+        # count of sessions before the first try of connect
+        self._warming = 0
+        # last connect error
+        self.LastError = MTRetCode.MT_RET_OK
+        self._cond = threading.Condition()
+        self._closed = False
+        self._checker = None
+
+    def Start(self, wait=True):
+        """
+        Connect all sessions in parallel and start background checks
+
+        @param bool wait - wait for all sessions
+        @return MTRetCode MT_RET_OK if all sessions are connected
+        """
+
+        self._closed = False
+        with self._cond:
+            self._warming += self.m_size
+        for i in range(self.m_size):
+            self._Spawn(self.m_warmup_jitter, True)
+        self._checker = threading.Thread(target=self._CheckLoop, name='MTConnectionPool-check')
+        self._checker.daemon = True
+        self._checker.start()
+        if not wait:
+            return MTRetCode.MT_RET_OK
+        with self._cond:
+            while self._warming > 0 and not self._closed:
+                self._cond.wait()
+            if len(self._idle) == self.m_size:
+                return MTRetCode.MT_RET_OK
+        return self.LastError
+
+    def Close(self):
+        """
+        Disconnect all sessions, checked out sessions are disconnected on checkin
+        """
+
+        with self._cond:
+            self._closed = True
+            sessions = self._idle
+            self._idle = []
+            self._cond.notify_all()
+        for session in sessions:
+            self._Disconnect(session)
+
+    def Checkout(self, timeout=None):
+        """
+        Get session from pool
+
+        @param float timeout - seconds to wait for free session, None to wait forever
+        @return MTWebAPI|None None if pool is closed or timeout
+        """
+
+        deadline = None if timeout is None else time.time() + timeout
+        with self._cond:
+            while True:
+                if self._closed:
+                    return None
+                if self._idle:
+                    # the last returned session is the warmest one
+                    session = self._idle.pop()
+                    self._busy[id(session.Api)] = session
+                    return session.Api
+                wait = None if deadline is None else deadline - time.time()
+                if wait is not None and wait <= 0:
+                    return None
+                self._cond.wait(wait)
+
+    def Checkin(self, api, broken=False):
+        """
+        Return session to pool
+
+        @param MTWebAPI api - session from Checkout
+        @param bool broken  - session is broken and must be replaced
+        """
+
+        with self._cond:
+            session = self._busy.pop(id(api), None)
+            if session is None:
+                return
+            if not broken and not self._closed and not self._IsExpired(session, time.time()):
+                session.LastUsed = time.time()
+                self._idle.append(session)
+                self._cond.notify()
+                return
+        # replace closed session
+        self._Disconnect(session)
+        if not self._closed:
+            self._Spawn(0)
+
+    @contextmanager
+    def Connection(self, timeout=None):
+        """
+        Checkout session for with block, session is replaced if block raises network error
+        or a request of block returns MT_RET_ERR_NETWORK
+
+        @param float timeout - seconds to wait for free session
+        @return MTWebAPI
+        """
+
+        api = self.Checkout(timeout)
+        if api is None:
+            raise RuntimeError('no free session in pool')
+        api.LastRetCode = MTRetCode.MT_RET_OK
+        broken = False
+        try:
+            yield api
+        except (OSError, ValueError):
+            broken = True
+            raise
+        finally:
+            if api.LastRetCode == MTRetCode.MT_RET_ERR_NETWORK:
+                broken = True
+            self.Checkin(api, broken)
+
+    def Stats(self):
+        """
+        Get count of sessions
+
+        @return dict idle, busy, connecting
+        """
+
+        with self._cond:
+            rtt = [session.Api.LastRtt for session in self._idle if session.Api.LastRtt is not None]
+            return {'idle': len(self._idle), 'busy': len(self._busy), 'connecting': self._connecting,
+                    'rtt': max(rtt) if rtt else None}
+
+    def _IsExpired(self, session, now):
+        """
+        Check session limits and connection
+
+        @return bool
+        """
+
+        if self.m_max_age and now - session.Created > self.m_max_age:
+            return True
+        if session.Api.m_connect is None or not session.Api.m_connect.IsAlive():
+            return True
+        return False
+
+    def _CheckLoop(self):
+        """
+        Replace dead, idle and old sessions waiting in pool, ping sessions without traffic
+        """
+
+        while True:
+            with self._cond:
+                self._cond.wait(self.m_check_interval)
+                if self._closed:
+                    return
+                now = time.time()
+                expired = []
+                for session in self._idle:
+                    if self._IsExpired(session, now) or \
+                            (self.m_max_idle and now - session.LastUsed > self.m_max_idle):
+                        expired.append(session)
+                for session in expired:
+                    self._idle.remove(session)
+                # sessions are taken from pool while they are pinged
+                pinged = []
+                if self.m_heartbeat:
+                    pinged = [session for session in self._idle if session.Api.m_connect.IsIdle(self.m_heartbeat)]
+                    for session in pinged:
+                        self._idle.remove(session)
+            for session in expired:
+                self._Disconnect(session)
+                self._Spawn(0)
+            for session in pinged:
+                ret_code = MTHeartbeat.PingSession(session.Api)
+                with self._cond:
+                    if ret_code == MTRetCode.MT_RET_OK and not self._closed:
+                        # alive session is kept, max_age still limits it
+                        session.LastUsed = time.time()
+                        self._idle.insert(0, session)
+                        self._cond.notify()
+                        continue
+                self._Disconnect(session)
+                if not self._closed:
+                    self._Spawn(0)
+
+    def _Spawn(self, jitter, warming=False):
+        """
+        Connect new session in background thread
+
+        @param float jitter - max random delay before first try
+        @param bool warming - session is a part of pool start
+        """
+
+        with self._cond:
+            self._connecting += 1
+        thread = threading.Thread(target=self._Connect, args=(jitter, warming), name='MTConnectionPool-connect')
+        thread.daemon = True
+        thread.start()
+
+    def _Connect(self, jitter, warming):
+        """
+        Connect session with exponential backoff until success or pool closing
+
+        @param float jitter - max random delay before first try
+        @param bool warming - session is a part of pool start
+        """
+
+        attempt = 0
+        try:
+            if jitter > 0:
+                time.sleep(random.uniform(0, jitter))
+            while not self._closed:
+                api = MTWebAPI(self.m_agent, self.m_is_crypt)
+                try:
+                    error_code = api.Connect(self.m_ip, self.m_port, self.m_timeout, self.m_login, self.m_password)
+                except (OSError, ValueError):
+                    error_code = MTRetCode.MT_RET_ERR_CONNECTION
+                if error_code == MTRetCode.MT_RET_OK:
+                    with self._cond:
+                        if warming:
+                            self._warming -= 1
+                            warming = False
+                        if not self._closed:
+                            self._idle.append(MTPoolSession(api))
+                            self._cond.notify_all()
+                            return
+                    self._Disconnect(MTPoolSession(api))
+                    return
+                self.LastError = error_code
+                # pool start waits for the first try only
+                if warming:
+                    with self._cond:
+                        self._warming -= 1
+                        self._cond.notify_all()
+                    warming = False
+                # if all sessions reconnect at once, full jitter spreads them in time
+                time.sleep(MTUtils.BackoffDelay(attempt, self.m_backoff, self.m_backoff_max))
+                attempt += 1
+        finally:
+            with self._cond:
+                if warming:
+                    self._warming -= 1
+                self._connecting -= 1
+                self._cond.notify_all()
+
+    @staticmethod
+    def _Disconnect(session):
+        """
+        Disconnect session, errors are ignored
+        """
+
+        try:
+            session.Api.Disconnect()
+        except (OSError, ValueError):
+            pass
@@ -5,6 +5,12 @@
 # @contact:
 
 
+import codecs
+import itertools
+import json
+import string
+
+
 class MTHeaderProtocol:
     """
     Class work with header of protocol
@@ -31,7 +37,7 @@ class MTHeaderProtocol:
             # get number of package
             self.NumberPacket = int(header_data[4:8], 16)
             # get flag
-            self.Flag = int(header_data[8], 16)
+            self.Flag = int(header_data[8:9], 16)
         except ValueError:
             return None
 
@@ -57,6 +63,265 @@ class MTHeaderProtocol:
         return result
 
 
+class MTJsonStream:
+    """
+    Incremental decoder of answer with json body, does no I/O itself.
+    Data is UTF-16LE text, the first line is answer, the rest is json.
+    Items of json array are decoded one by one as soon as they are received.
+    """
+
+    # the first line of answer, None until it is received
+    Answer = None
+    # text waiting for decode
+    _text = ''
+    # offset of the first not decoded char in text
+    _pos = 0
+    # json body is array
+    _is_array = None
+    # end of array is found
+    _done = False
+
+    def __init__(self):
+        """
+        @return MTJsonStream
+        """
+
+        self.Answer = None
+        self._decoder = codecs.getincrementaldecoder('utf-16-le')()
+        self._json = json.JSONDecoder()
+        self._text = ''
+        self._pos = 0
+        self._is_array = None
+        self._done = False
+
+    def Feed(self, data):
+        """
+        Add received data
+
+        @param bytes data - UTF-16LE data
+        """
+
+        text = self._decoder.decode(data)
+        # drop decoded text
+        if self._pos > 0:
+            self._text = self._text[self._pos:]
+            self._pos = 0
+        self._text += text
+        if self.Answer is None:
+            pos = self._text.find('\r\n')
+            if pos != -1:
+                self.Answer = self._text[:pos]
+                self._pos = pos + 2
+
+    def Records(self, final=False):
+        """
+        Get decoded records
+
+        @param bool final - all data is received
+        @return generator of json items
+        """
+
+        if self.Answer is None:
+            if final:
+                self.Answer = self._text
+                self._text = ''
+                self._pos = 0
+            return
+        text = self._text
+        pos = MTJsonStream._SkipSpaces(text, self._pos)
+        if self._is_array is None:
+            if pos == len(text):
+                self._pos = pos
+                return
+            self._is_array = text[pos] == '['
+            if self._is_array:
+                pos += 1
+            elif not final:
+                # not array, decode whole body at the end
+                self._pos = pos
+                return
+        while not self._done:
+            pos = MTJsonStream._SkipSpaces(text, pos)
+            if pos < len(text) and text[pos] == ',':
+                pos = MTJsonStream._SkipSpaces(text, pos + 1)
+            if pos == len(text):
+                break
+            if self._is_array and text[pos] == ']':
+                self._done = True
+                pos += 1
+                break
+            try:
+                item, end = self._json.raw_decode(text, pos)
+            except ValueError:
+                if final:
+                    raise
+                # item is not received completely
+                break
+            # number at the end of text can be not complete
+            if end == len(text) and not final and not isinstance(item, (dict, list)):
+                break
+            pos = end
+            self._pos = pos
+            yield item
+            if not self._is_array:
+                self._done = True
+        self._pos = pos
+        if final and not self._done and text[pos:].strip() != '':
+            raise ValueError('incorrect json body')
+
+    @staticmethod
+    def _SkipSpaces(text, pos):
+        """
+        Skip white spaces in text
+
+        @return int position of the first not space char
+        """
+
+        length = len(text)
+        while pos < length and text[pos] in ' \t\r\n':
+            pos += 1
+        return pos
+
+
+class MTFrameDecoder:
+    """
+    Incremental decoder of MetaTrader 5 protocol frames, does no I/O itself.
+    Data is received into chunks of decoder, see Buffer and Commit,
+    bodies of frames are views of the chunk, they are not copied.
+    Decoded part of chunk is never written again, so views stay valid
+    and keep their chunk alive.
+    """
+
+    # size of new chunk
+    CHUNK_SIZE = 256 * 1024
+    # min free space for receiving
+    MIN_FREE = 4096
+    # bytes of hex digits
+    HEX_DIGITS = string.hexdigits.encode('ascii')
+    # the current chunk and its view
+    _chunk = None
+    _view = None
+    # offset of the first not decoded byte in chunk
+    _start = 0
+    # offset of the end of received data in chunk
+    _end = 0
+    # count of PING frames skipped
+    PingCount = 0
+
+    def __init__(self):
+        """
+        @return MTFrameDecoder
+        """
+
+        self.Reset()
+        self.PingCount = 0
+
+    def Buffer(self, size=0):
+        """
+        Get free space of chunk to receive data into, received size is given to Commit.
+        Space is enough for the whole current frame, so frame is not split between chunks.
+
+        @param int size - min size of space
+        @return memoryview writable
+        """
+
+        need = max(size, self.Missing(), self.MIN_FREE)
+        if len(self._chunk) - self._end < need:
+            # not decoded data goes to new chunk, the old one is kept by views of its frames
+            pending = self._end - self._start
+            chunk = bytearray(max(self.CHUNK_SIZE, pending + need))
+            chunk[:pending] = self._view[self._start:self._end]
+            self._chunk = chunk
+            self._view = memoryview(chunk)
+            self._start = 0
+            self._end = pending
+        return self._view[self._end:]
+
+    def Commit(self, size):
+        """
+        Add data received into Buffer
+
+        @param int size - count of received bytes
+        """
+
+        self._end += size
+
+    def Feed(self, data):
+        """
+        Add received data to decoder, data is copied
+
+        @param bytes|bytearray|memoryview data - data from socket
+        """
+
+        size = len(data)
+        self.Buffer(size)[:size] = data
+        self.Commit(size)
+
+    def Missing(self):
+        """
+        Count of bytes needed to complete the current frame
+
+        @return int
+        """
+
+        available = self._end - self._start
+        if available < MTHeaderProtocol.HEADER_LENGTH:
+            return MTHeaderProtocol.HEADER_LENGTH - available
+        header_data = bytes(self._view[self._start:self._start + MTHeaderProtocol.HEADER_LENGTH])
+        if not MTFrameDecoder._IsHex(header_data):
+            # error is raised by NextFrame
+            return 0
+        header = MTHeaderProtocol(header_data)
+        return max(MTHeaderProtocol.HEADER_LENGTH + header.SizeBody - available, 0)
+
+    def NextFrame(self):
+        """
+        Get next complete frame, PING frames are skipped
+
+        @return MTHeaderProtocol|None header, None if frame is not complete yet
+        @return memoryview body of frame
+        """
+
+        while True:
+            start = self._start
+            if self._end - start < MTHeaderProtocol.HEADER_LENGTH:
+                return None, None
+            header_data = bytes(self._view[start:start + MTHeaderProtocol.HEADER_LENGTH])
+            # header must be hex digits only
+            if not MTFrameDecoder._IsHex(header_data):
+                raise ValueError('incorrect header data %r' % header_data)
+            header = MTHeaderProtocol(header_data)
+            end = start + MTHeaderProtocol.HEADER_LENGTH + header.SizeBody
+            if self._end < end:
+                return None, None
+            self._start = end
+            # frame without body is PING from server
+            if header.SizeBody == 0:
+                self.PingCount += 1
+                continue
+            return header, self._view[start + MTHeaderProtocol.HEADER_LENGTH:end]
+
+    def Reset(self):
+        """
+        Drop all not decoded data
+        """
+
+        self._chunk = bytearray()
+        self._view = memoryview(self._chunk)
+        self._start = 0
+        self._end = 0
+
+    @staticmethod
+    def _IsHex(data):
+        """
+        Check that data has hex digits only
+
+        @param bytes data
+        """
+
+        return not data.translate(None, MTFrameDecoder.HEX_DIGITS)
+
+
 class MTProtocolConsts:
     """
     constants for protocols
@@ -187,3 +452,149 @@ class MTProtocolConsts:
     WEB_CMD_SERVER_RESTART = "SERVER_RESTART"
     # quit
     WEB_CMD_QUIT = "QUIT"
+
+
+class MTQueryEncoder:
+    """
+    Encoder of client queries to UTF-16LE.
+    Query line is joined as text and encoded once, big body text is
+    encoded separately so it is never copied into the query line.
+    Body text can be str, bytes or file in UTF-8, it is encoded block by block.
+    """
+
+    # max size of frame body is 0xffff, even size keeps UTF-16 code units whole
+    MAX_FRAME_SIZE = 0xfffe
+    # chars of body text encoded at once
+    BODY_BLOCK = 32768
+    # prefix of the first packet of connection
+    WEB_PREFIX = MTProtocolConsts.WEB_PREFIX_WEBAPI.encode('ascii')
+
+    @staticmethod
+    def EncodeParts(command, data):
+        """
+        @param string command
+        @param dict data
+        @return list of bytes - query line and body text if any, in UTF-16LE
+        """
+
+        query, body_request = MTQueryEncoder.EncodeLine(command, data)
+        if body_request is None or body_request == '':
+            return [query]
+        if isinstance(body_request, str):
+            return [query, body_request.encode('utf-16le')]
+        return [query, b''.join(MTQueryEncoder.EncodeBody(body_request))]
+
+    @staticmethod
+    def EncodeLine(command, data):
+        """
+        @param string command
+        @param dict data
+        @return bytes query line in UTF-16LE, body text as it is in data or None
+        """
+
+        if len(data) == 0:
+            return (command + '|\r\n').encode('utf-16le'), None
+        body_request = None
+        q = [command, '|']
+        append = q.append
+        for param, value in data.items():
+            if param == MTProtocolConsts.WEB_PARAM_BODYTEXT:
+                body_request = value
+                continue
+            append(param)
+            append('=')
+            append(value)
+            append('|')
+        append('\r\n')
+        return ''.join(q).encode('utf-16le'), body_request
+
+    @staticmethod
+    def EncodeBody(body):
+        """
+        Encode body text block by block
+
+        @param body - str, bytes in UTF-8 or file with read() returning str or UTF-8 bytes
+        @return generator of bytes in UTF-16LE
+        """
+
+        block = MTQueryEncoder.BODY_BLOCK
+        if isinstance(body, str):
+            for offset in range(0, len(body), block):
+                yield body[offset:offset + block].encode('utf-16le')
+            return
+        if isinstance(body, (bytes, bytearray, memoryview)):
+            view = memoryview(body)
+            blocks = (view[offset:offset + block] for offset in range(0, len(view), block))
+        else:
+            blocks = iter(lambda: body.read(block), body.read(0))
+        # block of bytes can end inside UTF-8 char
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        for data in blocks:
+            text = data if isinstance(data, str) else decoder.decode(data)
+            if text:
+                yield text.encode('utf-16le')
+        text = decoder.decode(b'', True)
+        if text:
+            yield text.encode('utf-16le')
+
+    @staticmethod
+    def EncodeFrames(command, data, frame_size=MAX_FRAME_SIZE):
+        """
+        Split query to frames without joining of encoded blocks
+
+        @param string command
+        @param dict data
+        @param int frame_size - max size of frame body
+        @return generator of (list of bytes parts of frame body, flag) - flag is 1 for not the last frame
+        """
+
+        query, body_request = MTQueryEncoder.EncodeLine(command, data)
+        if body_request is None or body_request == '':
+            # the most of queries are one frame
+            if len(query) <= frame_size:
+                yield [query], 0
+                return
+            blocks = (query,)
+        else:
+            blocks = itertools.chain((query,), MTQueryEncoder.EncodeBody(body_request))
+        parts = []
+        size = 0
+        for block in blocks:
+            view = memoryview(block)
+            offset = 0
+            while offset < len(view):
+                if size == frame_size:
+                    # there is more data, frame is not the last
+                    yield parts, 1
+                    parts = []
+                    size = 0
+                take = min(frame_size - size, len(view) - offset)
+                parts.append(view[offset:offset + take] if take < len(view) else block)
+                size += take
+                offset += take
+        yield parts, 0
+
+    @staticmethod
+    def Encode(command, data):
+        """
+        @param string command
+        @param dict data
+        @return bytes query in UTF-16LE
+        """
+
+        parts = MTQueryEncoder.EncodeParts(command, data)
+        return parts[0] if len(parts) == 1 else b''.join(parts)
+
+    @staticmethod
+    def EncodeHeader(size, number, first_request=False, flag=0):
+        """
+        @param int size           - size of body
+        @param int number         - number of packet
+        @param bool first_request - add prefix of the first packet
+        @param int flag           - 1 for not the last part of packet
+        @return bytes header
+        """
+
+        if first_request:
+            return MTQueryEncoder.WEB_PREFIX + b'%04x%04x%x' % (size, number, flag)
+        return b'%04x%04x%x' % (size, number, flag)
@@ -140,6 +140,8 @@ class MTRetCode:
     MT_RET_ERR_NOTSUPPORTED = 12002     # Command doesn't supported
     MT_RET_ERR_DEADLOCK = 12003     # Operation canceled due possible deadlock
     MT_RET_ERR_LOCKED = 12004     # Operation on locked entity
+    # client retcodes, they are never sent by server
+    MT_RET_ERR_OUTCOME_UNKNOWN = 90001     # Connection lost after request was sent, result is unknown
 
     @staticmethod
     def GetError(error_code):
@@ -280,7 +282,9 @@ class MTRetCode:
             MTRetCode.MT_RET_ERR_NOTMAIN: 'Operation must be performed on main server',
             MTRetCode.MT_RET_ERR_NOTSUPPORTED: 'Command doesn\'t supported',
             MTRetCode.MT_RET_ERR_DEADLOCK: 'Operation canceled due possible deadlock',
-            MTRetCode.MT_RET_ERR_LOCKED: 'Operation on locked entity'
+            MTRetCode.MT_RET_ERR_LOCKED: 'Operation on locked entity',
+            #
+            MTRetCode.MT_RET_ERR_OUTCOME_UNKNOWN: 'Connection lost after request was sent, result is unknown'
         }
         if error_code == '' or error_code is None:
             return "unknown error"
@@ -0,0 +1,288 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import threading
+from mt5_api import *
+from mt5_retcode import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class MTRiskEngine:
+    """
+    Floating profit, equity and margin level of accounts recomputed locally from
+    open positions and ticks. Positions are kept in numpy arrays sorted by symbol,
+    a tick of symbol recomputes its positions at once and touches only accounts
+    holding the symbol. Margin is taken from server and is updated with positions.
+    """
+
+    # volume of position is in 1/10000 of lot
+    VOLUME_DIVIDER = 10000.0
+
+    def __init__(self):
+        """
+        @return MTRiskEngine
+        """
+
+        if numpy is None:
+            raise RuntimeError('numpy is required for risk engine')
+        self._lock = threading.RLock()
+        # position rows by login: (symbol, sign, price open, volume * contract size, rate profit, storage, profit)
+        self._positions = {}
+        # (balance, credit, margin) by login
+        self._accounts = {}
+        # index of account in arrays
+        self.Index = {}
+        self.Logins = []
+        self.Balance = numpy.zeros(0)
+        self.Credit = numpy.zeros(0)
+        self.Margin = numpy.zeros(0)
+        self.Floating = numpy.zeros(0)
+        self.Equity = numpy.zeros(0)
+        self.MarginLevel = numpy.zeros(0)
+        # last (bid, ask) by symbol
+        self._prices = {}
+        # (start, end) of positions in arrays by symbol
+        self._slices = {}
+        self._dirty = False
+        # callback(engine, logins) with accounts changed by ticks
+        self.OnAccounts = None
+        # callback(engine, logins) with accounts changed by ticks and having margin level below MarginCallLevel
+        self.OnMarginCall = None
+        self.MarginCallLevel = 100.0
+
+    def SetAccount(self, login, account):
+        """
+        Set balance, credit and margin of account
+
+        @param int login
+        @param dict account - answer of USER_ACCOUNT_GET
+        """
+
+        with self._lock:
+            self._AccountIndex(int(login))
+            self._accounts[int(login)] = (float(account.get('Balance', 0)), float(account.get('Credit', 0)),
+                                          float(account.get('Margin', 0)))
+            self._dirty = True
+
+    def SetPositions(self, login, positions):
+        """
+        Replace open positions of account
+
+        @param int login
+        @param list positions - records of POSITION_GET_PAGE
+        """
+
+        rows = []
+        for position in positions:
+            sign = 1.0 if int(position.get('Action', 0)) == 0 else -1.0
+            rows.append((position['Symbol'], sign, float(position.get('PriceOpen', 0)),
+                         int(position.get('Volume', 0)) / self.VOLUME_DIVIDER * float(position.get('ContractSize', 0)),
+                         float(position.get('RateProfit', 1)), float(position.get('Storage', 0)),
+                         float(position.get('Profit', 0))))
+        with self._lock:
+            self._AccountIndex(int(login))
+            self._positions[int(login)] = rows
+            self._dirty = True
+
+    def Load(self, api, logins, max_in_flight=64):
+        """
+        Load accounts and open positions from server
+
+        @param MTWebAPI api
+        @param list logins
+        @param int max_in_flight - max count of requests waiting for answer
+        @return dict MTRetCode by login for failed logins
+        """
+
+        failed = {}
+        accounts = {}
+        for login, ret_code, account in api.UserAccountGetBatch(logins, max_in_flight):
+            if ret_code != MTRetCode.MT_RET_OK or account is None:
+                failed[login] = ret_code
+            else:
+                accounts[login] = account
+        # the first pages of positions of all accounts are pipelined too
+        for login, ret_code, positions in api.PositionGetBatch(list(accounts), max_in_flight):
+            if ret_code != MTRetCode.MT_RET_OK:
+                failed[login] = ret_code
+                continue
+            self.SetAccount(login, accounts[login])
+            self.SetPositions(login, positions)
+        return failed
+
+    def Reload(self, api, login):
+        """
+        Load account and positions again, for example after deal of account
+
+        @return MTRetCode
+        """
+
+        return self.Load(api, [login]).get(login, MTRetCode.MT_RET_OK)
+
+    def Remove(self, login):
+        """
+        Forget account and its positions, the account stays in arrays with zero values
+        """
+
+        with self._lock:
+            self._positions.pop(int(login), None)
+            self._accounts.pop(int(login), None)
+            self._dirty = True
+
+    def Attach(self, poller):
+        """
+        Recompute accounts with changed ticks of MTTickPoller
+
+        @param MTTickPoller poller
+        """
+
+        poller.Subscribe(self._OnTicks)
+
+    def Update(self, ticks):
+        """
+        Apply new prices
+
+        @param list ticks - (symbol, bid, ask)
+        @return list of logins which values are changed
+        """
+
+        with self._lock:
+            if self._dirty:
+                self._Rebuild()
+            touched = []
+            for symbol, bid, ask in ticks:
+                self._prices[symbol] = (bid, ask)
+                bounds = self._slices.get(symbol)
+                if bounds is None:
+                    continue
+                start, end = bounds
+                profit = self._Profit(start, end, bid, ask)
+                accounts = self._account[start:end]
+                # profit change of every position is added to its account
+                numpy.add.at(self.Floating, accounts, profit - self._profit[start:end])
+                self._profit[start:end] = profit
+                touched.append(accounts)
+            if not touched:
+                return []
+            accounts = numpy.unique(numpy.concatenate(touched))
+            self._Recompute(accounts)
+            logins = [self.Logins[index] for index in accounts]
+            # accounts without margin have no margin level
+            low = accounts[(self.Margin[accounts] > 0) & (self.MarginLevel[accounts] < self.MarginCallLevel)]
+            low_logins = [self.Logins[index] for index in low]
+        if self.OnAccounts is not None:
+            self.OnAccounts(self, logins)
+        if low_logins and self.OnMarginCall is not None:
+            self.OnMarginCall(self, low_logins)
+        return logins
+
+    def Get(self, login):
+        """
+        @param int login
+        @return dict Balance, Credit, Floating, Equity, Margin, MarginLevel|None
+        """
+
+        with self._lock:
+            if self._dirty:
+                self._Rebuild()
+            index = self.Index.get(int(login))
+            if index is None:
+                return None
+            return {'Balance': float(self.Balance[index]), 'Credit': float(self.Credit[index]),
+                    'Floating': float(self.Floating[index]), 'Equity': float(self.Equity[index]),
+                    'Margin': float(self.Margin[index]), 'MarginLevel': float(self.MarginLevel[index])}
+
+    def _OnTicks(self, poller, symbols):
+        """
+        Callback of MTTickPoller
+        """
+
+        table = poller.Table
+        self.Update([(symbol, table.Bid[table.Index[symbol]], table.Ask[table.Index[symbol]]) for symbol in symbols])
+
+    def _AccountIndex(self, login):
+        """
+        Get index of account, new account is added to arrays
+        """
+
+        index = self.Index.get(login)
+        if index is not None:
+            return index
+        index = len(self.Logins)
+        self.Index[login] = index
+        self.Logins.append(login)
+        return index
+
+    def _Rebuild(self):
+        """
+        Put positions to arrays sorted by symbol and recompute all accounts
+        """
+
+        rows = []
+        accounts = []
+        for login, positions in self._positions.items():
+            rows.extend(positions)
+            accounts.extend([self.Index[login]] * len(positions))
+        order = sorted(range(len(rows)), key=lambda i: rows[i][0])
+        rows = [rows[i] for i in order]
+        self._account = numpy.array([accounts[i] for i in order], dtype='i8')
+        columns = list(zip(*rows)) or [()] * 7
+        symbols = columns[0]
+        self._sign = numpy.array(columns[1], dtype='f8')
+        self._open = numpy.array(columns[2], dtype='f8')
+        self._amount = numpy.array(columns[3], dtype='f8')
+        self._rate = numpy.array(columns[4], dtype='f8')
+        self._storage = numpy.array(columns[5], dtype='f8')
+        self._profit = numpy.array(columns[6], dtype='f8')
+        self._slices = {}
+        start = 0
+        for index in range(1, len(symbols) + 1):
+            if index == len(symbols) or symbols[index] != symbols[start]:
+                self._slices[symbols[start]] = (start, index)
+                start = index
+        # positions loaded after the last tick take profit from prices already known
+        for symbol, (start, end) in self._slices.items():
+            prices = self._prices.get(symbol)
+            if prices is not None:
+                self._profit[start:end] = self._Profit(start, end, prices[0], prices[1])
+        count = len(self.Logins)
+        base = numpy.array([self._accounts.get(login, (0.0, 0.0, 0.0)) for login in self.Logins],
+                           dtype='f8').reshape(count, 3)
+        self.Balance = base[:, 0].copy()
+        self.Credit = base[:, 1].copy()
+        self.Margin = base[:, 2].copy()
+        self.Floating = numpy.bincount(self._account, self._profit + self._storage, count).astype('f8')
+        self.Equity = numpy.zeros(count)
+        self.MarginLevel = numpy.zeros(count)
+        self._Recompute(numpy.arange(count))
+        self._dirty = False
+
+    def _Profit(self, start, end, bid, ask):
+        """
+        Profit of positions, buy is closed by bid, sell by ask
+        """
+
+        sign = self._sign[start:end]
+        close = numpy.where(sign > 0, bid, ask)
+        return sign * (close - self._open[start:end]) * self._amount[start:end] * self._rate[start:end]
+
+    def _Recompute(self, accounts):
+        """
+        Recompute equity and margin level of accounts
+
+        @param numpy.array accounts - indexes of accounts
+        """
+
+        equity = self.Balance[accounts] + self.Credit[accounts] + self.Floating[accounts]
+        self.Equity[accounts] = equity
+        margin = self.Margin[accounts]
+        self.MarginLevel[accounts] = numpy.divide(equity * 100.0, margin, out=numpy.zeros_like(equity),
+                                                  where=margin > 0)
@@ -0,0 +1,458 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import bisect
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from mt5_pool import *
+from mt5_retcode import *
+
+
+class MTRouterServer:
+    """
+    MetaTrader 5 server of router with its logins and groups
+    """
+
+    def __init__(self, name, ip, port, login, password, logins=(), groups=(), timeout=5, size=2,
+                 agent='XWCRM', is_crypt=False):
+        """
+        @param string name     - name of server
+        @param ip              - ip address server
+        @param port            - port server
+        @param login           - manager login
+        @param password        - manager password
+        @param list logins     - list of (from, to) ranges of logins, inclusive
+        @param list groups     - group masks, for example 'real\\*', '!real\\test*'
+        @param timeout         - timeout for request
+        @param int size        - count of sessions to server
+        @param agent           - name of agent
+        @param is_crypt        - need crypt connection
+
+        @return MTRouterServer
+        """
+
+        self.Name = name
+        self.Logins = [(int(first), int(last)) for first, last in logins]
+        self.Groups = list(groups)
+        self.Pool = MTConnectionPool(ip, port, timeout, login, password, size, agent, is_crypt)
+
+
+class MTRouter:
+    """
+    Client of several MetaTrader 5 servers. Commands of one login go to
+    the server of its login range, cross-server reads run on all servers
+    in parallel, so they take as long as the slowest server. Reads of group
+    take logins by USER_LOGINS on each server, then each server reads its own logins.
+
+        router = MTRouter.FromConfig({'servers': [
+            {'name': 'real1', 'ip': '10.0.0.1', 'port': 443, 'login': 1000, 'password': '...',
+             'logins': [[100000, 199999]], 'groups': ['real1\\*']},
+            ...]})
+        router.Start()
+        ret_code, user = router.UserGet(100500)
+    """
+
+    def __init__(self, servers):
+        """
+        @param list servers - list of MTRouterServer
+
+        @return MTRouter
+        """
+
+        self.Servers = list(servers)
+        self._names = dict((server.Name, server) for server in self.Servers)
+        # sorted starts of ranges and (last, server) by start
+        ranges = sorted((first, last, server) for server in self.Servers for first, last in server.Logins)
+        for (first, last, server), (next_first, next_last, next_server) in zip(ranges, ranges[1:]):
+            if next_first <= last:
+                raise ValueError('login ranges of servers %s and %s overlap' % (server.Name, next_server.Name))
+        self._starts = [first for first, last, server in ranges]
+        self._ranges = [(last, server) for first, last, server in ranges]
+        self._masks = [(MTRouter._CompileMasks(server.Groups), server) for server in self.Servers]
+        self._executor = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def FromConfig(config):
+        """
+        Create router from config, for example loaded from json
+
+        @param dict config - {'servers': [dict of MTRouterServer arguments]}
+        @return MTRouter
+        """
+
+        return MTRouter([MTRouterServer(**server) for server in config['servers']])
+
+    def Start(self, wait=True):
+        """
+        Connect sessions to all servers
+
+        @param bool wait - wait for all sessions
+        @return MTRetCode MT_RET_OK if all sessions are connected
+        """
+
+        results = list(self._Executor().map(lambda server: server.Pool.Start(wait), self.Servers))
+        for ret_code in results:
+            if ret_code != MTRetCode.MT_RET_OK:
+                return ret_code
+        return MTRetCode.MT_RET_OK
+
+    def Close(self):
+        """
+        Disconnect from all servers
+        """
+
+        for server in self.Servers:
+            server.Pool.Close()
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def Server(self, name):
+        """
+        @param string name
+        @return MTRouterServer|None
+        """
+
+        return self._names.get(name)
+
+    def ServerByLogin(self, login):
+        """
+        Find server of login
+
+        @param int login
+        @return MTRouterServer|None
+        """
+
+        login = int(login)
+        index = bisect.bisect_right(self._starts, login) - 1
+        if index < 0:
+            return None
+        last, server = self._ranges[index]
+        return server if login <= last else None
+
+    def ServerByGroup(self, group):
+        """
+        Find the first server which masks match group
+
+        @param string group
+        @return MTRouterServer|None
+        """
+
+        for masks, server in self._masks:
+            if MTRouter._MatchGroup(group, masks):
+                return server
+        return None
+
+    def Call(self, login, method, *args, **kwargs):
+        """
+        Call method of MTWebAPI on server of login, login is the first argument
+
+        @param int login
+        @param string method - name of MTWebAPI method, for example 'UserGet'
+        @return result of method, MT_RET_ERR_NOTFOUND if no server has login
+        """
+
+        server = self.ServerByLogin(login)
+        if server is None:
+            return MTRetCode.MT_RET_ERR_NOTFOUND
+        return self._Run(server, lambda api: getattr(api, method)(login, *args, **kwargs))
+
+    def UserAdd(self, login, password, group, name='', pass_investor=''):
+        """
+        Add user on server of login, or on server of group if login is 0
+
+        @return MTRetCode
+        """
+
+        server = self.ServerByLogin(login) if login and int(login) else self.ServerByGroup(group)
+        if server is None:
+            return MTRetCode.MT_RET_ERR_NOTFOUND
+        return self._Run(server, lambda api: api.UserAdd(login, password, group, name, pass_investor))
+
+    def UserGet(self, login):
+        """
+        @return MTRetCode, dict user
+        """
+
+        return self._Pair(self.Call(login, 'UserGet'))
+
+    def UserAccountGet(self, login):
+        """
+        @return MTRetCode, dict account
+        """
+
+        return self._Pair(self.Call(login, 'UserAccountGet'))
+
+    def UserDelete(self, login):
+        """
+        @return MTRetCode
+        """
+
+        return self.Call(login, 'UserDelete')
+
+    def SetUserGroup(self, login, group, leverage=''):
+        """
+        @return MTRetCode
+        """
+
+        return self.Call(login, 'SetUserGroup', group, leverage)
+
+    def SetUserBalance(self, login, balance_type, balance, comment):
+        """
+        Change balance by TRADE_BALANCE on server of login
+
+        @return MTRetCode
+        """
+
+        return self.Call(login, 'SetUserBalance', balance_type, balance, comment)
+
+    def SetUserPassword(self, login, password, pass_type='MAIN'):
+        """
+        @return MTRetCode
+        """
+
+        return self.Call(login, 'SetUserPassword', password, pass_type)
+
+    def FanOut(self, func, servers=None):
+        """
+        Run func on all servers in parallel
+
+        @param callable func - func(api, server) with session of server
+        @param list servers  - list of MTRouterServer, by default all servers
+        @return dict result of func by server name, MT_RET_ERR_NETWORK for failed servers
+        """
+
+        if servers is None:
+            servers = self.Servers
+        executor = self._Executor()
+        futures = [(server, executor.submit(self._Run, server, lambda api, server=server: func(api, server)))
+                   for server in servers]
+        return dict((server.Name, future.result()) for server, future in futures)
+
+    def FanOutLogins(self, logins, func, batch=False):
+        """
+        Run func for logins in parallel, logins are split by servers and
+        then by sessions of each server
+
+        @param list logins   - logins of any servers
+        @param callable func - func(api, login) with session of login's server
+        @param bool batch    - func(api, part) takes all logins of one session and returns results in order of part
+        @return dict result of func by login, MT_RET_ERR_NOTFOUND for logins without server
+        """
+
+        shards = {}
+        result = {}
+        for login in logins:
+            server = self.ServerByLogin(login)
+            if server is None:
+                result[login] = MTRetCode.MT_RET_ERR_NOTFOUND
+                continue
+            shards.setdefault(server.Name, []).append(login)
+        result.update(self.FanOutShards(shards, func, batch))
+        return result
+
+    def FanOutShards(self, shards, func, batch=False):
+        """
+        Run func for logins of servers in parallel, logins of each server are split by its sessions
+
+        @param dict shards   - list of logins by server name
+        @param callable func - func(api, login) with session of server
+        @param bool batch    - func(api, part) takes all logins of one session and returns results in order of part
+        @return dict result of func by login
+        """
+
+        result = {}
+        executor = self._Executor()
+        futures = []
+        for name, shard in shards.items():
+            server = self._names[name]
+            # one part per session, parts of the same server run at once
+            count = min(server.Pool.m_size, len(shard))
+            for index in range(count):
+                part = shard[index::count]
+                if batch:
+                    run = lambda api, part=part: list(func(api, part))
+                else:
+                    run = lambda api, part=part: [func(api, login) for login in part]
+                futures.append((part, executor.submit(self._Run, server, run)))
+        for part, future in futures:
+            values = future.result()
+            if isinstance(values, list):
+                result.update(zip(part, values))
+            else:
+                result.update((login, values) for login in part)
+        return result
+
+    def UserAccounts(self, logins):
+        """
+        Get trade accounts of logins from all servers
+
+        @param list logins
+        @return dict (MTRetCode, dict account) by login
+        """
+
+        return dict((login, self._Pair(value)) for login, value in
+                    self.FanOutLogins(logins, MTRouter._ReadAccounts, batch=True).items())
+
+    def Positions(self, logins, page_size=100):
+        """
+        Get open positions of logins from all servers
+
+        @param list logins
+        @param int page_size - count of positions in one request
+        @return dict (MTRetCode, list of positions) by login
+        """
+
+        positions = self.FanOutLogins(logins, lambda api, part: MTRouter._ReadPositions(api, part, page_size),
+                                      batch=True)
+        return dict((login, self._Pair(value)) for login, value in positions.items())
+
+    def GroupLogins(self, group):
+        """
+        Get logins of group from all servers in parallel
+
+        @param string group - group or group mask, for example real\\*
+        @return dict list of logins by server name, dict MTRetCode by name of failed server
+        """
+
+        logins = {}
+        failed = {}
+        for name, value in self.FanOut(lambda api, server: api.UserLogins(group)).items():
+            ret_code, shard = self._Pair(value)
+            if ret_code == MTRetCode.MT_RET_OK:
+                logins[name] = shard
+            else:
+                failed[name] = ret_code
+        return logins, failed
+
+    def GroupAccounts(self, group):
+        """
+        Get trade accounts of all logins of group, each server reads its own logins
+
+        @param string group - group or group mask
+        @return dict (MTRetCode, dict account) by login, dict MTRetCode by name of failed server
+        """
+
+        shards, failed = self.GroupLogins(group)
+        accounts = self.FanOutShards(shards, MTRouter._ReadAccounts, batch=True)
+        return dict((login, self._Pair(value)) for login, value in accounts.items()), failed
+
+    def GroupPositions(self, group, page_size=100):
+        """
+        Get open positions of all logins of group, each server reads its own logins
+
+        @param string group  - group or group mask
+        @param int page_size - count of positions in one request
+        @return dict (MTRetCode, list of positions) by login, dict MTRetCode by name of failed server
+        """
+
+        shards, failed = self.GroupLogins(group)
+        positions = self.FanOutShards(shards, lambda api, part: MTRouter._ReadPositions(api, part, page_size),
+                                      batch=True)
+        return dict((login, self._Pair(value)) for login, value in positions.items()), failed
+
+    def _Executor(self):
+        """
+        Get threads of parallel calls, they are created by the first call
+
+        @return ThreadPoolExecutor
+        """
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max(1, sum(server.Pool.m_size for server in self.Servers)),
+                                                    'MTRouter')
+            return self._executor
+
+    @staticmethod
+    def _ReadAccounts(api, part):
+        """
+        Read trade accounts of logins, requests are pipelined on the session
+
+        @return list of (MTRetCode, dict account) in order of part
+        """
+
+        return [(ret_code, account) for login, ret_code, account in api.UserAccountGetBatch(part)]
+
+    @staticmethod
+    def _ReadPositions(api, part, page_size):
+        """
+        Read open positions of logins, first pages are pipelined on the session
+
+        @return list of (MTRetCode, list of positions) in order of part
+        """
+
+        return [(ret_code, positions) for login, ret_code, positions in api.PositionGetBatch(part, page_size=page_size)]
+
+    def _Run(self, server, func):
+        """
+        Run func with session of server, broken session is replaced
+
+        @return result of func, MT_RET_ERR_NETWORK if no session or network failed
+        """
+
+        api = server.Pool.Checkout(server.Pool.m_timeout)
+        if api is None:
+            return MTRetCode.MT_RET_ERR_NETWORK
+        api.LastRetCode = MTRetCode.MT_RET_OK
+        broken = False
+        try:
+            return func(api)
+        except (OSError, ValueError):
+            broken = True
+            return MTRetCode.MT_RET_ERR_NETWORK
+        finally:
+            # batches do not raise, they return network error
+            if api.LastRetCode == MTRetCode.MT_RET_ERR_NETWORK:
+                broken = True
+            server.Pool.Checkin(api, broken)
+
+    @staticmethod
+    def _Pair(value):
+        """
+        Make (MTRetCode, value) of result, failed calls return bare retcode
+        """
+
+        if isinstance(value, tuple):
+            return value
+        return value, None
+
+    @staticmethod
+    def _CompileMasks(masks):
+        """
+        Convert group masks to list of (exclude, regex), '*' matches any text, case is ignored
+        """
+
+        result = []
+        for mask in masks:
+            for item in mask.split(','):
+                item = item.strip()
+                if not item:
+                    continue
+                exclude = item.startswith('!')
+                if exclude:
+                    item = item[1:]
+                pattern = '.*'.join(re.escape(part) for part in item.split('*'))
+                result.append((exclude, re.compile(pattern + '$', re.IGNORECASE)))
+        return result
+
+    @staticmethod
+    def _MatchGroup(group, masks):
+        """
+        Group matches if any mask matches it and no exclusion does
+        """
+
+        matched = False
+        for exclude, regex in masks:
+            if regex.match(group):
+                if exclude:
+                    return False
+                matched = True
+        return matched
@@ -0,0 +1,190 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import threading
+import time
+from mt5_columnar import *
+from mt5_logger import *
+from mt5_pool import *
+from mt5_retcode import *
+
+
+class MTAccountSnapshot:
+    """
+    Trade accounts of many logins taken at once, one numpy array per field
+    """
+
+    # MTColumns of accounts, rows of failed logins are absent
+    Columns = None
+    # MTRetCode by login for logins without account
+    Failed = None
+    # time of start of snapshot
+    Time = 0
+    # seconds of taking snapshot
+    Duration = 0
+
+    def __init__(self, columns, failed, start, duration):
+        """
+        @return MTAccountSnapshot
+        """
+
+        self.Columns = columns
+        self.Failed = failed
+        self.Time = start
+        self.Duration = duration
+
+    def __len__(self):
+        return len(self.Columns)
+
+    def Age(self):
+        """
+        @return float seconds from start of snapshot
+        """
+
+        return time.time() - self.Time
+
+
+class MTAccountSnapshotEngine:
+    """
+    Take USER_ACCOUNT_GET of many logins over several sessions.
+    Logins are split into chunks, each session pipelines requests of its chunk.
+    """
+
+    def __init__(self, sessions, workers=4, max_in_flight=64, chunk=1000, schema=None):
+        """
+        @param sessions          - MTConnectionPool or list of connected MTWebAPI
+        @param int workers       - count of sessions used at once, for list all of its sessions are used
+        @param int max_in_flight - max count of requests waiting for answer on one session
+        @param int chunk         - count of logins taken by session at once
+        @param list schema       - list of (field, type), by default MTColumnSchema.ACCOUNT
+
+        @return MTAccountSnapshotEngine
+        """
+
+        self.m_sessions = sessions
+        self.m_workers = len(sessions) if isinstance(sessions, (list, tuple)) else workers
+        self.m_max_in_flight = max_in_flight
+        self.m_chunk = chunk
+        self.m_schema = schema or MTColumnSchema.ACCOUNT
+
+    def Take(self, logins=None, group=None):
+        """
+        Take snapshot of logins or of all logins of group
+
+        @param logins - iterable of logins
+        @param string group - group or group mask, logins are got by USER_LOGINS
+        @return MTRetCode, MTAccountSnapshot|None
+        """
+
+        start = time.time()
+        if logins is None:
+            ret_code, logins = self._Logins(group)
+            if ret_code != MTRetCode.MT_RET_OK:
+                return ret_code, None
+        logins = list(logins)
+        chunks = iter([logins[i:i + self.m_chunk] for i in range(0, len(logins), self.m_chunk)])
+        builder = MTColumnBuilder(self.m_schema, len(logins))
+        failed = {}
+        lock = threading.Lock()
+        threads = []
+        for index in range(min(self.m_workers, (len(logins) + self.m_chunk - 1) // self.m_chunk)):
+            thread = threading.Thread(target=self._Work, args=(index, chunks, builder, failed, lock),
+                                      name='MTAccountSnapshot')
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        return MTRetCode.MT_RET_OK, MTAccountSnapshot(builder.Result(), failed, start, time.time() - start)
+
+    def _Logins(self, group):
+        """
+        Get logins of group by any session
+
+        @return MTRetCode, list of logins
+        """
+
+        api = self._Checkout(0)
+        if api is None:
+            return MTRetCode.MT_RET_ERR_CONNECTION, []
+        broken = False
+        try:
+            return api.UserLogins(group)
+        except (OSError, ValueError):
+            broken = True
+            return MTRetCode.MT_RET_ERR_NETWORK, []
+        finally:
+            self._Checkin(api, broken)
+
+    def _Work(self, index, chunks, builder, failed, lock):
+        """
+        Take chunks until all are taken
+
+        @param int index - index of worker, session of list
+        """
+
+        while True:
+            with lock:
+                chunk = next(chunks, None)
+            if chunk is None:
+                return
+            api = self._Checkout(index)
+            if api is None:
+                with lock:
+                    failed.update((login, MTRetCode.MT_RET_ERR_CONNECTION) for login in chunk)
+                continue
+            accounts = []
+            logins = []
+            errors = {}
+            broken = False
+            try:
+                for login, ret_code, account in api.UserAccountGetBatch(chunk, self.m_max_in_flight):
+                    if ret_code == MTRetCode.MT_RET_OK and account is not None:
+                        accounts.append(account)
+                        logins.append(login)
+                    else:
+                        errors[login] = ret_code
+                        if ret_code in (MTRetCode.MT_RET_ERR_NETWORK, MTRetCode.MT_RET_ERR_CONNECTION):
+                            broken = True
+            except Exception:
+                # logins of chunk without answer are failed, worker goes on with the next chunk
+                broken = True
+                MTAccountSnapshotEngine._LogError('snapshot worker %d failed', index)
+                answered = set(logins)
+                answered.update(errors)
+                errors.update((login, MTRetCode.MT_RET_ERROR) for login in chunk if login not in answered)
+            finally:
+                self._Checkin(api, broken)
+            with lock:
+                try:
+                    builder.Append(accounts)
+                except Exception:
+                    MTAccountSnapshotEngine._LogError('snapshot worker %d failed to store accounts', index)
+                    errors.update((login, MTRetCode.MT_RET_ERROR) for login in logins)
+                failed.update(errors)
+
+    @staticmethod
+    def _LogError(message, *args):
+        """
+        Write error with traceback of current exception
+        """
+
+        if MTLogger.IsWriteLog(MTLoggerType.ERROR):
+            MTLogger.Write(MTLoggerType.ERROR, message, *args, exc_info=True)
+
+    def _Checkout(self, index):
+        """
+        @return MTWebAPI|None
+        """
+
+        if isinstance(self.m_sessions, MTConnectionPool):
+            return self.m_sessions.Checkout(self.m_sessions.m_timeout)
+        return self.m_sessions[index]
+
+    def _Checkin(self, api, broken):
+        if isinstance(self.m_sessions, MTConnectionPool):
+            self.m_sessions.Checkin(api, broken)
@@ -0,0 +1,224 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import threading
+from array import array
+from mt5_api import *
+from mt5_logger import *
+from mt5_retcode import *
+
+
+class MTTickTable:
+    """
+    Last prices of symbols in flat arrays, symbol is an index in arrays
+    """
+
+    # range of time in milliseconds of array('q')
+    TIME_MIN = -2 ** 63
+    TIME_MAX = 2 ** 63 - 1
+
+    def __init__(self):
+        """
+        Create empty table, symbols are added by Update
+
+        @return MTTickTable
+        """
+
+        # index of symbol in arrays
+        self.Index = {}
+        self.Symbols = []
+        self.Bid = array('d')
+        self.Ask = array('d')
+        # time of tick in milliseconds
+        self.Time = array('q')
+        # count of malformed ticks skipped by Update
+        self.Skipped = 0
+
+    def Update(self, ticks):
+        """
+        Put ticks to table
+
+        @param list ticks - ticks of TICK_LAST, malformed ticks are skipped and counted in Skipped
+        @return list of indexes of changed symbols
+        """
+
+        changed = []
+        index_of = self.Index
+        bids, asks, times = self.Bid, self.Ask, self.Time
+        for tick in ticks:
+            try:
+                symbol = tick['Symbol']
+                bid = float(tick.get('Bid', 0))
+                ask = float(tick.get('Ask', 0))
+                if 'DatetimeMsc' in tick:
+                    tick_time = int(tick['DatetimeMsc'])
+                else:
+                    tick_time = int(tick.get('Datetime', 0)) * 1000
+                if not isinstance(symbol, str) or not MTTickTable.TIME_MIN <= tick_time <= MTTickTable.TIME_MAX:
+                    raise ValueError('bad tick')
+            except (KeyError, TypeError, ValueError, AttributeError):
+                self.Skipped += 1
+                continue
+            index = index_of.get(symbol)
+            if index is None:
+                index = len(self.Symbols)
+                index_of[symbol] = index
+                self.Symbols.append(symbol)
+                bids.append(bid)
+                asks.append(ask)
+                times.append(tick_time)
+                changed.append(index)
+                continue
+            if bids[index] == bid and asks[index] == ask and times[index] == tick_time:
+                continue
+            bids[index] = bid
+            asks[index] = ask
+            times[index] = tick_time
+            changed.append(index)
+        return changed
+
+    def Get(self, symbol):
+        """
+        @param string symbol
+        @return tuple (bid, ask, time msc)|None
+        """
+
+        index = self.Index.get(symbol)
+        if index is None:
+            return None
+        return self.Bid[index], self.Ask[index], self.Time[index]
+
+    def __len__(self):
+        return len(self.Symbols)
+
+
+class MTTickPoller:
+    """
+    Poll last ticks of group by TICK_LAST_GROUP, each poll requests
+    only ticks newer than the previous one by TRANS_ID
+    """
+
+    def __init__(self, api, group, symbol='*', interval=1.0):
+        """
+        @param MTWebAPI api    - connected api
+        @param string group    - group for prices
+        @param symbol          - symbol or list of symbols, masks are allowed
+        @param float interval  - seconds between polls
+
+        @return MTTickPoller
+        """
+
+        self.m_api = api
+        self.m_group = group
+        self.m_symbol = symbol
+        self.m_interval = interval
+        self.Table = MTTickTable()
+        # id of the last answer
+        self.TransId = 0
+        self.LastError = MTRetCode.MT_RET_OK
+        # list of (callback, set of symbols|None)
+        self._subscribers = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def Subscribe(self, callback, symbols=None):
+        """
+        Add callback called with poller and list of changed symbols,
+        exception of callback is logged and does not stop polling
+
+        @param callable callback  - callback(poller, symbols)
+        @param list symbols       - symbols of interest, None for all
+        """
+
+        with self._lock:
+            self._subscribers.append((callback, None if symbols is None else frozenset(symbols)))
+
+    def Unsubscribe(self, callback):
+        """
+        Remove callback
+        """
+
+        with self._lock:
+            self._subscribers = [item for item in self._subscribers if item[0] != callback]
+
+    def Poll(self):
+        """
+        Request new ticks and notify subscribers
+
+        @return MTRetCode, list of changed symbols
+        """
+
+        ret_code, ticks, trans_id = self.m_api.TickLastGroup(self.m_group, self.m_symbol, self.TransId)
+        if ret_code != MTRetCode.MT_RET_OK:
+            self.LastError = ret_code
+            return ret_code, []
+        self.TransId = trans_id
+        symbols = self.Table.Symbols
+        changed = [symbols[index] for index in self.Table.Update(ticks)]
+        if changed:
+            self._Notify(changed)
+        return ret_code, changed
+
+    def Start(self):
+        """
+        Start polling in background thread
+        """
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._PollLoop, name='MTTickPoller')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def Stop(self):
+        """
+        Stop polling and wait for background thread
+        """
+
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _PollLoop(self):
+        """
+        Poll until stop
+        """
+
+        while not self._stop.is_set():
+            try:
+                self.Poll()
+            except (OSError, ValueError):
+                self.LastError = MTRetCode.MT_RET_ERR_NETWORK
+            except Exception as error:
+                # unexpected answer does not stop polling
+                self.LastError = MTRetCode.MT_RET_ERR_DATA
+                if MTLogger.IsWriteLog(MTLoggerType.ERROR):
+                    MTLogger.Write(MTLoggerType.ERROR, 'tick poll failed: %r', error, exc_info=True)
+            self._stop.wait(self.m_interval)
+
+    def _Notify(self, changed):
+        """
+        Call subscribers with changed symbols of their interest
+        """
+
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback, symbols in subscribers:
+            if symbols is None:
+                selected = changed
+            else:
+                selected = [symbol for symbol in changed if symbol in symbols]
+                if not selected:
+                    continue
+            try:
+                callback(self, selected)
+            except Exception as error:
+                # error of one subscriber does not stop the others and polling
+                if MTLogger.IsWriteLog(MTLoggerType.ERROR):
+                    MTLogger.Write(MTLoggerType.ERROR, 'tick callback %r failed: %r', callback, error,
+                                   exc_info=True)
@@ -0,0 +1,263 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import mmap
+import os
+import struct
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class MTTickRingFormat:
+    """
+    Layout of tick ring file, all numbers are little endian.
+    Header of 64 bytes: magic, version, record size, capacity, epoch, sequence of the last record.
+    Record of 64 bytes: sequence, symbol, bid, ask, time msc.
+    Record of sequence N is in slot N % capacity, sequence of slot is 0 while the slot is written.
+    Epoch is increased by every writer opening the file, sequences start from 0 in new epoch.
+    """
+
+    MAGIC = b'MT5TICKS'
+    VERSION = 2
+    HEADER = struct.Struct('<8sIII4xQ')
+    HEADER_SIZE = 64
+    # offset of sequence of the last written record in header
+    HEAD_OFFSET = 32
+    SEQUENCE = struct.Struct('<Q')
+    # symbol is utf-8 padded by zeros
+    SYMBOL_SIZE = 32
+    PAYLOAD = struct.Struct('<32sddq')
+    RECORD_SIZE = SEQUENCE.size + PAYLOAD.size
+    # record as numpy type, the same layout as SEQUENCE and PAYLOAD
+    RECORD = numpy.dtype([('Sequence', '<u8'), ('Symbol', 'S32'), ('Bid', '<f8'), ('Ask', '<f8'),
+                          ('TimeMsc', '<i8')]) if numpy is not None else None
+
+    @staticmethod
+    def EncodeSymbol(symbol):
+        """
+        Encode symbol for record, long symbol is cut on utf-8 character boundary
+
+        @param string symbol
+        @return bytes not longer than SYMBOL_SIZE
+        """
+
+        data = symbol.encode('utf-8')
+        if len(data) <= MTTickRingFormat.SYMBOL_SIZE:
+            return data
+        # incomplete last character is dropped
+        return data[:MTTickRingFormat.SYMBOL_SIZE].decode('utf-8', 'ignore').encode('utf-8')
+
+
+class MTTickRingWriter:
+    """
+    Writer of ticks to memory mapped ring file, only one writer per file
+    """
+
+    def __init__(self, path, capacity=65536):
+        """
+        @param string path   - path of ring file, it is created or reused, it is never shrunk
+                               because readers have it mapped, ValueError is raised for other files
+        @param int capacity  - count of records in ring
+
+        @return MTTickRingWriter
+        """
+
+        fmt = MTTickRingFormat
+        self.m_capacity = capacity
+        size = fmt.HEADER_SIZE + capacity * fmt.RECORD_SIZE
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            old_size = os.fstat(fd).st_size
+            if old_size:
+                # only ring file of this format is reused
+                header = os.pread(fd, fmt.HEADER.size, 0)
+                if len(header) < fmt.HEADER.size or fmt.HEADER.unpack(header)[:3] != \
+                        (fmt.MAGIC, fmt.VERSION, fmt.RECORD_SIZE):
+                    raise ValueError('invalid tick ring file')
+            if old_size < size:
+                os.ftruncate(fd, size)
+            self._map = mmap.mmap(fd, size)
+        finally:
+            os.close(fd)
+        magic, version, record_size, old_capacity, epoch = fmt.HEADER.unpack_from(self._map, 0)
+        self.Epoch = epoch + 1 if old_size else 1
+        # readers of the old epoch see head behind their position and wait for the new epoch
+        self._sequence = 0
+        fmt.SEQUENCE.pack_into(self._map, fmt.HEAD_OFFSET, 0)
+        fmt.HEADER.pack_into(self._map, 0, fmt.MAGIC, fmt.VERSION, fmt.RECORD_SIZE, capacity, self.Epoch)
+
+    def Write(self, symbol, bid, ask, time_msc):
+        """
+        Add tick to ring, the oldest record is overwritten
+
+        @param string symbol - symbol longer than 32 bytes of utf-8 is cut
+        @param float bid
+        @param float ask
+        @param int time_msc
+        """
+
+        fmt = MTTickRingFormat
+        sequence = self._sequence + 1
+        offset = fmt.HEADER_SIZE + (sequence % self.m_capacity) * fmt.RECORD_SIZE
+        # readers see zero sequence while record is being written
+        fmt.SEQUENCE.pack_into(self._map, offset, 0)
+        fmt.PAYLOAD.pack_into(self._map, offset + fmt.SEQUENCE.size, fmt.EncodeSymbol(symbol), bid, ask,
+                              time_msc)
+        fmt.SEQUENCE.pack_into(self._map, offset, sequence)
+        fmt.SEQUENCE.pack_into(self._map, fmt.HEAD_OFFSET, sequence)
+        self._sequence = sequence
+
+    def Attach(self, poller):
+        """
+        Write changed ticks of MTTickPoller to ring
+
+        @param MTTickPoller poller
+        """
+
+        poller.Subscribe(self._OnTicks)
+
+    def Close(self):
+        self._map.close()
+
+    def _OnTicks(self, poller, symbols):
+        """
+        Callback of MTTickPoller
+        """
+
+        table = poller.Table
+        for symbol in symbols:
+            index = table.Index[symbol]
+            self.Write(symbol, table.Bid[index], table.Ask[index], table.Time[index])
+
+
+class MTTickRingReader:
+    """
+    Reader of ring file, any count of readers in other processes.
+    Reading does not lock writer, overwritten records are counted as lost.
+    Records are copied out of the ring by blocks and checked against the writer once per block.
+    """
+
+    def __init__(self, path, from_start=False):
+        """
+        @param string path      - path of ring file
+        @param bool from_start  - read records still present in ring, else only new ones
+
+        @return MTTickRingReader
+        """
+
+        if numpy is None:
+            raise RuntimeError('numpy is required for tick ring reader')
+        self.m_path = path
+        self._map = None
+        self._slots = None
+        self._Map()
+        head = self.Head()
+        # sequence of the last read record
+        self.Position = max(0, head - self.m_capacity) if from_start else head
+        # count of records overwritten before reading
+        self.Lost = 0
+        # count of restarts of writer seen by reader
+        self.Resyncs = 0
+
+    def Head(self):
+        """
+        @return int sequence of the last written record
+        """
+
+        return MTTickRingFormat.SEQUENCE.unpack_from(self._map, MTTickRingFormat.HEAD_OFFSET)[0]
+
+    def Read(self, max_count=0):
+        """
+        Read new records
+
+        @param int max_count - max count of records, 0 for all
+        @return numpy.ndarray of MTTickRingFormat.RECORD, symbols are utf-8 bytes
+        """
+
+        fmt = MTTickRingFormat
+        if self._ReadEpoch() != self.Epoch:
+            # writer is restarted, sequences start again in the new epoch
+            self._Map()
+            self.Position = 0
+            self.Resyncs += 1
+        epoch = self.Epoch
+        capacity = self.m_capacity
+        head = self.Head()
+        if head <= self.Position:
+            # nothing new, or writer is restarted and new epoch is not written yet
+            return numpy.empty(0, fmt.RECORD)
+        first = self.Position + 1
+        if head - first >= capacity - 1:
+            # writer may be rewriting the oldest slot
+            self.Lost += head - capacity + 2 - first
+            first = head - capacity + 2
+        last = head if not max_count else min(head, first + max_count - 1)
+        start = first % capacity
+        end = last % capacity + 1
+        if start < end:
+            records = self._slots[start:end].copy()
+        else:
+            records = numpy.concatenate((self._slots[start:], self._slots[:end]))
+        # the whole block is checked once: slots being written have other sequence,
+        # slots which the writer could reach while copying are dropped
+        written = self.Head()
+        if self._ReadEpoch() != epoch:
+            return numpy.empty(0, fmt.RECORD)
+        expected = numpy.arange(first, last + 1, dtype='u8')
+        valid = records['Sequence'] == expected
+        if written + 1 - capacity >= first:
+            valid &= expected > written + 1 - capacity
+        self.Position = last
+        if valid.all():
+            return records
+        self.Lost += int(len(valid) - valid.sum())
+        return records[valid]
+
+    def ReadTicks(self, max_count=0):
+        """
+        Read new records as tuples
+
+        @param int max_count - max count of records, 0 for all
+        @return list of (symbol, bid, ask, time msc)
+        """
+
+        records = self.Read(max_count)
+        return [(symbol.decode('utf-8'), bid, ask, time_msc) for symbol, bid, ask, time_msc in
+                zip(records['Symbol'].tolist(), records['Bid'].tolist(), records['Ask'].tolist(),
+                    records['TimeMsc'].tolist())]
+
+    def Close(self):
+        self._slots = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _ReadEpoch(self):
+        return MTTickRingFormat.HEADER.unpack_from(self._map, 0)[4]
+
+    def _Map(self):
+        """
+        Map file by its header, capacity can be changed by new writer
+        """
+
+        fmt = MTTickRingFormat
+        self.Close()
+        with open(self.m_path, 'rb') as file:
+            size = os.fstat(file.fileno()).st_size
+            self._map = mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ)
+        magic, version, record_size, capacity, epoch = fmt.HEADER.unpack_from(self._map, 0)
+        if magic != fmt.MAGIC or version != fmt.VERSION or record_size != fmt.RECORD_SIZE or \
+                size < fmt.HEADER_SIZE + capacity * record_size:
+            self.Close()
+            raise ValueError('invalid tick ring file')
+        self.m_capacity = capacity
+        self.Epoch = epoch
+        # slots are a view of the map, they are copied by Read
+        self._slots = numpy.frombuffer(self._map, fmt.RECORD, capacity, fmt.HEADER_SIZE)
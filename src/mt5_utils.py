@@ -33,6 +33,20 @@ class MTUtils:
         #
         return result
 
+    @staticmethod
+    def BackoffDelay(attempt, backoff, backoff_max):
+        """
+        Get delay before retry with exponential backoff and full jitter,
+        clients failed at once spread their retries over the whole delay
+        @param int attempt       - index of retry from 0
+        @param float backoff     - delay of the first retry, seconds
+        @param float backoff_max - max delay, seconds
+
+        @return float seconds
+        """
+
+        return random.uniform(0, min(backoff_max, backoff * (2 ** attempt)))
+
     @staticmethod
     def GetHashFromPassword(password, rand_code):
         """
@@ -50,10 +64,8 @@ class MTUtils:
         # MD5(passwd)
         h1.update(password.encode('utf-16le'))
         # MD5(MD5(passwd)+'WebAPI')
-        h2.update(binascii.a2b_hex(h1.hexdigest() + binascii.b2a_hex(MTProtocolConsts.WEB_API_WORD)))
-        # hash of password
-        password_hash = h2.hexdigest()
+        h2.update(h1.digest() + MTProtocolConsts.WEB_API_WORD.encode('ascii'))
         # MD5(MD5(passwd)+'WebAPI'+SRV_RAND)
-        h3.update(binascii.a2b_hex(password_hash + rand_code))
+        h3.update(h2.digest() + binascii.a2b_hex(rand_code))
         # hash for answer
         return h3.hexdigest()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+"""
+Socket of MetaTrader 5 server in memory, answers are created by handler
+when the whole packet is sent
+"""
+
+
+import socket
+from mt5_protocol import *
+from mt5_connect import *
+from mt5_crypt import *
+
+
+class FakeSocket:
+    """
+    Replacement of MTConnect._connect
+    """
+
+    def __init__(self, handler=None, frame_size=0xffff):
+        """
+        @param callable handler - handler(command, text) -> answer text|bytes|None
+        @param int frame_size   - max size of body of answer frame
+        """
+
+        self.handler = handler
+        self.frame_size = frame_size
+        # texts of received packets
+        self.packets = []
+        # (number, flag, size) of received frames
+        self.frames = []
+        # scripted reads, each recv_into returns one item
+        self.reads = []
+        self.closed = False
+        # socket is shut down, reads return no data
+        self.shut = False
+        # exception raised by send
+        self.fail_send = None
+        # read without data raises socket.timeout instead of closing
+        self.timeout = False
+        # never readable descriptor for select in MTConnect.IsAlive
+        self._pair = socket.socketpair()
+        self._decoder = MTFrameDecoder()
+        self._body = []
+        self._crypt_in = None
+        self._crypt_out = None
+
+    def SetCrypt(self, connect):
+        """
+        Crypt as server of connection after SetCryptRand
+        """
+
+        key = connect._crypt_iv[0] + connect._crypt_iv[1]
+        self._crypt_in = MTCryptOFB(key, connect._aes_out)
+        self._crypt_out = MTCryptOFB(key, connect._aes_in)
+
+    def Answer(self, number, answer, ping=False):
+        """
+        Queue answer to be read, split into frames
+
+        @param int number - number of packet
+        @param answer     - text or UTF-16LE bytes
+        @param bool ping  - put PING frame before answer
+        """
+
+        body = answer.encode('utf-16le') if isinstance(answer, str) else bytes(answer)
+        if self._crypt_out is not None:
+            body = self._crypt_out.Crypt(body)
+        parts = [body[i:i + self.frame_size] for i in range(0, len(body), self.frame_size)] or [b'']
+        data = MTQueryEncoder.EncodeHeader(0, 0) if ping else b''
+        for index, part in enumerate(parts):
+            data += MTQueryEncoder.EncodeHeader(len(part), number, False, 1 if index < len(parts) - 1 else 0) + part
+        self.reads.append(data)
+
+    def settimeout(self, timeout):
+        pass
+
+    def connect(self, address):
+        pass
+
+    def shutdown(self, how):
+        self.shut = True
+
+    def close(self):
+        self.closed = True
+        for sock in self._pair:
+            sock.close()
+
+    def fileno(self):
+        return self._pair[0].fileno()
+
+    def sendall(self, data):
+        self._Receive(bytes(data))
+
+    def sendmsg(self, buffers):
+        data = b''.join(bytes(buffer) for buffer in buffers)
+        self._Receive(data)
+        return len(data)
+
+    def recv_into(self, buffer):
+        if self.closed:
+            raise OSError(9, 'Bad file descriptor')
+        if self.shut:
+            return 0
+        if not self.reads:
+            if self.timeout:
+                raise socket.timeout('timed out')
+            return 0
+        data = self.reads.pop(0)
+        if len(data) > len(buffer):
+            self.reads.insert(0, data[len(buffer):])
+            data = data[:len(buffer)]
+        buffer[:len(data)] = data
+        return len(data)
+
+    def _Receive(self, data):
+        if self.closed:
+            raise OSError(9, 'Bad file descriptor')
+        if self.fail_send is not None:
+            raise self.fail_send
+        if data.startswith(MTProtocolConsts.WEB_PREFIX_WEBAPI.encode('ascii')):
+            data = data[len(MTProtocolConsts.WEB_PREFIX_WEBAPI):]
+        self._decoder.Feed(data)
+        while True:
+            header, body = self._decoder.NextFrame()
+            if header is None:
+                return
+            self.frames.append((header.NumberPacket, header.Flag, header.SizeBody))
+            self._body.append(bytes(body))
+            if header.Flag:
+                continue
+            body = b''.join(self._body)
+            self._body = []
+            if self._crypt_in is not None:
+                body = self._crypt_in.Crypt(body)
+            text = body.decode('utf-16le')
+            command = text.split('|', 1)[0]
+            self.packets.append(text)
+            if self.handler is not None:
+                answer = self.handler(command, text)
+                if answer is not None:
+                    self.Answer(header.NumberPacket, answer)
+
+
+def FakeConnect(handler=None, frame_size=0xffff):
+    """
+    Create MTConnect over FakeSocket
+
+    @return MTConnect, FakeSocket
+    """
+
+    connect = MTConnect('127.0.0.1', 443, 5, False)
+    connect._connect.close()
+    connect._connect = FakeSocket(handler, frame_size)
+    return connect, connect._connect
@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+from mt5_connect import *
+from mt5_retcode import *
+
+
+def test_parse_answer_line():
+    answer = 'DEAL_GET_PAGE|RETCODE=0 Done|Comment=a=b|\r\n[{"Deal":"1"}]'
+    command, param, ret_code, offset = MTConnect.ParseAnswerLine(answer)
+    assert command == 'DEAL_GET_PAGE'
+    assert param == {'RETCODE': '0 Done', 'COMMENT': 'a=b'}
+    assert ret_code == MTRetCode.MT_RET_OK
+    assert answer[offset:] == '[{"Deal":"1"}]'
+
+
+def test_parse_answer_line_without_retcode():
+    assert MTConnect.ParseAnswerLine('USER_ADD|LOGIN=1|')[2] == MTRetCode.MT_RET_ERR_DATA
+
+
+def test_parse_answer_line_with_broken_retcode():
+    command, param, ret_code, offset = MTConnect.ParseAnswerLine('USER_ADD|RETCODE=abc|')
+    assert ret_code == MTRetCode.MT_RET_ERROR
+    assert MTConnect.GetRetCode('13 Invalid') == 13
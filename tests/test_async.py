@@ -0,0 +1,197 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import asyncio
+import json
+import time
+from mt5_async import *
+from mt5_bench import *
+
+
+class FakeAsyncServer:
+    """
+    In-process asyncio server with auth of MTBenchServer,
+    answers of other commands are given by handler after its delay and can come out of order
+    """
+
+    PASSWORD = 'pw'
+
+    def __init__(self, handler, auth=True):
+        """
+        @param handler - function (command, param) -> (delay, answer) | None for no answer | 'CLOSE'
+        @param bool auth - answer auth commands
+        """
+
+        self.m_handler = handler
+        self.m_auth = auth
+        self.Requests = []
+        self._server = None
+        self._writers = []
+        self.Port = 0
+
+    async def Start(self):
+        self._server = await asyncio.start_server(self._Serve, '127.0.0.1', 0)
+        self.Port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def Close(self):
+        for writer in self._writers:
+            writer.close()
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _Serve(self, reader, writer):
+        self._writers.append(writer)
+        decoder = MTFrameDecoder()
+        first = True
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                return
+            if first and data.startswith(MTQueryEncoder.WEB_PREFIX):
+                data = data[len(MTQueryEncoder.WEB_PREFIX):]
+            first = False
+            decoder.Feed(data)
+            while True:
+                header, body = decoder.NextFrame()
+                if header is None:
+                    break
+                command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(bytes(body).decode('utf-16le'))
+                self.Requests.append(command)
+                if command == MTProtocolConsts.WEB_CMD_AUTH_START:
+                    result = (0, command + '|RETCODE=0 Done|SRV_RAND=' + '11' * 16 + '|\r\n') if self.m_auth else None
+                elif command == MTProtocolConsts.WEB_CMD_AUTH_ANSWER:
+                    answer = MTUtils.GetHashFromPassword(self.PASSWORD, param[MTProtocolConsts.WEB_PARAM_CLI_RAND])
+                    result = (0, command + '|RETCODE=0 Done|CLI_RAND_ANSWER=' + answer + '|CRYPT_RAND=' +
+                              'ab' * 256 + '|\r\n')
+                elif command == MTProtocolConsts.WEB_CMD_QUIT:
+                    result = None
+                else:
+                    result = self.m_handler(command, param)
+                if result == 'CLOSE':
+                    writer.close()
+                    return
+                if result is not None:
+                    asyncio.ensure_future(self._Answer(writer, header.NumberPacket, *result))
+
+    @staticmethod
+    async def _Answer(writer, number, delay, answer):
+        await asyncio.sleep(delay)
+        writer.write(MTBenchCapture.Frames(number, answer, 4000))
+
+
+def Run(handler, test, timeout=5, auth=True):
+    """
+    Run test coroutine with api connected to fake server
+
+    @param test - coroutine function (api, server)
+    """
+
+    async def Main():
+        server = await FakeAsyncServer(handler, auth).Start()
+        api = AsyncMTWebAPI()
+        try:
+            ret_code = await api.Connect('127.0.0.1', server.Port, timeout, '1000', FakeAsyncServer.PASSWORD)
+            return await test(api, server, ret_code)
+        finally:
+            await api.Disconnect()
+            await server.Close()
+
+    return asyncio.run(Main())
+
+
+def AccountAnswer(command, param):
+    """
+    Account of login, answer of bigger login comes earlier, every login has three positions
+    """
+
+    login = param[MTProtocolConsts.WEB_PARAM_LOGIN]
+    if command == MTProtocolConsts.WEB_CMD_POSITION_GET_PAGE:
+        count = max(0, min(int(param['TOTAL']), 3 - int(param['OFFSET'])))
+        return 0, command + '|RETCODE=0 Done|\r\n' + json.dumps([{'Login': login}] * count)
+    return 0.2 - int(login) * 0.02, command + '|RETCODE=0 Done|\r\n' + json.dumps({'Login': login, 'Balance': '1.00'})
+
+
+def test_concurrent_queries_are_pipelined():
+    async def Test(api, server, ret_code):
+        assert ret_code == MTRetCode.MT_RET_OK
+        start = time.perf_counter()
+        results = await asyncio.gather(*[api.UserAccountGet(login) for login in range(1, 9)])
+        # answers come out of order and are waited at the same time
+        assert time.perf_counter() - start < 0.5
+        assert [account['Login'] for ret_code, account in results] == [str(login) for login in range(1, 9)]
+        assert all(ret_code == MTRetCode.MT_RET_OK for ret_code, account in results)
+        batch = [item async for item in api.UserAccountGetBatch(range(1, 6), max_in_flight=2)]
+        assert [(login, account['Login']) for login, ret_code, account in batch] == [(i, str(i)) for i in range(1, 6)]
+        positions = [item async for item in api.PositionGetBatch([1, 2], page_size=2)]
+        assert [(login, len(records)) for login, ret_code, records in positions] == [(1, 3), (2, 3)]
+        assert not api.m_connect._in_flight
+
+    Run(AccountAnswer, Test)
+
+
+def test_late_answer_is_timeout_and_keeps_connection():
+    answers = {'TIME_SERVER': None, 'USER_DELETE': (0, 'USER_DELETE|RETCODE=0 Done|\r\n')}
+
+    async def Test(api, server, ret_code):
+        ret_code, rtt = await api.PingTime()
+        assert ret_code == MTRetCode.MT_RET_ERR_TIMEOUT and api.LastRtt is None
+        # late answer of released packet is dropped, the connection is still used
+        assert await api.UserDelete(1) == MTRetCode.MT_RET_OK
+
+    Run(lambda command, param: answers[command], Test, timeout=0.3)
+
+
+def test_auth_timeout():
+    async def Test(api, server, ret_code):
+        assert ret_code == MTRetCode.MT_RET_ERR_TIMEOUT
+        assert not api.IsConnected()
+
+    Run(None, Test, timeout=0.3, auth=False)
+
+
+def test_disconnect_wakes_all_requests():
+    def Handler(command, param):
+        if command == 'USER_DELETE':
+            return 'CLOSE'
+        return None
+
+    async def Test(api, server, ret_code):
+        waiting = asyncio.ensure_future(api.UserGet(1))
+        await asyncio.sleep(0.05)
+        results = await asyncio.gather(waiting, api.UserDelete(1))
+        assert results == [(MTRetCode.MT_RET_ERR_NETWORK, None), MTRetCode.MT_RET_ERR_NETWORK]
+        # broken connection does not send
+        assert await api.UserDelete(1) == MTRetCode.MT_RET_ERR_NETWORK
+        # packet not in flight has no answer
+        assert await api.m_connect.Read(number=999) is None
+
+    Run(Handler, Test)
+
+
+def test_pages_and_batch():
+    def Handler(command, param):
+        if command == 'DEAL_GET_TOTAL':
+            return 0, command + '|RETCODE=0 Done|TOTAL=250|\r\n'
+        if command == 'DEAL_GET_PAGE':
+            count = min(int(param['TOTAL']), 250 - int(param['OFFSET']))
+            return 0, MTBenchCapture.DealPageAnswer(count)
+        if command == 'USER_ADD':
+            return 0, command + ('|RETCODE=0 Done|\r\n' if param['GROUP'] == 'demo' else '|RETCODE=3 Invalid|\r\n')
+
+    async def Test(api, server, ret_code):
+        reader = api.IterDeals(100500, 0, 1)
+        deals = [deal async for deal in reader]
+        assert len(deals) == 250 and reader.RetCode == MTRetCode.MT_RET_OK
+        ret_code, columns = await api.IterDeals(100500, 0, 1, page_size=64).Columns()
+        assert ret_code == MTRetCode.MT_RET_OK and len(columns['Deal']) == 250
+        rows = [('1', 'pw', 'demo'), ('2', 'pw', 'real'), ('', 'pw', 'demo')]
+        result = [ret_code async for row, ret_code in api.UserAddBatch(rows)]
+        assert result == [MTRetCode.MT_RET_OK, MTRetCode.MT_RET_ERR_PARAMS, MTRetCode.MT_RET_ERR_PARAMS]
+        assert not api.m_connect._in_flight
+
+    Run(Handler, Test)
@@ -0,0 +1,42 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+from mt5_api import *
+from fake_socket import *
+
+
+def BatchAPI():
+    connect, sock = FakeConnect(lambda command, text: command + '|RETCODE=0 Done|\r\n')
+    api = MTWebAPI()
+    api.m_connect = connect
+    return api, sock
+
+
+def test_broken_rows_fail_alone():
+    api, sock = BatchAPI()
+    rows = [
+        {'login': '1', 'password': 'pw', 'group': 'demo'},
+        {'login': '2', 'passwd': 'pw', 'group': 'demo'},
+        ('3', 'pw'),
+        ('4', 'pw', 'demo', 'Name', 'inv', 'extra'),
+        (5, 'pw', 'demo'),
+        ('6', 'pw', 'demo'),
+    ]
+    result = [ret_code for row, ret_code in api.UserAddBatch(rows)]
+    assert result == [MTRetCode.MT_RET_OK] + [MTRetCode.MT_RET_ERR_PARAMS] * 4 + [MTRetCode.MT_RET_OK]
+    assert len(sock.packets) == 2
+    assert api.m_connect._in_flight == set()
+
+
+def test_closed_batch_releases_numbers():
+    api, sock = BatchAPI()
+    rows = [('%d' % login, 'pw', 'demo') for login in range(1, 101)]
+    batch = api.UserAddBatch(rows, 16)
+    assert next(batch)[1] == MTRetCode.MT_RET_OK
+    assert len(api.m_connect._in_flight) == 15
+    batch.close()
+    assert api.m_connect._in_flight == set()
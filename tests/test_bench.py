@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import json
+from mt5_bench import *
+
+
+def test_report_marks_regressions():
+    bench = MTBench(0.001, repeat=2)
+    bench.Run('noop', lambda: None, 10)
+    ops = bench.Results['noop']['ops']
+    report, regressions = bench.Report({'noop': {'ops': ops * 2}}, 0.1)
+    assert regressions == ['noop'] and 'REGRESSION' in report
+    report, regressions = bench.Report({'noop': {'ops': ops}}, 0.1)
+    assert regressions == []
+    assert bench.Run('other', lambda: None) is not None
+    assert MTBench(0.001, 'parse.').Run('other', lambda: None) is None
+
+
+def test_main_compares_with_baseline(tmp_path):
+    output = str(tmp_path / 'result.json')
+    argv = ['--min-time', '0.001', '--repeat', '1', '--filter', 'header.', '--output', output]
+    assert Main(argv) == 0
+    with open(output) as file:
+        results = json.load(file)
+    assert results['results'] and all(name.startswith('header.') for name in results['results'])
+    for result in results['results'].values():
+        result['ops'] *= 100
+    with open(output, 'w') as file:
+        json.dump(results, file)
+    assert Main(argv[:-2] + ['--baseline', output]) == 1
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import logging
+import struct
+from mt5_api import *
+from fake_socket import *
+
+RECORD = struct.Struct('<qdd')
+
+
+def Payload(count):
+    return b''.join(RECORD.pack(i, i * 0.5, i * 0.25) for i in range(count))
+
+
+def BinaryAPI(line, payload, frame_size=0xffff):
+    """
+    @return MTWebAPI, FakeSocket answering CHART_GET with line and payload
+    """
+
+    answer = line.encode('utf-16le') + payload
+    connect, sock = FakeConnect(lambda command, text: answer, frame_size)
+    api = MTWebAPI()
+    api.m_connect = connect
+    return api, sock
+
+
+def test_binary_answer_of_many_frames():
+    payload = Payload(20000)
+    line = 'CHART_GET|RETCODE=0 Done|SIZE=%d|\r\n' % len(payload)
+    api, sock = BinaryAPI(line, payload)
+    ret_code, body = api._GetBinary('CHART_GET', {})
+    assert ret_code == MTRetCode.MT_RET_OK
+    assert isinstance(body, memoryview)
+    # body is a view of the joined frames right after the line
+    assert body.obj is not None and len(body.obj) == len(line) * 2 + len(payload)
+    assert bytes(body.obj[len(line) * 2:]) == payload
+    assert len(body) == len(payload) and bytes(body) == payload
+    assert RECORD.unpack_from(body, RECORD.size * 12345) == (12345, 12345 * 0.5, 12345 * 0.25)
+
+
+def test_binary_answer_of_one_frame_is_not_copied():
+    payload = Payload(10)
+    connect, sock = FakeConnect()
+    sock.Answer(1, 'CHART_GET|RETCODE=0 Done|\r\n'.encode('utf-16le') + payload)
+    connect._in_flight.add(1)
+    answer = connect.Read(True, True, False, 1)
+    assert MTConnect.GetBinaryLine(answer) == 'CHART_GET|RETCODE=0 Done|'
+    assert bytes(connect.GetBinary(answer)) == payload
+    # one frame is a view of the chunk the socket was read into, nothing is copied
+    assert answer.obj is connect._decoder._chunk
+    header = len(MTQueryEncoder.EncodeHeader(0, 0))
+    assert bytes(answer.obj[header:header + len(answer)]) == bytes(answer)
+
+
+def test_line_end_split_between_frames_and_reads():
+    payload = Payload(100)
+    line = 'CHART_GET|RETCODE=0 Done|\r\n'
+    # the first frame ends after \r\x00 of the line
+    api, sock = BinaryAPI(line, payload, len(line) * 2 - 2)
+    sock.handler = None
+    sock.Answer(1, line.encode('utf-16le') + payload)
+    data = sock.reads.pop()
+    # socket gives the first frame in two reads, the cut is between \r\x00 and \n\x00
+    cut = len(MTQueryEncoder.EncodeHeader(0, 0)) + len(line) * 2 - 2
+    sock.reads.extend([data[:cut - 3], data[cut - 3:cut], data[cut:]])
+    api.m_connect._in_flight.add(1)
+    answer = api.m_connect.Read(True, True, False, 1)
+    assert MTConnect.GetBinaryLine(answer) == line[:-2]
+    assert bytes(api.m_connect.GetBinary(answer)) == payload
+
+
+def test_line_end_across_prefix_of_view():
+    # \r\x00 is the last char of the first searched prefix, \n\x00 is after it
+    line = 'CHART_GET|RETCODE=0 Done|COMMENT=%s|\r\n'
+    line = line % ('x' * (513 - len(line % '')))
+    data = memoryview(line.encode('utf-16le') + Payload(100))
+    assert MTConnect.FindLineEnd(data) == 1022
+    assert MTConnect.GetBinaryLine(data) == line[:-2]
+
+
+def test_binary_answer_line_is_logged():
+    records = []
+    handler = logging.Handler()
+    handler.emit = lambda record: records.append(record.getMessage())
+    MTLogger.Logger.addHandler(handler)
+    try:
+        api, sock = BinaryAPI('CHART_GET|RETCODE=0 Done|\r\n', Payload(1000))
+        api.m_connect.m_log_level = MTLoggerType.DEBUG
+        assert api._GetBinary('CHART_GET', {})[0] == MTRetCode.MT_RET_OK
+    finally:
+        MTLogger.Logger.removeHandler(handler)
+    assert records[-1] == '[127.0.0.1:443] < 1 CHART_GET|RETCODE=0 Done|'
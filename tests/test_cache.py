@@ -0,0 +1,184 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import json
+import mt5_cache
+from mt5_api import *
+from fake_socket import *
+
+
+def CacheAPI(update_answer):
+    """
+    @return MTWebAPI with user cache, list of sent commands
+    """
+
+    commands = []
+
+    def Handler(command, text):
+        commands.append(command)
+        if command == MTProtocolConsts.WEB_CMD_USER_GET:
+            return command + '|RETCODE=0 Done|\r\n' + json.dumps({'Login': '1', 'Group': 'demo'})
+        return command + update_answer
+
+    connect, sock = FakeConnect(Handler)
+    api = MTWebAPI()
+    api.m_connect = connect
+    api.EnableUserCache(10, 0)
+    return api, commands
+
+
+def test_cached_user_is_copied():
+    api, commands = CacheAPI('|RETCODE=0 Done|\r\n')
+    ret_code, user = api.UserGet(1)
+    user['Group'] = 'changed'
+    assert api.UserGet(1) == (MTRetCode.MT_RET_OK, {'Login': '1', 'Group': 'demo'})
+    assert commands == [MTProtocolConsts.WEB_CMD_USER_GET]
+    assert api.m_user_cache.Users.Hits == 1
+
+
+def test_failed_change_evicts_user():
+    api, commands = CacheAPI('|RETCODE=3 Invalid parameters|\r\n')
+    api.UserGet(1)
+    assert api.SetUserGroup('1', 'real') == MTRetCode.MT_RET_ERR_PARAMS
+    api.UserGet(1)
+    assert commands == [MTProtocolConsts.WEB_CMD_USER_GET, MTProtocolConsts.WEB_CMD_USER_UPDATE,
+                        MTProtocolConsts.WEB_CMD_USER_GET]
+
+
+def test_failed_batch_rows_evict_users():
+    answers = {'1': 'USER_UPDATE|RETCODE=0 Done|\r\n', '2': 'USER_ADD|RETCODE=3 Invalid parameters|\r\n'}
+    commands = []
+
+    def Handler(command, text):
+        command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(text)
+        commands.append(command)
+        if command == MTProtocolConsts.WEB_CMD_USER_GET:
+            return command + '|RETCODE=0 Done|\r\n' + json.dumps({'Login': param['LOGIN']})
+        # login 3 gets no answer, the connection is lost
+        return answers.get(param['LOGIN'])
+
+    connect, sock = FakeConnect(Handler)
+    api = MTWebAPI()
+    api.m_connect = connect
+    api.EnableUserCache(10, 0)
+    for login in ('1', '2', '3', '4'):
+        api.UserGet(login)
+    rows = [(login, 'pw', 'demo') for login in ('1', '2', '3', '4')]
+    result = [ret_code for row, ret_code in api.UserAddBatch(rows)]
+    assert result == [MTRetCode.MT_RET_ERROR, MTRetCode.MT_RET_ERR_PARAMS, MTRetCode.MT_RET_ERR_NETWORK,
+                      MTRetCode.MT_RET_ERR_NETWORK]
+    assert len(api.m_user_cache.Users) == 0
+    # packet failed while being sent
+    connect, sock = FakeConnect(Handler)
+    api.m_connect = connect
+    api.UserGet('5')
+    sock.fail_send = ConnectionResetError()
+    assert list(api.UserAddBatch([('5', 'pw', 'demo')])) == [(('5', 'pw', 'demo'), MTRetCode.MT_RET_ERR_CONNECTION)]
+    assert len(api.m_user_cache.Users) == 0
+
+
+class FakeClock:
+    """
+    Replacement of time module in mt5_cache
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+SYMBOLS = [{'Symbol': 'EURUSD', 'Path': 'Forex\\Majors\\EURUSD', 'Digits': '5'},
+           {'Symbol': 'XAUUSD', 'Path': 'Metals\\XAUUSD', 'Digits': '2'}]
+
+
+def SymbolAPI(monkeypatch):
+    """
+    @return MTWebAPI with symbol cache, list of sent commands, FakeClock
+    """
+
+    clock = FakeClock()
+    monkeypatch.setattr(mt5_cache, 'time', clock)
+    commands = []
+
+    def Handler(command, text):
+        commands.append(command)
+        command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(text)
+        if command == MTProtocolConsts.WEB_CMD_SYMBOL_TOTAL:
+            return command + '|RETCODE=0 Done|TOTAL=%d|\r\n' % len(SYMBOLS)
+        if command == MTProtocolConsts.WEB_CMD_SYMBOL_NEXT:
+            return command + '|RETCODE=0 Done|\r\n' + json.dumps(SYMBOLS[int(param['INDEX'])])
+        symbol = dict([symbol for symbol in SYMBOLS if symbol['Symbol'] == param['SYMBOL']][0],
+                      Group=param.get('GROUP', ''))
+        return command + '|RETCODE=0 Done|\r\n' + json.dumps(symbol)
+
+    connect, sock = FakeConnect(Handler)
+    api = MTWebAPI()
+    api.m_connect = connect
+    return MTSymbolCache(api, ttl=60), commands, clock
+
+
+def test_cached_symbols_are_copied(monkeypatch):
+    cache, commands, clock = SymbolAPI(monkeypatch)
+    ret_code, symbol = cache.Get('EURUSD')
+    symbol['Digits'] = 'changed'
+    assert cache.Get('EURUSD')[1]['Digits'] == '5'
+    ret_code, symbol = cache.GetGroup('EURUSD', 'demo')
+    symbol['Digits'] = 'changed'
+    assert cache.GetGroup('EURUSD', 'demo')[1]['Digits'] == '5'
+    ret_code, symbols = cache.GetByPath('Forex\\')
+    symbols[0]['Digits'] = 'changed'
+    assert cache.GetByPath('Forex\\')[1][0]['Digits'] == '5'
+    # updated symbol is copied too
+    symbol = dict(SYMBOLS[1])
+    cache.Update(symbol)
+    symbol['Digits'] = 'changed'
+    assert cache.Get('XAUUSD')[1]['Digits'] == '2'
+    assert commands == ['SYMBOL_GET', 'SYMBOL_GET_GROUP', 'SYMBOL_TOTAL', 'SYMBOL_NEXT', 'SYMBOL_NEXT']
+
+
+def test_symbol_expires_after_ttl(monkeypatch):
+    cache, commands, clock = SymbolAPI(monkeypatch)
+    assert cache.Load() == MTRetCode.MT_RET_OK
+    cache.Get('EURUSD')
+    cache.GetGroup('EURUSD', 'demo')
+    cache.GetByPath('Metals\\')
+    assert commands.count('SYMBOL_GET') == 0 and commands.count('SYMBOL_GET_GROUP') == 1
+    clock.now += 60
+    cache.Get('EURUSD')
+    cache.GetGroup('EURUSD', 'demo')
+    cache.GetByPath('Metals\\')
+    assert commands.count('SYMBOL_GET') == 0 and commands.count('SYMBOL_TOTAL') == 1
+    clock.now += 1
+    cache.Get('EURUSD')
+    cache.GetGroup('EURUSD', 'demo')
+    cache.GetByPath('Metals\\')
+    assert commands.count('SYMBOL_GET') == 1 and commands.count('SYMBOL_GET_GROUP') == 2
+    assert commands.count('SYMBOL_TOTAL') == 2
+    # invalidated symbol is old at once, without ttl symbol never expires
+    cache.Invalidate('XAUUSD')
+    cache.Get('XAUUSD')
+    assert commands.count('SYMBOL_GET') == 2
+    cache.m_ttl = 0
+    clock.now += 10 ** 6
+    cache.Get('XAUUSD')
+    assert commands.count('SYMBOL_GET') == 2
+
+
+def test_user_expires_after_max_age(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(mt5_cache, 'time', clock)
+    api, commands = CacheAPI('|RETCODE=0 Done|\r\n')
+    api.m_user_cache.Users.m_max_age = 30
+    api.UserGet(1)
+    clock.now += 30
+    api.UserGet(1)
+    assert commands.count(MTProtocolConsts.WEB_CMD_USER_GET) == 1
+    clock.now += 1
+    api.UserGet(1)
+    assert commands.count(MTProtocolConsts.WEB_CMD_USER_GET) == 2
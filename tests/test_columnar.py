@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import json
+import pytest
+from mt5_api import *
+from fake_socket import *
+
+
+SCHEMA = [('Position', 'u8'), ('Symbol', MTColumnSchema.CATEGORY), ('Profit', 'f8')]
+
+
+def test_records_go_to_columns():
+    builder = MTColumnBuilder(SCHEMA, 1)
+    builder.Append([{'Position': '5', 'Symbol': 'EURUSD', 'Profit': '1.25'}])
+    builder.Append([{'Position': 6, 'Symbol': 'USDJPY', 'Profit': 2}, {'Position': '7', 'Symbol': 'EURUSD'}])
+    columns = builder.Result()
+    assert columns['Position'].tolist() == [5, 6, 7]
+    assert columns['Profit'].tolist() == [1.25, 2.0, 0.0]
+    assert columns.Decode('Symbol').tolist() == ['EURUSD', 'USDJPY', 'EURUSD']
+    assert columns['Position'].dtype == numpy.uint64
+    with pytest.raises(ValueError):
+        builder.Append([{'Position': 'x', 'Symbol': 'EURUSD', 'Profit': '1'}])
+
+
+def test_unknown_command_has_no_schema():
+    with pytest.raises(ValueError):
+        MTColumnSchema.ForCommand('USER_GET')
+    with pytest.raises(ValueError):
+        MTColumnBuilder(None)
+
+
+def PositionAPI(price):
+    """
+    @return MTWebAPI with 250 positions of login 1
+    """
+
+    def Handler(command, text):
+        param = MTConnect.ParseAnswerLine(text)[1]
+        if command == MTProtocolConsts.WEB_CMD_POSITION_GET_TOTAL:
+            return command + '|RETCODE=0 Done|TOTAL=250|\r\n'
+        offset = int(param['OFFSET'])
+        count = max(0, min(int(param['TOTAL']), 250 - offset))
+        return command + '|RETCODE=0 Done|\r\n' + json.dumps([
+            {'Position': str(offset + i), 'Symbol': 'EURUSD', 'PriceOpen': price} for i in range(count)])
+
+    connect, sock = FakeConnect(Handler)
+    api = MTWebAPI()
+    api.m_connect = connect
+    return api
+
+
+def test_pages_go_to_columns():
+    api = PositionAPI('1.1')
+    ret_code, columns = api.IterPositions(1, 100).Columns()
+    assert ret_code == MTRetCode.MT_RET_OK
+    assert columns['Position'].tolist() == list(range(250))
+    assert columns.Decode('Symbol').tolist() == ['EURUSD'] * 250
+    assert columns['PriceOpen'].tolist() == [1.1] * 250
+    assert api.m_connect._in_flight == set()
+
+
+def test_bad_page_stops_columns():
+    api = PositionAPI('bad')
+    ret_code, columns = api.IterPositions(1, 100).Columns()
+    assert ret_code == MTRetCode.MT_RET_ERR_DATA
+    assert len(columns) == 0
+    assert api.m_connect._in_flight == set()
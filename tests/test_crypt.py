@@ -0,0 +1,49 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import pytest
+import mt5_crypt
+from mt5_crypt import *
+
+
+# NIST SP 800-38A, F.4.5 OFB-AES256.Encrypt
+KEY = bytes.fromhex('603deb1015ca71be2b73aef0857d77811f352c073b6108d72d9810a30914dff4')
+IV = bytes.fromhex('000102030405060708090a0b0c0d0e0f')
+PLAIN = bytes.fromhex('6bc1bee22e409f96e93d7e117393172a' 'ae2d8a571e03ac9c9eb76fac45af8e51'
+                      '30c81c46a35ce411e5fbc1191a0a52ef' 'f69f2445df4f9b17ad2b417be66c3710')
+CIPHER = bytes.fromhex('dc7e84bfda79164b7ecd8486985d3860' '4febdc6740d20b3ac88f6ad82a4fb08d'
+                       '71ab47a086e86eedf39d1c5bba97c408' '0126141d67f37be8538f5a8be740e484')
+
+
+@pytest.fixture(params=['c', 'python'])
+def implementation(request, monkeypatch):
+    if request.param == 'c':
+        if mt5_crypt.Cipher is None:
+            pytest.skip('cryptography is not installed')
+    else:
+        monkeypatch.setattr(mt5_crypt, 'Cipher', None)
+        # keystream is refilled inside of the test data
+        monkeypatch.setattr(MTCryptOFB, 'KEYSTREAM_BLOCKS', 2)
+    return request.param
+
+
+def test_aes256_block():
+    # FIPS 197, C.3 AES-256
+    aes = MTAES256(bytes(range(32)))
+    assert aes.EncryptBlock(bytes.fromhex('00112233445566778899aabbccddeeff')) == \
+        bytes.fromhex('8ea2b7ca516745bfeafc49904b496089')
+
+
+def test_ofb_vectors(implementation):
+    assert MTCryptOFB(KEY, IV).Crypt(PLAIN) == CIPHER
+    assert MTCryptOFB(KEY, IV).Crypt(CIPHER) == PLAIN
+
+
+def test_ofb_state_continues_between_packets(implementation):
+    crypt = MTCryptOFB(KEY, IV)
+    parts = [crypt.Crypt(PLAIN[start:end]) for start, end in ((0, 5), (5, 5), (5, 37), (37, 64))]
+    assert b''.join(parts) == CIPHER
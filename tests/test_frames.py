@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import io
+import pytest
+from mt5_api import *
+from fake_socket import *
+
+
+def Frames(command, data, frame_size=MTQueryEncoder.MAX_FRAME_SIZE):
+    """
+    Encode query to frames with headers and decode them back
+
+    @return list of (flag, size), string text of query
+    """
+
+    wire = b''.join(MTQueryEncoder.EncodeHeader(sum(len(part) for part in parts), 7, False, flag) +
+                    b''.join(bytes(part) for part in parts)
+                    for parts, flag in MTQueryEncoder.EncodeFrames(command, data, frame_size))
+    decoder = MTFrameDecoder()
+    frames = []
+    bodies = []
+    # feed by odd chunks to cross headers and chars
+    for offset in range(0, len(wire), 1001):
+        decoder.Feed(wire[offset:offset + 1001])
+        while True:
+            header, body = decoder.NextFrame()
+            if header is None:
+                break
+            assert header.NumberPacket == 7
+            frames.append((header.Flag, header.SizeBody))
+            bodies.append(bytes(body))
+    return frames, b''.join(bodies).decode('utf-16le')
+
+
+def test_frame_views_stay_valid():
+    decoder = MTFrameDecoder()
+    bodies = [bytes([i]) * (1000 + i * 577) for i in range(100)]
+    wire = b''.join(MTQueryEncoder.EncodeHeader(len(body), 1) + body for body in bodies)
+    views = []
+    for offset in range(0, len(wire), 5000):
+        data = wire[offset:offset + 5000]
+        decoder.Buffer()[:len(data)] = data
+        decoder.Commit(len(data))
+        while True:
+            header, body = decoder.NextFrame()
+            if header is None:
+                break
+            views.append(body)
+    # frames are views of a few chunks, later reads do not change them
+    assert [bytes(view) for view in views] == bodies
+    assert len(set(id(view.obj) for view in views)) < len(views) // 5
+
+
+def test_header_must_be_hex_digits():
+    for header in (b'00_400010', b' 00400010', b'0040001\n0', b'+00400010'):
+        decoder = MTFrameDecoder()
+        decoder.Feed(header + b'abcd')
+        with pytest.raises(ValueError):
+            decoder.NextFrame()
+    assert MTFrameDecoder._IsHex(b'0123456789abcdefABCDEF')
+
+
+def test_frames_round_trip():
+    frames, text = Frames('USER_ADD', {'LOGIN': '1', 'NAME': 'Jöhn'})
+    assert frames == [(0, len(text) * 2)]
+    assert text == 'USER_ADD|LOGIN=1|NAME=Jöhn|\r\n'
+
+
+def test_frames_of_big_body():
+    body = 'x€' * 100000
+    for value in (body, body.encode('utf-8'), io.BytesIO(body.encode('utf-8')), io.StringIO(body)):
+        frames, text = Frames('MAIL_SEND', {'TO': '1', 'BODY_TEXT': value}, 1000)
+        assert text == 'MAIL_SEND|TO=1|\r\n' + body
+        assert [flag for flag, size in frames] == [1] * (len(frames) - 1) + [0]
+        assert all(size == 1000 for flag, size in frames[:-1])
+
+
+def test_mail_send_streams_body():
+    connect, sock = FakeConnect(lambda command, text: command + '|RETCODE=0 Done|\r\n')
+    api = MTWebAPI()
+    api.m_connect = connect
+    body = 'мир' * 50000
+    assert api.MailSend([1, 2], 'hello', io.BytesIO(body.encode('utf-8'))) == MTRetCode.MT_RET_OK
+    assert sock.packets == ['MAIL_SEND|TO=1,2|SUBJECT=hello|\r\n' + body]
+    assert len(sock.frames) == 5
+    assert api.NewsSend('news', body) == MTRetCode.MT_RET_OK
+    assert sock.packets[1].startswith('NEWS_SEND|SUBJECT=news|CATEGORY=|LANGUAGE=0|PRIORITY=0|\r\n')
+
+
+def test_broken_body_drops_connection():
+    connect, sock = FakeConnect(lambda command, text: command + '|RETCODE=0 Done|\r\n')
+    api = MTWebAPI()
+    api.m_connect = connect
+    # invalid UTF-8 after the first frames
+    body = io.BytesIO(b'x' * 200000 + b'\xff\xfe')
+    assert api.MailSend('1', 'hello', body) == MTRetCode.MT_RET_ERR_PARAMS
+    assert connect._in_flight == set()
+    assert not connect.IsAlive()
+    assert sock.frames and sock.frames[-1][1] == 1
+
+
+def test_file_body_is_not_replayed():
+    sockets = []
+
+    def Open(*args):
+        connect, sock = FakeConnect(lambda command, text: None)
+        sockets.append(sock)
+        return MTRetCode.MT_RET_OK, connect
+
+    api = MTWebAPI()
+    api.m_connect = Open()[1]
+    api.m_server = ('127.0.0.1', 443, 5, '1', 'pw')
+    api._Open = Open
+    api.EnableReconnect(attempts=2, backoff=0)
+    ret_code, items, param = api._Talk('SYMBOL_GET', {'BODY_TEXT': io.StringIO('{}')})
+    assert ret_code == MTRetCode.MT_RET_ERR_OUTCOME_UNKNOWN
+    assert sum(len(sock.packets) for sock in sockets) == 1
+    # text body is sent again
+    ret_code, items, param = api._Talk('SYMBOL_GET', {'BODY_TEXT': '{}'})
+    assert sum(len(sock.packets) for sock in sockets) == 4
+
+
+def test_header_of_first_packet():
+    assert MTQueryEncoder.EncodeHeader(0x1a, 0x2b, True, 1) == b'MT5WEBAPI001a002b1'
+    assert MTHeaderProtocol(MTQueryEncoder.EncodeHeader(0xfffe, 0xffff)).SizeBody == 0xfffe
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import time
+from mt5_heartbeat import *
+from fake_socket import *
+
+
+def HeartbeatAPI(answers):
+    """
+    @param dict answers - answer by command, missing command gets no answer
+    @return MTWebAPI, FakeSocket
+    """
+
+    connect, sock = FakeConnect(lambda command, text: answers.get(command))
+    api = MTWebAPI()
+    api.m_connect = connect
+    return api, sock
+
+
+def test_ping_does_not_wait_for_answer():
+    api, sock = HeartbeatAPI({})
+    assert api.Ping() == MTRetCode.MT_RET_OK
+    assert [text.split('|')[0] for text in sock.packets] == ['PING']
+    assert api.m_connect._in_flight == set()
+    assert MTWebAPI().Ping() == MTRetCode.MT_RET_ERR_CONNECTION
+
+
+def test_ping_time_measures_round_trip():
+    api, sock = HeartbeatAPI({'TIME_SERVER': 'TIME_SERVER|RETCODE=0 Done|TIME=1|\r\n'})
+    ret_code, rtt = api.PingTime()
+    assert ret_code == MTRetCode.MT_RET_OK and 0 <= rtt < 1 and api.LastRtt == rtt
+    # failed ping keeps the last good round trip time
+    api, sock = HeartbeatAPI({})
+    api.LastRtt = 0.5
+    assert api.PingTime()[0] == MTRetCode.MT_RET_ERR_NETWORK
+    assert api.LastRtt == 0.5
+
+
+def test_beat_pings_idle_sessions_only():
+    idle, idle_sock = HeartbeatAPI({'TIME_SERVER': 'TIME_SERVER|RETCODE=0 Done|TIME=1|\r\n'})
+    fresh, fresh_sock = HeartbeatAPI({})
+    busy, busy_sock = HeartbeatAPI({})
+    idle.m_connect.LastActivity = busy.m_connect.LastActivity = time.time() - 100
+    fresh.m_connect.LastActivity = time.time()
+    busy.m_connect.NextPacketNumber()
+    heartbeat = MTHeartbeat(idle=60)
+    for api in (idle, fresh, busy, MTWebAPI()):
+        heartbeat.Register(api)
+    assert heartbeat.Beat() == 1
+    assert len(idle_sock.packets) == 1 and not fresh_sock.packets and not busy_sock.packets
+    assert idle.LastRtt is not None
+    heartbeat.Unregister(idle)
+    assert heartbeat.Beat() == 0
+
+
+def test_failed_ping_is_reported():
+    api, sock = HeartbeatAPI({})
+    api.m_connect.LastActivity = 0
+    errors = []
+    heartbeat = MTHeartbeat(idle=1, measure_rtt=False)
+    heartbeat.OnError = lambda api, ret_code: errors.append(ret_code)
+    heartbeat.Register(api)
+    sock.fail_send = ConnectionResetError()
+    assert heartbeat.Beat() == 1
+    assert errors == [MTRetCode.MT_RET_ERR_NETWORK]
+
+
+def test_loop_pings_in_background():
+    api, sock = HeartbeatAPI({})
+    api.m_connect.LastActivity = 0
+    heartbeat = MTHeartbeat(idle=1, interval=0.01, measure_rtt=False)
+    heartbeat.Register(api)
+    heartbeat.Start()
+    try:
+        deadline = time.time() + 2
+        while not sock.packets and time.time() < deadline:
+            time.sleep(0.005)
+    finally:
+        heartbeat.Stop()
+    assert sock.packets and sock.packets[0].startswith('PING')
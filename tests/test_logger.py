@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import logging
+import pytest
+from mt5_logger import *
+from fake_socket import *
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, level=logging.NOTSET):
+        logging.Handler.__init__(self, level)
+        self.lines = []
+
+    def emit(self, record):
+        self.lines.append(record.getMessage())
+
+
+@pytest.fixture
+def handler():
+    handler = ListHandler()
+    logger = MTLogger.Logger
+    level = logger.level
+    logger.addHandler(handler)
+    yield handler
+    logger.removeHandler(handler)
+    logger.setLevel(level)
+
+
+def test_redact_is_case_insensitive():
+    text = 'USER_ADD|PASS_MAIN=a1|pass_investor=b2|Password=c3|NAME=x|\r\n'
+    assert MTLogger.Redact(text) == 'USER_ADD|PASS_MAIN=***|pass_investor=***|Password=***|NAME=x|\r\n'
+
+
+@pytest.mark.parametrize('param', ['PASS_MAIN', 'PASS_INVESTOR', 'PASS_API', 'PASS_PHONE', 'PASSWORD',
+                                   'SRV_RAND_ANSWER', 'CLI_RAND_ANSWER', 'CRYPT_RAND'])
+def test_every_secret_is_redacted(param):
+    text = 'CMD|LOGIN=1|%s=secret|NAME=x|\r\n' % param
+    assert MTLogger.Redact(text) == 'CMD|LOGIN=1|%s=***|NAME=x|\r\n' % param
+
+
+def test_sent_packet_is_logged_before_crypt(handler):
+    MTLogger.Logger.setLevel(logging.DEBUG)
+    connect, sock = FakeConnect(lambda command, text: command + '|RETCODE=0 Done|\r\n')
+    connect.m_log_level = MTLoggerType.DEBUG
+    connect.SetCryptRand('ab' * 256, 'pw')
+    connect.is_crypt = True
+    sock.SetCrypt(connect)
+    number = connect.SendPacket('USER_PASS_CHANGE', {'LOGIN': '1', 'PASSWORD': 'secret'})
+    assert connect.Read(number=number) == 'USER_PASS_CHANGE|RETCODE=0 Done|\r\n'
+    assert sock.packets[0].startswith('USER_PASS_CHANGE|LOGIN=1|PASSWORD=secret|')
+    assert '[127.0.0.1:443] > %d USER_PASS_CHANGE|LOGIN=1|PASSWORD=***|' % number in handler.lines
+    assert '[127.0.0.1:443] < %d USER_PASS_CHANGE|RETCODE=0 Done|' % number in handler.lines
+    assert 'secret' not in ''.join(handler.lines)
+
+
+def test_packet_is_decoded_only_when_sampled(handler):
+    MTLogger.Logger.setLevel(logging.DEBUG)
+    connect, sock = FakeConnect(lambda command, text: command + '|RETCODE=0 Done|\r\n')
+    for i in range(MTLogger.PACKET_SAMPLE * 2):
+        connect.Read(number=connect.SendPacket('TIME_SERVER', {}))
+    # sent and received packets share one counter
+    assert len(handler.lines) == 4
+
+
+def test_connection_level_passes_usual_checks(handler):
+    MTLogger.Logger.setLevel(logging.WARNING)
+    connect, sock = FakeConnect(lambda command, text: command + '|RETCODE=0 Done|\r\n')
+    connect.Read(number=connect.SendPacket('TIME_SERVER', {}))
+    assert handler.lines == []
+    connect.m_log_level = MTLoggerType.DEBUG
+    connect.Read(number=connect.SendPacket('TIME_SERVER', {}))
+    assert len(handler.lines) == 2
+    # handler with higher level drops records of connection
+    handler.setLevel(logging.INFO)
+    connect.Read(number=connect.SendPacket('TIME_SERVER', {}))
+    assert len(handler.lines) == 2
+
+
+def test_json_answer_line_is_logged(handler):
+    MTLogger.Logger.setLevel(logging.DEBUG)
+    connect, sock = FakeConnect(lambda command, text: command + '|RETCODE=0 Done|\r\n[{"Login":"1"}]')
+    connect.m_log_level = MTLoggerType.DEBUG
+    answer, records = connect.ReadJson(connect.SendPacket('USER_GET_BATCH', {'LOGIN': '1'}))
+    assert list(records) == [{'Login': '1'}]
+    assert handler.lines[-1].endswith('USER_GET_BATCH|RETCODE=0 Done|')
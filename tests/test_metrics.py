@@ -0,0 +1,21 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+from mt5_api import *
+from fake_socket import *
+
+
+def test_commands_are_measured():
+    connect, sock = FakeConnect(lambda command, text: command + '|RETCODE=0 Done|\r\n')
+    api = MTWebAPI()
+    api.m_connect = connect
+    assert api._Request('USER_DELETE', {'LOGIN': '1'})[0] == MTRetCode.MT_RET_OK
+    metrics = api.EnableMetrics()
+    assert api._Request('USER_DELETE', {'LOGIN': '1'})[0] == MTRetCode.MT_RET_OK
+    assert metrics.Commands['USER_DELETE'].Count == 1
+    text = metrics.Prometheus()
+    assert 'retcode="0"} 1' in text
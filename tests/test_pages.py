@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import json
+import socket
+import pytest
+from mt5_api import *
+from fake_socket import *
+
+
+def PageAPI(total, answer_pages=True):
+    """
+    @return MTWebAPI, FakeSocket with positions of login 1
+    """
+
+    def Handler(command, text):
+        param = MTConnect.ParseAnswerLine(text)[1]
+        if command == MTProtocolConsts.WEB_CMD_POSITION_GET_TOTAL:
+            return command + '|RETCODE=0 Done|TOTAL=%d|\r\n' % total
+        if not answer_pages:
+            return None
+        offset = int(param['OFFSET'])
+        count = max(0, min(int(param['TOTAL']), total - offset))
+        return command + '|RETCODE=0 Done|\r\n' + json.dumps([{'Position': str(offset + i)} for i in range(count)])
+
+    connect, sock = FakeConnect(Handler)
+    api = MTWebAPI()
+    api.m_connect = connect
+    return api, sock
+
+
+def test_pages_are_prefetched():
+    api, sock = PageAPI(250)
+    reader = api.IterPositions(1, 100)
+    assert [int(record['Position']) for record in reader] == list(range(250))
+    assert reader.RetCode == MTRetCode.MT_RET_OK and reader.Total == 250
+    assert api.m_connect._in_flight == set()
+
+
+def test_failed_page_releases_prefetched_number():
+    api, sock = PageAPI(250, False)
+    sock.timeout = True
+    with pytest.raises(socket.timeout):
+        list(api.IterPositions(1, 100))
+    # the first and the prefetched second page were sent
+    assert len(sock.packets) == 3
+    assert api.m_connect._in_flight == set()
+
+
+def test_closed_reader_releases_prefetched_number():
+    api, sock = PageAPI(250)
+    records = iter(api.IterPositions(1, 100))
+    next(records)
+    records.close()
+    assert api.m_connect._in_flight == set()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import time
+import pytest
+import mt5_pool
+from mt5_pool import *
+
+
+class StubConnect:
+    """
+    Replacement of MTConnect for pool checks
+    """
+
+    def __init__(self):
+        self.alive = True
+        self.idle = False
+
+    def IsAlive(self):
+        return self.alive
+
+    def IsIdle(self, idle_time):
+        return self.idle
+
+
+class StubAPI:
+    """
+    Replacement of MTWebAPI, Connect returns codes from list, then MT_RET_OK
+    """
+
+    codes = []
+    created = []
+
+    def __init__(self, agent='XWCRM', is_crypt=False):
+        self.m_connect = None
+        self.LastRtt = None
+        self.LastRetCode = MTRetCode.MT_RET_OK
+        self.disconnected = False
+        self.ping_code = MTRetCode.MT_RET_OK
+        self.pings = 0
+        StubAPI.created.append(self)
+
+    def Connect(self, ip, port, timeout, login, password):
+        code = StubAPI.codes.pop(0) if StubAPI.codes else MTRetCode.MT_RET_OK
+        if code == MTRetCode.MT_RET_OK:
+            self.m_connect = StubConnect()
+        return code
+
+    def Disconnect(self):
+        self.disconnected = True
+        self.m_connect = None
+
+    def PingTime(self):
+        self.pings += 1
+        return self.ping_code, 0.001
+
+
+@pytest.fixture
+def stub(monkeypatch):
+    StubAPI.codes = []
+    StubAPI.created = []
+    monkeypatch.setattr(mt5_pool, 'MTWebAPI', StubAPI)
+    return StubAPI
+
+
+def Pool(size=2, **kwargs):
+    options = dict(warmup_jitter=0, check_interval=0.01, backoff=0.01, backoff_max=0.02)
+    options.update(kwargs)
+    return MTConnectionPool('127.0.0.1', 443, 5, '1000', 'pw', size, **options)
+
+
+def Wait(condition, timeout=2.0):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.005)
+    return True
+
+
+def test_warmup_connects_all_sessions(stub):
+    pool = Pool(3)
+    try:
+        assert pool.Start() == MTRetCode.MT_RET_OK
+        assert pool.Stats()['idle'] == 3 and len(stub.created) == 3
+    finally:
+        pool.Close()
+
+
+def test_warmup_reports_error_and_retries(stub, monkeypatch):
+    stub.codes = [MTRetCode.MT_RET_ERR_NETWORK]
+    # retry comes after start has seen the first tries
+    monkeypatch.setattr(MTUtils, 'BackoffDelay', staticmethod(lambda attempt, backoff, backoff_max: 0.1))
+    pool = Pool(2)
+    try:
+        # start waits for the first try of every session
+        assert pool.Start() == MTRetCode.MT_RET_ERR_NETWORK
+        assert Wait(lambda: pool.Stats()['idle'] == 2)
+        assert len(stub.created) == 3
+    finally:
+        pool.Close()
+
+
+def test_checkout_timeout(stub):
+    pool = Pool(1)
+    try:
+        pool.Start()
+        api = pool.Checkout(0)
+        assert api is not None
+        start = time.time()
+        assert pool.Checkout(0.05) is None
+        assert time.time() - start >= 0.05
+        with pytest.raises(RuntimeError):
+            with pool.Connection(0):
+                pass
+        pool.Checkin(api)
+        assert pool.Checkout(0) is api
+    finally:
+        pool.Close()
+
+
+def test_old_and_dead_sessions_are_replaced(stub):
+    pool = Pool(2, max_age=0.05)
+    try:
+        pool.Start()
+        first = list(stub.created)
+        assert Wait(lambda: all(api.disconnected for api in first))
+        assert Wait(lambda: pool.Stats()['idle'] == 2)
+    finally:
+        pool.Close()
+    pool = Pool(1, check_interval=60)
+    try:
+        pool.Start()
+        api = pool.Checkout(0)
+        api.m_connect.alive = False
+        pool.Checkin(api)
+        assert api.disconnected
+        replaced = pool.Checkout(1)
+        assert replaced is not None and replaced is not api
+    finally:
+        pool.Close()
+
+
+def test_heartbeat_keeps_alive_session_and_replaces_dead(stub):
+    pool = Pool(2, heartbeat=1)
+    try:
+        pool.Start()
+        alive, dead = stub.created
+        dead.ping_code = MTRetCode.MT_RET_ERR_NETWORK
+        alive.m_connect.idle = dead.m_connect.idle = True
+        assert Wait(lambda: dead.disconnected and alive.pings > 0)
+        assert not alive.disconnected
+        assert Wait(lambda: pool.Stats()['idle'] == 2)
+    finally:
+        pool.Close()
+
+
+def test_network_error_of_request_breaks_session(stub):
+    pool = Pool(1, check_interval=60)
+    try:
+        pool.Start()
+        with pool.Connection(0) as api:
+            # request returned network error, no exception is raised
+            api.LastRetCode = MTRetCode.MT_RET_ERR_NETWORK
+        assert api.disconnected
+        with pytest.raises(OSError):
+            with pool.Connection(1) as second:
+                raise ConnectionResetError()
+        assert second.disconnected and second is not api
+        with pool.Connection(1) as third:
+            third.LastRetCode = MTRetCode.MT_RET_ERR_NOTFOUND
+        assert not third.disconnected
+        assert pool.Checkout(0) is third
+    finally:
+        pool.Close()
+
+
+def test_close_disconnects_all_sessions(stub):
+    pool = Pool(2, check_interval=60)
+    pool.Start()
+    busy = pool.Checkout(0)
+    idle = [api for api in stub.created if api is not busy]
+    pool.Close()
+    assert all(api.disconnected for api in idle) and not busy.disconnected
+    assert pool.Checkout(0) is None
+    # checked out session is disconnected on checkin, nothing is spawned
+    pool.Checkin(busy)
+    assert busy.disconnected
+    assert len(stub.created) == 2
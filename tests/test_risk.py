@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import json
+import pytest
+from mt5_risk import *
+from fake_socket import *
+
+numpy = pytest.importorskip('numpy')
+
+ACCOUNTS = {
+    '1': {'Balance': '1000', 'Credit': '0', 'Margin': '500'},
+    '2': {'Balance': '2000', 'Credit': '100', 'Margin': '0'},
+    '3': {'Balance': '100', 'Credit': '0', 'Margin': '50'},
+}
+POSITIONS = {
+    # buy 1 lot EURUSD at 1.1000, contract 100000
+    '1': [{'Symbol': 'EURUSD', 'Action': '0', 'PriceOpen': '1.1', 'Volume': '10000', 'ContractSize': '100000',
+           'RateProfit': '1', 'Storage': '-2', 'Profit': '0'}],
+    # sell 0.5 lot GBPUSD at 1.3000, three positions need two pages
+    '2': [{'Symbol': 'GBPUSD', 'Action': '1', 'PriceOpen': '1.3', 'Volume': '5000', 'ContractSize': '100000',
+           'RateProfit': '1', 'Storage': '0', 'Profit': '0'}] * 3,
+    '3': [{'Symbol': 'EURUSD', 'Action': '1', 'PriceOpen': '1.1', 'Volume': '1000', 'ContractSize': '100000',
+           'RateProfit': '1', 'Storage': '0', 'Profit': '0'}],
+}
+
+
+def Handler(command, text):
+    command, param, ret_code, body_offset = MTConnect.ParseAnswerLine(text)
+    login = param.get('LOGIN')
+    if login not in ACCOUNTS:
+        return command + '|RETCODE=13 Not found|\r\n'
+    if command == 'USER_ACCOUNT_GET':
+        return command + '|RETCODE=0 Done|\r\n' + json.dumps(ACCOUNTS[login])
+    if command == 'POSITION_GET_PAGE':
+        offset, total = int(param['OFFSET']), int(param['TOTAL'])
+        return command + '|RETCODE=0 Done|\r\n' + json.dumps(POSITIONS[login][offset:offset + total])
+
+
+def RiskAPI():
+    connect, sock = FakeConnect(Handler)
+    api = MTWebAPI()
+    api.m_connect = connect
+    return api, sock
+
+
+def test_load_pipelines_first_pages():
+    api, sock = RiskAPI()
+    for login, ret_code, positions in api.PositionGetBatch(['1', '2', '3'], page_size=2):
+        assert ret_code == MTRetCode.MT_RET_OK and len(positions) == len(POSITIONS[login])
+    # first pages of all logins are sent before the second page of login 2
+    pages = [(text.split('LOGIN=')[1].split('|')[0], 'OFFSET=2' in text) for text in sock.packets]
+    assert pages == [('1', False), ('2', False), ('3', False), ('2', True)]
+    engine = MTRiskEngine()
+    assert engine.Load(api, [1, 2, 3, 4]) == {4: MTRetCode.MT_RET_ERR_NOTFOUND}
+    assert api.m_connect._in_flight == set()
+
+
+def test_margin_level_from_ticks():
+    api, sock = RiskAPI()
+    engine = MTRiskEngine()
+    engine.Load(api, [1, 2, 3])
+    # without prices the profit is taken from server
+    assert engine.Get(1) == {'Balance': 1000.0, 'Credit': 0.0, 'Floating': -2.0, 'Equity': 998.0, 'Margin': 500.0,
+                             'MarginLevel': pytest.approx(199.6)}
+    changed = []
+    engine.OnAccounts = lambda engine, logins: changed.append(logins)
+    assert sorted(engine.Update([('EURUSD', 1.1050, 1.1052)])) == [1, 3]
+    account = engine.Get(1)
+    assert account['Floating'] == pytest.approx(500.0 - 2.0)
+    assert account['MarginLevel'] == pytest.approx((1000 + 498.0) * 100 / 500)
+    # sell is closed by ask
+    assert engine.Get(3)['Floating'] == pytest.approx(-0.0052 * 10000)
+    # account without margin has zero margin level
+    assert engine.Update([('GBPUSD', 1.2990, 1.2995)]) == [2]
+    assert engine.Get(2)['Equity'] == pytest.approx(2100 + 3 * 0.0005 * 50000)
+    assert engine.Get(2)['MarginLevel'] == 0.0
+    assert engine.Update([('USDJPY', 150.0, 150.1)]) == []
+    assert len(changed) == 2
+
+
+def test_margin_call_alert():
+    api, sock = RiskAPI()
+    engine = MTRiskEngine()
+    engine.Load(api, [1, 3])
+    alerts = []
+    engine.OnMarginCall = lambda engine, logins: alerts.append(sorted(logins))
+    engine.MarginCallLevel = 150.0
+    engine.Update([('EURUSD', 1.1000, 1.1002)])
+    # login 3: equity 100 - 2 = 98 of margin 50
+    assert alerts == []
+    engine.Update([('EURUSD', 1.0950, 1.0952)])
+    # login 1: 1000 - 500 - 2 = 498 of 500, login 3 gains
+    assert alerts == [[1]]
+    engine.Update([('EURUSD', 1.1060, 1.1070)])
+    # login 3 loses 70 of 100
+    assert alerts == [[1], [3]]
+
+
+def test_position_changes():
+    api, sock = RiskAPI()
+    engine = MTRiskEngine()
+    engine.Load(api, [1])
+    engine.Update([('EURUSD', 1.1050, 1.1052)])
+    # new position takes the last known price
+    engine.SetPositions(1, POSITIONS['1'] * 2)
+    assert engine.Get(1)['Floating'] == pytest.approx(2 * 498.0)
+    engine.SetAccount(1, {'Balance': '10', 'Margin': '1000'})
+    assert engine.Get(1)['Equity'] == pytest.approx(10 + 996.0)
+    engine.Remove(1)
+    assert engine.Get(1)['Equity'] == 0.0
+    assert engine.Update([('EURUSD', 1.2, 1.2)]) == []
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import json
+import pytest
+from mt5_router import *
+from fake_socket import *
+
+
+class FakePool:
+    """
+    Pool of MTConnectionPool interface with sessions over FakeSocket
+    """
+
+    m_size = 2
+    m_timeout = 1
+
+    def __init__(self, logins):
+        self.m_logins = logins
+        self.m_lost = set()
+        self.Broken = []
+
+    def Handler(self, command, text):
+        param = MTConnect.ParseAnswerLine(text)[1]
+        if command == MTProtocolConsts.WEB_CMD_USER_USER_LOGINS:
+            return command + '|RETCODE=0 Done|\r\n' + json.dumps([str(login) for login in self.m_logins])
+        if param.get('LOGIN') in self.m_lost:
+            # connection is lost without answer
+            return None
+        if command == MTProtocolConsts.WEB_CMD_POSITION_GET_PAGE:
+            return command + '|RETCODE=0 Done|\r\n' + json.dumps([{'Login': param['LOGIN']}] * 2)
+        if command == MTProtocolConsts.WEB_CMD_USER_ACCOUNT_GET:
+            return command + '|RETCODE=0 Done|\r\n' + json.dumps({'Login': param['LOGIN'], 'Balance': '1'})
+        return command + '|RETCODE=0 Done|\r\n'
+
+    def Checkout(self, timeout=None):
+        api = MTWebAPI()
+        api.m_connect = FakeConnect(self.Handler)[0]
+        return api
+
+    def Checkin(self, api, broken=False):
+        self.Broken.append(broken)
+
+    def Close(self):
+        pass
+
+
+def FakeRouter():
+    servers = []
+    for name, logins in (('real1', [100, 101, 102]), ('real2', [200])):
+        server = MTRouterServer(name, '127.0.0.1', 443, 1, 'pw', [(logins[0], logins[0] + 99)], ['real\\*'])
+        server.Pool = FakePool(logins)
+        servers.append(server)
+    return MTRouter(servers)
+
+
+def test_fan_out_before_start():
+    router = FakeRouter()
+    logins, failed = router.GroupLogins('real\\*')
+    assert logins == {'real1': [100, 101, 102], 'real2': [200]}
+    assert failed == {}
+    router.Close()
+
+
+def test_group_accounts():
+    router = FakeRouter()
+    accounts, failed = router.GroupAccounts('real\\*')
+    assert sorted(accounts) == [100, 101, 102, 200]
+    assert accounts[200] == (MTRetCode.MT_RET_OK, {'Login': '200', 'Balance': '1'})
+    assert router.UserAccounts([101, 999])[999] == (MTRetCode.MT_RET_ERR_NOTFOUND, None)
+    router.Close()
+
+
+def test_accounts_and_positions_are_batched(monkeypatch):
+    def Single(api, login):
+        raise AssertionError('login is read by its own round trip')
+
+    monkeypatch.setattr(MTWebAPI, 'UserAccountGet', Single)
+    router = FakeRouter()
+    accounts, failed = router.GroupAccounts('real\\*')
+    assert [accounts[login][1]['Login'] for login in (100, 101, 102, 200)] == ['100', '101', '102', '200']
+    positions = router.Positions([100, 102, 200])
+    assert dict((login, len(value[1])) for login, value in positions.items()) == {100: 2, 102: 2, 200: 2}
+    router.Close()
+
+
+def test_lost_connection_of_batch_breaks_session():
+    router = FakeRouter()
+    pool = router.Server('real1').Pool
+    pool.m_lost.add('100')
+    accounts = router.UserAccounts([100, 101, 102])
+    assert accounts[100] == (MTRetCode.MT_RET_ERR_NETWORK, None)
+    assert accounts[101][0] == MTRetCode.MT_RET_OK
+    assert sorted(pool.Broken) == [False, True]
+    router.Close()
@@ -0,0 +1,30 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import pytest
+from mt5_snapshot import *
+
+numpy = pytest.importorskip('numpy')
+
+
+class BrokenAPI:
+    """
+    Session which fails in the middle of batch
+    """
+
+    def UserAccountGetBatch(self, logins, max_in_flight):
+        for login in logins[:2]:
+            yield login, MTRetCode.MT_RET_OK, {'Login': str(login), 'Balance': '10.5'}
+        raise RuntimeError('broken session')
+
+
+def test_failed_worker_reports_rest_of_chunk():
+    engine = MTAccountSnapshotEngine([BrokenAPI()], chunk=5)
+    ret_code, snapshot = engine.Take(range(1, 11))
+    assert ret_code == MTRetCode.MT_RET_OK
+    assert list(snapshot.Columns['Login']) == [1, 2, 6, 7]
+    assert snapshot.Failed == {login: MTRetCode.MT_RET_ERROR for login in (3, 4, 5, 8, 9, 10)}
@@ -0,0 +1,150 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import json
+import random
+import threading
+import time
+import pytest
+from mt5_api import *
+from fake_socket import *
+
+
+def FakeAPI(handler):
+    """
+    @return MTWebAPI, FakeSocket
+    """
+
+    connect, sock = FakeConnect(handler)
+    api = MTWebAPI()
+    api.m_connect = connect
+    return api, sock
+
+
+def test_timeout_keeps_connection():
+    answers = {'TIME_SERVER': None, 'USER_DELETE': 'USER_DELETE|RETCODE=0 Done|\r\n'}
+    api, sock = FakeAPI(lambda command, text: answers.get(command))
+    sock.timeout = True
+    api.EnableReconnect(attempts=1)
+    api.m_server = ('127.0.0.1', 443, 5, '1', 'pw')
+    connect = api.m_connect
+    assert api._Request('TIME_SERVER', {})[0] == MTRetCode.MT_RET_ERR_TIMEOUT
+    assert api.m_connect is connect and not sock.closed
+    # late answer of released packet is dropped
+    sock.Answer(connect._client_command, 'TIME_SERVER|RETCODE=0 Done|TIME=1|\r\n')
+    assert api._Request('USER_DELETE', {'LOGIN': '1'})[0] == MTRetCode.MT_RET_OK
+
+
+def test_lost_connection_without_reconnect_is_network_error():
+    api, sock = FakeAPI(lambda command, text: None)
+    assert api._Request('USER_DELETE', {'LOGIN': '1'})[0] == MTRetCode.MT_RET_ERR_NETWORK
+    sock.fail_send = ConnectionResetError()
+    assert api._Request('TIME_SERVER', {})[0] == MTRetCode.MT_RET_ERR_NETWORK
+
+
+class BlockingSocket(FakeSocket):
+    """
+    Socket which read waits for release, then fails as reset by server
+    """
+
+    def __init__(self, handler=None):
+        FakeSocket.__init__(self, handler)
+        self.release = threading.Event()
+        self.recv_count = 0
+
+    def recv_into(self, buffer):
+        self.recv_count += 1
+        self.release.wait(5)
+        if self.shut:
+            return 0
+        raise ConnectionResetError(104, 'Connection reset by peer')
+
+
+def SharedAPI():
+    """
+    @return MTWebAPI over BlockingSocket, BlockingSocket, results by command, threads
+    """
+
+    api, sock = FakeAPI(None)
+    sock = api.m_connect._connect = BlockingSocket()
+    results = {}
+    threads = []
+    for command in ('USER_DELETE', 'TIME_SERVER'):
+        thread = threading.Thread(target=lambda command=command: results.setdefault(
+            command, api._Request(command, {'LOGIN': '1'})[0]))
+        thread.start()
+        threads.append(thread)
+        # the first thread reads socket, the second one waits for it
+        while len(sock.packets) < len(threads):
+            time.sleep(0.001)
+    time.sleep(0.05)
+    return api, sock, results, threads
+
+
+def test_dead_socket_wakes_other_readers():
+    api, sock, results, threads = SharedAPI()
+    sock.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == {'USER_DELETE': MTRetCode.MT_RET_ERR_NETWORK, 'TIME_SERVER': MTRetCode.MT_RET_ERR_NETWORK}
+    # the waiting thread has not read the dead socket again
+    assert sock.recv_count == 1
+    assert not api.m_connect.IsAlive()
+
+
+def test_disconnect_leaves_connection_valid():
+    api, sock, results, threads = SharedAPI()
+    connect = api.m_connect
+    connect.Disconnect()
+    sock.release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == {'USER_DELETE': MTRetCode.MT_RET_ERR_NETWORK, 'TIME_SERVER': MTRetCode.MT_RET_ERR_NETWORK}
+    with pytest.raises(OSError):
+        connect.SendPacket('TIME_SERVER', {})
+    assert connect.ReadChunk(1) == (None, 0)
+    assert api._Request('TIME_SERVER', {})[0] == MTRetCode.MT_RET_ERR_NETWORK
+
+
+def ReconnectAPI(handler):
+    """
+    @return MTWebAPI which connection is lost after each request, list of new FakeSockets
+    """
+
+    api, sock = FakeAPI(lambda command, text: None)
+    api.EnableReconnect(attempts=2, backoff=0)
+    api.m_server = ('127.0.0.1', 443, 5, '1', 'pw')
+    sockets = []
+
+    def Open(*args):
+        connect, new_sock = FakeConnect(handler)
+        sockets.append(new_sock)
+        return MTRetCode.MT_RET_OK, connect
+
+    api._Open = Open
+    return api, sockets
+
+
+def test_replay_safe_command_is_sent_again():
+    api, sockets = ReconnectAPI(lambda command, text: command + '|RETCODE=0 Done|\r\n' + json.dumps({'Login': '1'}))
+    assert api.UserGet('1') == (MTRetCode.MT_RET_OK, {'Login': '1'})
+    assert len(sockets) == 1 and sockets[0].packets[0].startswith('USER_GET|')
+
+
+def test_changing_command_is_not_sent_again():
+    api, sockets = ReconnectAPI(lambda command, text: command + '|RETCODE=0 Done|\r\n')
+    assert api.UserDelete('1') == MTRetCode.MT_RET_ERR_OUTCOME_UNKNOWN
+    # connection is restored for the next commands, the command itself is not repeated
+    assert len(sockets) == 1 and sockets[0].packets == []
+    assert api.UserDelete('1') == MTRetCode.MT_RET_OK
+
+
+def test_backoff_has_full_jitter(monkeypatch):
+    monkeypatch.setattr(random, 'uniform', lambda low, high: (low, high))
+    assert MTUtils.BackoffDelay(0, 0.5, 10) == (0, 0.5)
+    assert MTUtils.BackoffDelay(3, 0.5, 10) == (0, 4.0)
+    assert MTUtils.BackoffDelay(10, 0.5, 10) == (0, 10)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import json
+import time
+from mt5_tick import *
+from fake_socket import *
+
+
+def test_callback_error_does_not_stop_others():
+    ticks = [{'Symbol': 'EURUSD', 'Bid': '1.1', 'Ask': '1.2', 'DatetimeMsc': '1000'}]
+    connect, sock = FakeConnect(lambda command, text: command + '|RETCODE=0 Done|TRANS_ID=5|\r\n' + json.dumps(ticks))
+    api = MTWebAPI()
+    api.m_connect = connect
+    poller = MTTickPoller(api, 'demo')
+    got = []
+
+    def Broken(poller, symbols):
+        raise RuntimeError('broken subscriber')
+
+    poller.Subscribe(Broken)
+    poller.Subscribe(lambda poller, symbols: got.append(symbols))
+    assert poller.Poll() == (MTRetCode.MT_RET_OK, ['EURUSD'])
+    assert got == [['EURUSD']]
+    assert poller.TransId == 5
+    assert poller.Table.Get('EURUSD') == (1.1, 1.2, 1000)
+
+
+def test_malformed_ticks_are_skipped():
+    ticks = [{'Bid': '1.1'}, {'Symbol': 'EURUSD', 'Bid': 'x'}, 'EURUSD', {'Symbol': ['EURUSD']},
+             {'Symbol': 'EURUSD', 'DatetimeMsc': str(2 ** 64)}, {'Symbol': 'GBPUSD', 'Bid': '1.3', 'Ask': '1.4'}]
+    connect, sock = FakeConnect(lambda command, text: command + '|RETCODE=0 Done|TRANS_ID=5|\r\n' + json.dumps(ticks))
+    api = MTWebAPI()
+    api.m_connect = connect
+    poller = MTTickPoller(api, 'demo')
+    assert poller.Poll() == (MTRetCode.MT_RET_OK, ['GBPUSD'])
+    assert poller.Table.Skipped == 5 and poller.Table.Symbols == ['GBPUSD']
+
+
+def test_poll_loop_survives_bad_answer():
+    api = MTWebAPI()
+    polls = []
+
+    def TickLastGroup(group, symbol, trans_id):
+        polls.append(trans_id)
+        # body is not a list of ticks
+        return MTRetCode.MT_RET_OK, None, trans_id + 1
+
+    api.TickLastGroup = TickLastGroup
+    poller = MTTickPoller(api, 'demo', interval=0.001)
+    poller.Start()
+    try:
+        deadline = time.time() + 2
+        while len(polls) < 3 and time.time() < deadline:
+            time.sleep(0.005)
+    finally:
+        poller.Stop()
+    assert len(polls) >= 3
+    assert poller.LastError == MTRetCode.MT_RET_ERR_DATA
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# @Author: Zachary
+# @license: commercial
+# @contact:
+
+
+import os
+import pytest
+from mt5_tickring import *
+
+
+def test_write_read(tmp_path):
+    path = str(tmp_path / 'ticks')
+    writer = MTTickRingWriter(path, 8)
+    reader = MTTickRingReader(path)
+    writer.Write('EURUSD', 1.1, 1.2, 1000)
+    writer.Write('GBPUSD', 1.3, 1.4, 1001)
+    records = reader.Read()
+    assert records.dtype == MTTickRingFormat.RECORD
+    assert records['Sequence'].tolist() == [1, 2]
+    assert records['Symbol'].tolist() == [b'EURUSD', b'GBPUSD']
+    assert len(reader.Read()) == 0
+    writer.Write('USDJPY', 150.0, 150.1, 1002)
+    assert reader.ReadTicks() == [('USDJPY', 150.0, 150.1, 1002)]
+    reader.Close()
+    writer.Close()
+
+
+def test_wrap_counts_lost(tmp_path):
+    path = str(tmp_path / 'ticks')
+    writer = MTTickRingWriter(path, 8)
+    reader = MTTickRingReader(path)
+    for index in range(20):
+        writer.Write('EURUSD', 1.0, 1.0, index)
+    records = reader.Read(3)
+    # slot of the oldest record may be rewritten by the writer, it is skipped too
+    assert records['TimeMsc'].tolist() == [13, 14, 15]
+    assert reader.Lost == 13
+    assert reader.Read()['TimeMsc'].tolist() == [16, 17, 18, 19]
+    reader.Close()
+    writer.Close()
+
+
+def test_from_start(tmp_path):
+    path = str(tmp_path / 'ticks')
+    writer = MTTickRingWriter(path, 8)
+    writer.Write('EURUSD', 1.0, 1.0, 1)
+    writer.Write('EURUSD', 1.0, 1.0, 2)
+    assert len(MTTickRingReader(path).Read()) == 0
+    assert MTTickRingReader(path, from_start=True).Read()['TimeMsc'].tolist() == [1, 2]
+    writer.Close()
+
+
+def test_reopen_resyncs_readers(tmp_path):
+    path = str(tmp_path / 'ticks')
+    writer = MTTickRingWriter(path, 8)
+    reader = MTTickRingReader(path)
+    for index in range(5):
+        writer.Write('EURUSD', 1.0, 1.0, index)
+    assert len(reader.Read()) == 5
+    writer.Close()
+    size = os.path.getsize(path)
+    # new writer with smaller ring keeps the file, readers see the new epoch
+    writer = MTTickRingWriter(path, 4)
+    assert writer.Epoch == 2
+    assert os.path.getsize(path) == size
+    assert len(reader.Read()) == 0
+    writer.Write('GBPUSD', 2.0, 2.0, 100)
+    records = reader.Read()
+    assert reader.Resyncs == 1
+    assert reader.m_capacity == 4
+    assert records['Symbol'].tolist() == [b'GBPUSD']
+    reader.Close()
+    writer.Close()
+
+
+def test_other_file_is_not_overwritten(tmp_path):
+    for data in (b'not a ring file', b'\0' * 100, MTTickRingFormat.HEADER.pack(MTTickRingFormat.MAGIC, 1, 64, 8, 1)):
+        path = str(tmp_path / 'ticks')
+        with open(path, 'wb') as file:
+            file.write(data)
+        with pytest.raises(ValueError):
+            MTTickRingWriter(path, 8)
+        with open(path, 'rb') as file:
+            assert file.read() == data
+    # empty file is a new ring
+    open(path, 'wb').close()
+    writer = MTTickRingWriter(path, 8)
+    assert writer.Epoch == 1
+    writer.Close()
+
+
+def test_long_symbol_is_cut_on_character(tmp_path):
+    path = str(tmp_path / 'ticks')
+    writer = MTTickRingWriter(path, 8)
+    reader = MTTickRingReader(path)
+    # 31 bytes and a character of two bytes
+    writer.Write('E' * 31 + 'é', 1.0, 1.0, 1)
+    writer.Write('€' * 11, 1.0, 1.0, 2)
+    writer.Write('EURUSD', 1.0, 1.0, 3)
+    assert [tick[0] for tick in reader.ReadTicks()] == ['E' * 31, '€' * 10, 'EURUSD']
+    reader.Close()
+    writer.Close()